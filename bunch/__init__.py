@@ -25,11 +25,71 @@
 __version__ = '1.0.2'
 VERSION = tuple(map(int, __version__.split('.')))
 
-__all__ = ('Bunch', 'bunchify', 'unbunchify',)
+__all__ = ('Bunch', 'LazyBunch', 'FrozenBunch', 'LayeredBunch', 'BunchFrame', 'TrackedBunch', 'CachedBunch', 'BunchIndex', 'Schema', 'Field', 'SchemaError', 'bunchify', 'unbunchify', 'bunch_repr', 'path',)
 
-from bunch.python3_compat import *
+from abc import ABCMeta
+from array import array
+from collections.abc import Mapping, MutableMapping, MutableSequence
+import heapq
+import itertools
+import sys
+import threading
 
-class Bunch(dict):
+class BunchType(type):
+    """ Metaclass for Bunch that keeps, per class, the set of names visible as
+        class-level attributes (everything in the ``__dict__`` of the MRO) in
+        ``_attr_names``. Bunch consults it, and the instance's own ``__dict__``,
+        to tell attributes from keys without probing ``object.__getattribute__``
+        and catching the AttributeError.
+        
+        The set is rebuilt when a class is created and whenever an attribute is
+        set on or deleted from a class, for that class and all its subclasses.
+        
+        >>> class Sub(Bunch): pass
+        >>> 'shout' in Sub._attr_names
+        False
+        >>> Bunch.shout = lambda self: self.word.upper()
+        >>> 'shout' in Sub._attr_names
+        True
+        >>> s = Sub(word='hi')
+        >>> s.shout()
+        'HI'
+        >>> s.shout = 'now an instance attribute'
+        >>> s.get('shout') is None
+        True
+        >>> del Bunch.shout
+        >>> s.shout = 'still an instance attribute'
+        >>> s.get('shout') is None
+        True
+        >>> t = Sub()
+        >>> t.shout = 'now a key'
+        >>> t['shout']
+        'now a key'
+    """
+    
+    def __init__(cls, name, bases, d):
+        super(BunchType, cls).__init__(name, bases, d)
+        cls._refresh_attr_names()
+    
+    def __setattr__(cls, k, v):
+        type.__setattr__(cls, k, v)
+        cls._refresh_attr_names()
+    
+    def __delattr__(cls, k):
+        type.__delattr__(cls, k)
+        cls._refresh_attr_names()
+    
+    def _refresh_attr_names(cls):
+        names = set(['_attr_names'])
+        for klass in cls.__mro__:
+            names.update(vars(klass))
+        type.__setattr__(cls, '_attr_names', frozenset(names))
+        for sub in type.__subclasses__(cls):
+            if isinstance(sub, BunchType):
+                sub._refresh_attr_names()
+
+
+class Bunch(dict, metaclass=BunchType):
     """ A dictionary that provides attribute-style access.
         
         >>> b = Bunch()
@@ -87,8 +147,26 @@ class Bunch(dict):
             >>> b[False] = 456
             >>> False in b
             True
+            
+            Attributes of the class count as well, but misses never raise.
+            
+            >>> 'values' in b
+            True
+            >>> 1 in b
+            False
+            
+            As with a dict, unhashable keys still raise.
+            
+            >>> [1] in b
+            Traceback (most recent call last):
+                ...
+            TypeError: unhashable type: 'list'
         """
-        return dict.__contains__(self, k) or hasattr(self, k)
+        if dict.__contains__(self, k):
+            return True
+        # only names known to the class, or set on the instance, can be attributes
+        names = type(self)._attr_names
+        return (k in names and hasattr(self, k)) or ('__dict__' in names and k in self.__dict__)
     
     # only called if k not found in normal places
     def __getattr__(self, k):
@@ -114,14 +192,12 @@ class Bunch(dict):
             >>> b.lol is getattr(b, 'lol')
             True
         """
+        # Normal lookup already failed, so there is nothing left to probe on
+        # the prototype chain: go straight to the keys.
         try:
-            # Throws exception if not in prototype chain
-            return object.__getattribute__(self, k)
-        except AttributeError:
-            try:
-                return self[k]
-            except KeyError:
-                raise AttributeError(k)
+            return self[k]
+        except KeyError:
+            raise AttributeError(k)
     
     def __setattr__(self, k, v):
         """ Sets attribute k if it exists, otherwise sets key k. A KeyError
@@ -138,17 +214,36 @@ class Bunch(dict):
             Traceback (most recent call last):
                 ...
             KeyError: 'values'
+            
+            Attributes set on the instance itself, as a subclass might with
+            object.__setattr__, stay attributes.
+            
+            >>> class Sub(Bunch):
+            ...     def __init__(self, *args, **kwargs):
+            ...         super(Sub, self).__init__(*args, **kwargs)
+            ...         object.__setattr__(self, 'meta', 1)
+            >>> s = Sub(x=1)
+            >>> s.meta = 2
+            >>> s.meta, s
+            (2, Sub(x=1))
+            >>> 'meta' in s
+            True
+            >>> del s.meta
+            >>> s.meta
+            Traceback (most recent call last):
+                ...
+            AttributeError: meta
+            >>> s
+            Sub(x=1)
         """
-        try:
-            # Throws exception if not in prototype chain
-            object.__getattribute__(self, k)
-        except AttributeError:
+        names = type(self)._attr_names
+        if k in names or ('__dict__' in names and k in self.__dict__):
+            object.__setattr__(self, k, v)
+        else:
             try:
                 self[k] = v
             except KeyError:
                 raise AttributeError(k)
-        else:
-            object.__setattr__(self, k, v)
     
     def __delattr__(self, k):
         """ Deletes attribute k if it exists, otherwise deletes key k. A KeyError
@@ -166,16 +261,14 @@ class Bunch(dict):
                 ...
             AttributeError: lol
         """
-        try:
-            # Throws exception if not in prototype chain
-            object.__getattribute__(self, k)
-        except AttributeError:
+        names = type(self)._attr_names
+        if k in names or ('__dict__' in names and k in self.__dict__):
+            object.__delattr__(self, k)
+        else:
             try:
                 del self[k]
             except KeyError:
                 raise AttributeError(k)
-        else:
-            object.__delattr__(self, k)
     
     def copy(self):
         """ Makes a shallow copy of the Bunch.
@@ -191,7 +284,7 @@ class Bunch(dict):
         """
         return self.__class__(self)
     
-    def toDict(self, DictClass=dict):
+    def toDict(self, DictClass=dict, skip_converted=False):
         """ Recursively converts a Bunch back into a dictionary.
             
             >>> b = Bunch(foo=Bunch(lol=True), hello=42, ponies='are pretty!')
@@ -200,7 +293,7 @@ class Bunch(dict):
             
             See unbunchify for more info.
         """
-        return unbunchify(self, DictClass)
+        return unbunchify(self, DictClass, skip_converted)
     
     def __add__(self, other):
         """ Creates a shallow copy of the Bunch, merging in another Mapping (or
@@ -239,7 +332,41 @@ class Bunch(dict):
         self.update(other)
         return self
     
-    def __repr__(self, _repr_running={}):
+    def __reduce_ex__(self, protocol):
+        """ Pickles a Bunch as its class and an iterator over its items, which
+            unpickling feeds straight back in: no per-object copyreg machinery,
+            and no intermediate dict.
+            
+            >>> import pickle
+            >>> b = Bunch(foo=Bunch(lol=True), hello=42)
+            >>> pickle.loads(pickle.dumps(b, 2))
+            Bunch(foo=Bunch(lol=True), hello=42)
+            
+            With protocol 5, large ``bytes``, ``bytearray`` and ``array.array``
+            values are handed to ``buffer_callback`` as out-of-band buffers, so
+            payloads are not copied into the pickle stream.
+            
+            >>> buffers = []
+            >>> data = pickle.dumps(Bunch(blob=b'x' * 100000), 5, buffer_callback=buffers.append)
+            >>> len(data) < 200, len(buffers)
+            (True, 1)
+            >>> len(pickle.loads(data, buffers=buffers).blob)
+            100000
+        """
+        cls = type(self)
+        if protocol < 2 or cls.__init__ is not dict.__init__:
+            return dict.__reduce_ex__(self, protocol)
+        items = iter(dict.items(self))
+        if protocol >= 5 and not _BUFFER_TYPES.isdisjoint(map(type, dict.values(self))):
+            items = _out_of_band(items)
+        return (cls, (), self.__dict__ or None, None, items)
+    
+    # Keyword options for bunch_repr() used by repr(); set eg.
+    # ``_repr_options = dict(max_items=50, max_length=2000)`` on a subclass
+    # (or on Bunch itself) to bound the cost of logging large Bunches.
+    _repr_options = {}
+    
+    def __repr__(self):
         """ Invertible* string-form of a Bunch.
             
             >>> b = Bunch(foo=Bunch(lol=True), hello=42, ponies='are pretty!')
@@ -249,21 +376,19 @@ class Bunch(dict):
             True
             
             (*) Invertible so long as collection contents are each repr-invertible.
+            
+            Self-references print as ``...``.
+            
+            >>> b.me = b
+            >>> b
+            Bunch(foo=Bunch(lol=True), hello=42, me=..., ponies='are pretty!')
+            
+            See bunch_repr for the options that bound the output.
         """
-        call_key = id(self), _get_ident()
-        if call_key in _repr_running:
-            return '...'
-        _repr_running[call_key] = 1
-        try:
-            if not self:
-                return '%s()' % (self.__class__.__name__,)
-            args = ', '.join( ('%s=%r' % (k, self[k]) for k in sorted(self)) )
-            return '%s(%s)' % (self.__class__.__name__, args)
-        finally:
-            del _repr_running[call_key]
+        return bunch_repr(self, **self._repr_options)
     
     @classmethod
-    def fromDict(cls, d):
+    def fromDict(cls, d, skip_converted=False, schema=None):
         """ Recursively transforms a dictionary into a Bunch via copy.
             
             >>> b = Bunch.fromDict({'urmom': {'sez': {'what': 'what'}}})
@@ -272,9 +397,10 @@ class Bunch(dict):
             
             Aliased as ``Bunch.bunchify``.
             
-            See ``bunch.bunchify`` for more info.
+            See ``bunch.bunchify`` for more info, and for validating against
+            a ``schema``.
         """
-        return bunchify(d, cls)
+        return bunchify(d, cls, skip_converted, schema)
     
     bunchify = fromDict
     
@@ -288,7 +414,136 @@ class Bunch(dict):
 # Should you disagree, it is not difficult to duplicate this function with
 # more aggressive coercion to suit your own purposes.
 
-def bunchify(it, BunchClass=Bunch):
+# Node kinds for the conversion engine.
+_LEAF, _DICT, _MAPPING, _LIST, _TUPLE = range(1, 6)  # truthy, for `kinds.get(t) or ...`
+
+_SCALAR_TYPES = (str, bytes, int, float, complex, bool, type(None))
+
+def _classify(t, target, skip_converted):
+    """ Works out how the conversion engine should treat instances of type ``t``. """
+    if t in _SCALAR_TYPES or (skip_converted and t is target):
+        return _LEAF
+    if issubclass(t, dict) and t.__iter__ is dict.__iter__ and t.__getitem__ is dict.__getitem__:
+        return _DICT
+    if issubclass(t, Mapping):
+        return _MAPPING
+    if issubclass(t, list):
+        return _LIST
+    if issubclass(t, tuple):
+        return _TUPLE
+    return _LEAF
+
+def _fills_on_init(MappingClass):
+    """ Whether the conversion engine should create instances of
+        ``MappingClass`` with all of their converted contents, rather than
+        copy the source and fill in the nested values: true of classes with
+        their own __init__ or __setitem__, such as TrackedBunch, which adopts
+        its values and records changes.
+    """
+    return MappingClass.__init__ is not dict.__init__ or MappingClass.__setitem__ is not dict.__setitem__
+
+def _convert(root, MappingClass, skip_converted=False):
+    """ Copies ``root``, replacing every Mapping with a ``MappingClass``.
+        
+        Walks the tree with an explicit stack, so depth is not bounded by the
+        recursion limit. Each container is first copied wholesale, then only
+        the slots holding nested containers are revisited; types are classified
+        once per conversion (exact type lookup, ABC checks only for types not
+        seen yet). Containers are memoized by id, so shared sub-objects stay
+        shared and cycles are reproduced.
+        
+        >>> d = {'x': 1}
+        >>> d['self'] = d
+        >>> b = _convert(d, Bunch)
+        >>> b.self is b
+        True
+    """
+    kinds = dict.fromkeys(_SCALAR_TYPES, _LEAF)
+    kinds.update({ dict: _DICT, list: _LIST, tuple: _TUPLE })
+    for t in (MappingClass, Bunch):
+        kinds[t] = _classify(t, MappingClass, skip_converted)
+    
+    def classify(t):
+        kind = kinds[t] = _classify(t, MappingClass, skip_converted)
+        return kind
+    
+    kind = kinds.get(type(root)) or classify(type(root))
+    if kind == _LEAF:
+        return root
+    
+    memo = {}
+    keep_alive = []  # values produced by non-dict Mappings; ids are only unique while alive
+    
+    # such classes are created empty, filled as plain dicts, and initialized
+    # once on the way out (the memo holds the empty instance, for cycles)
+    deferred = _fills_on_init(MappingClass)
+    
+    def open_frame(node, kind):
+        t = type(node)
+        if kind == _DICT or kind == _MAPPING:
+            if kind == _DICT:
+                out = dict(node) if deferred else MappingClass(node)
+                items = iter(dict.items(node))
+            else:
+                items = [ (k, node[k]) for k in iter(node) ]
+                keep_alive.append(items)
+                out = dict(items) if deferred else MappingClass(items)
+                items = iter(items)
+            if deferred:
+                created = MappingClass.__new__(MappingClass)
+                memo[id(node)] = created
+                return [node, kind, out, items, None, created]
+        else:
+            # (index, value) pairs; tuples are immutable, so they are
+            # filled in as a list and built on the way out
+            out = list(node) if t is list or kind == _TUPLE else t(node)
+            items = enumerate(node)
+            if kind == _TUPLE:
+                return [node, kind, out, items, None, None]
+        memo[id(node)] = out
+        return [node, kind, out, items, None, None]
+    
+    stack = [open_frame(root, kind)]
+    while True:
+        frame = stack[-1]
+        out = frame[2]
+        child = None
+        for key, value in frame[3]:
+            vkind = kinds.get(type(value)) or classify(type(value))
+            if vkind == _LEAF:
+                continue
+            seen = memo.get(id(value))
+            if seen is not None:
+                out[key] = seen
+                continue
+            frame[4] = key
+            child = open_frame(value, vkind)
+            break
+        if child is not None:
+            stack.append(child)
+            continue
+        
+        # frame exhausted
+        stack.pop()
+        node = frame[0]
+        if frame[1] == _TUPLE:
+            # A cycle back through this tuple (via some mutable container)
+            # converts it a second time; the first copy to finish wins.
+            result = memo.get(id(node))
+            if result is None:
+                result = tuple(out) if type(node) is tuple else type(node)(out)
+                memo[id(node)] = result
+        elif frame[5] is not None:
+            result = frame[5]
+            MappingClass.__init__(result, out)
+        else:
+            result = out
+        if not stack:
+            return result
+        parent = stack[-1]
+        parent[2][parent[4]] = result
+
+def bunchify(it, BunchClass=Bunch, skip_converted=False, schema=None):
     """ Recursively transforms a dictionary into a Bunch via copy.
         
         >>> b = bunchify({'urmom': {'sez': {'what': 'what'}}})
@@ -307,17 +562,48 @@ def bunchify(it, BunchClass=Bunch):
         
         nb. As dicts are not hashable, they cannot be nested in sets/frozensets.
         
+        Objects appearing more than once in the input appear once in the output,
+        so shared sub-documents stay shared and cycles are reproduced rather than
+        overflowing. Nesting depth is not limited by the recursion limit.
+        
+        >>> shared = {'x': 1}
+        >>> b = bunchify({'a': shared, 'b': [shared]})
+        >>> b.a is b.b[0]
+        True
+        >>> deep = {}
+        >>> for _ in range(100000):
+        ...     deep = {'d': deep}
+        >>> type(bunchify(deep).d.d.d.d)
+        <class 'bunch.Bunch'>
+        
+        Pass ``skip_converted=True`` to reuse values that are already exactly
+        of type ``BunchClass`` as-is, trusting that they need no conversion.
+        
+        >>> inner = Bunch(already='done')
+        >>> bunchify({'inner': inner}).inner is inner
+        False
+        >>> bunchify({'inner': inner}, skip_converted=True).inner is inner
+        True
+        
         You may customize Mapping conversion by passing a Bunch/dict class as 
         the second parameter.
+        
+        Given a ``schema`` (a ``bunch.Schema``, or a declaration to build one
+        from), the data is validated, coerced and completed with defaults in
+        the same pass that builds the Bunches; see ``bunch.schema``.
+        
+        >>> from bunch import Field
+        >>> bunchify({'port': '8080'}, schema={'port': int, 'host': Field(str, default='localhost')})
+        Bunch(host='localhost', port=8080)
     """
-    if isinstance(it, Mapping):
-        return BunchClass( (k, bunchify(it[k], BunchClass)) for k in iter(it) )
-    elif isinstance(it, (list, tuple)):
-        return type(it)( (bunchify(v, BunchClass) for v in it) )
-    else:
-        return it
+    if schema is not None:
+        from bunch.schema import Schema
+        if not isinstance(schema, Schema):
+            schema = Schema(schema)
+        return schema(it, BunchClass)
+    return _convert(it, BunchClass, skip_converted)
 
-def unbunchify(it, DictClass=dict):
+def unbunchify(it, DictClass=dict, skip_converted=False):
     """ Recursively converts a Bunch into a dictionary via copy.
         
         >>> b = Bunch(foo=Bunch(lol=True), hello=42, ponies='are pretty!')
@@ -335,187 +621,1063 @@ def unbunchify(it, DictClass=dict):
 
         nb. As dicts are not hashable, they cannot be nested in sets/frozensets.
         
+        As with bunchify, shared objects and cycles are preserved, and
+        ``skip_converted=True`` reuses values exactly of type ``DictClass``.
+        
         You may customize Mapping conversion by passing a dict class as
         the second parameter.
     """
-    if isinstance(it, Mapping):
-        return DictClass( (k, unbunchify(it[k], DictClass)) for k in iter(it) )
-    elif isinstance(it, (list, tuple)):
-        return type(it)( (unbunchify(v, DictClass) for v in it) )
-    else:
-        return it
+    return _convert(it, DictClass, skip_converted)
 
 
-### Serialization
+### Representation
 
-try:
-    try:
-        import json
-    except ImportError:
-        import simplejson as json
+# Containers on the path of the repr() in progress, per thread. repr() never
+# suspends, so per-thread state is also correct for asyncio tasks.
+_repr_state = threading.local()
+
+_TEXT, _VALUE, _LEAVE = range(3)
+
+def bunch_repr(obj, max_depth=None, max_items=None, max_length=None, sort_keys=True):
+    """ Returns the repr of a Bunch (or of any value holding Bunches), walking
+        nested Bunches, dicts, lists and tuples iteratively.
+        
+        Limits bound the time and memory spent on large objects:
+        - ``max_depth``: containers nested deeper print as ``Bunch(...)``, ``[...]``
+        - ``max_items``: only the first items of each container are shown
+        - ``max_length``: output is cut at this many characters, ending in ``...``
+        - ``sort_keys=False`` keeps insertion order instead of sorting Bunch keys
+        
+        >>> b = Bunch(name='big', rows=list(range(100)), meta=Bunch(a=Bunch(b=Bunch(c=1))))
+        >>> bunch_repr(b, max_items=3)
+        "Bunch(meta=Bunch(a=Bunch(b=Bunch(c=1))), name='big', rows=[0, 1, 2, ...])"
+        >>> bunch_repr(b, max_depth=1, max_items=3)
+        "Bunch(meta=Bunch(a=Bunch(...)), name='big', rows=[0, 1, 2, ...])"
+        >>> bunch_repr(b, max_length=30)
+        'Bunch(meta=Bunch(a=Bunch(b=Bun...'
+        >>> bunch_repr(Bunch(b=2, a=1), sort_keys=False)
+        'Bunch(b=2, a=1)'
+        
+        Only the keys of Bunches are sorted; dicts keep their own order.
+        
+        >>> bunch_repr(Bunch(x={'b': 1, 'a': 2}))
+        "Bunch(x={'b': 1, 'a': 2})"
+    """
+    path = getattr(_repr_state, 'path', None)
+    if path is None:
+        _repr_state.path = path = set()
+        try:
+            return _repr(obj, path, max_depth, max_items, max_length, sort_keys)
+        finally:
+            _repr_state.path = None
+    if id(obj) in path:
+        # re-entered through the repr() of some other object in the tree
+        return '...'
+    return _repr(obj, path, max_depth, max_items, max_length, sort_keys)
+
+def _repr(obj, path, max_depth, max_items, max_length, sort_keys):
+    if max_depth is None and max_items is None and max_length is None:
+        return _repr_unbounded(obj, path, sort_keys)
+    return _repr_walk(obj, path, max_depth, max_items, max_length, sort_keys)
+
+# types repr()'d directly, without checking for containers
+_REPR_SCALARS = frozenset((str, int, float, bool, type(None)))
+
+def _repr_delimiters(item, t):
+    """ Returns the opening and closing text for a container _repr_walk
+        walks into, or None for any other value.
+    """
+    if isinstance(item, Bunch) and t.__repr__ is Bunch.__repr__:
+        return t.__name__ + '(', ')'
+    if t is dict:
+        return '{', '}'
+    if t is list:
+        return '[', ']'
+    if t is tuple:
+        return '(', ',)' if len(item) == 1 else ')'
+    return None
+
+# _repr_unbounded recurses this deep at most, then hands over to _repr_walk
+_REPR_RECURSION = 50
+
+def _repr_unbounded(item, path, sort_keys, depth=0):
+    """ _repr_walk without limits, recursing like the plain repr() of the
+        containers: scalars, and lists or tuples holding only scalars, are
+        repr()'d directly, with no stack work.
+    """
+    t = type(item)
+    delimiters = _repr_delimiters(item, t)
+    if delimiters is None:
+        return repr(item)
+    if id(item) in path:
+        return '...'
+    if not item:
+        return delimiters[0] + delimiters[1]
+    if depth >= _REPR_RECURSION:
+        return _repr_walk(item, path, None, None, None, sort_keys)
     
-    def toJSON(self, **options):
-        """ Serializes this Bunch to JSON. Accepts the same keyword options as ``json.dumps()``.
+    scalars = _REPR_SCALARS
+    depth += 1
+    path.add(id(item))
+    try:
+        if t is list or t is tuple:
+            parts = [ repr(v) if type(v) in scalars else _repr_unbounded(v, path, sort_keys, depth)
+                      for v in item ]
+        elif t is dict:
+            parts = [ '%r: %s' % (k, repr(v) if type(v) in scalars
+                                     else _repr_unbounded(v, path, sort_keys, depth))
+                      for k, v in item.items() ]
+        else:
+            keys = item
+            if sort_keys:
+                try:
+                    keys = sorted(item)
+                except TypeError:
+                    pass    # unorderable keys
+            parts = []
+            for k in keys:
+                v = item[k]
+                tv = type(v)
+                if tv in scalars or (tv is list or tv is tuple) and scalars.issuperset(map(type, v)):
+                    parts.append('%s=%r' % (k, v))
+                else:
+                    parts.append('%s=%s' % (k, _repr_unbounded(v, path, sort_keys, depth)))
+    finally:
+        path.discard(id(item))
+    return delimiters[0] + ', '.join(parts) + delimiters[1]
+
+def _repr_walk(root, path, max_depth, max_items, max_length, sort_keys):
+    out = []
+    length = 0
+    entered = []
+    stack = [(_VALUE, root, 0)]
+    try:
+        while stack:
+            kind, item, depth = stack.pop()
+            if kind == _LEAVE:
+                path.discard(item)
+                continue
+            if kind == _VALUE:
+                t = type(item)
+                delimiters = _repr_delimiters(item, t)
+                if delimiters is None:
+                    text = repr(item)
+                elif id(item) in path:
+                    text = '...'
+                elif not item:
+                    text = delimiters[0] + delimiters[1]
+                elif max_depth is not None and depth > max_depth:
+                    text = delimiters[0] + '...' + delimiters[1]
+                else:
+                    path.add(id(item))
+                    entered.append(id(item))
+                    stack.append( (_LEAVE, id(item), depth) )
+                    stack.append( (_TEXT, delimiters[1], depth) )
+                    _repr_push_items(stack, item, t, depth + 1, max_items, sort_keys)
+                    text = delimiters[0]
+            else:
+                text = item
             
-            >>> b = Bunch(foo=Bunch(lol=True), hello=42, ponies='are pretty!')
-            >>> json.dumps(b)
-            '{"foo": {"lol": true}, "hello": 42, "ponies": "are pretty!"}'
-            >>> b.toJSON()
-            '{"foo": {"lol": true}, "hello": 42, "ponies": "are pretty!"}'
-        """
-        return json.dumps(self, **options)
+            if max_length is not None and length + len(text) > max_length:
+                out.append(text[:max_length - length])
+                out.append('...')
+                break
+            out.append(text)
+            length += len(text)
+        return ''.join(out)
+    finally:
+        for i in entered:
+            path.discard(i)
+
+def _repr_push_items(stack, item, t, depth, max_items, sort_keys):
+    """ Pushes the entries of a container for _repr_walk, in reverse. """
+    is_mapping = t is dict or isinstance(item, Bunch)
+    if is_mapping:
+        keys = item
+        if sort_keys and t is not dict:
+            try:
+                keys = sorted(item) if max_items is None else heapq.nsmallest(max_items, item)
+            except TypeError:
+                keys = item  # unorderable keys
+        if max_items is not None:
+            keys = itertools.islice(keys, max_items)
+        entries = list(keys)
+    else:
+        entries = list(item if max_items is None else itertools.islice(item, max_items))
     
-    Bunch.toJSON = toJSON
+    if max_items is not None and len(item) > max_items:
+        stack.append( (_TEXT, ', ...', depth) )
+    bunch_style = t is not dict and is_mapping
+    for i in range(len(entries) - 1, -1, -1):
+        entry = entries[i]
+        if is_mapping:
+            stack.append( (_VALUE, item[entry], depth) )
+            key = ('%s=' % (entry,)) if bunch_style else (repr(entry) + ': ')
+            stack.append( (_TEXT, key if i == 0 else ', ' + key, depth) )
+        else:
+            stack.append( (_VALUE, entry, depth) )
+            if i:
+                stack.append( (_TEXT, ', ', depth) )
+
+
+### Pickling
+
+# Values at least this large are pickled out-of-band under protocol 5.
+OUT_OF_BAND_MIN_SIZE = 1 << 16
+
+_BUFFER_TYPES = frozenset((bytes, bytearray, array))
+
+class _Buffer(object):
+    """ Wraps a bytes-like value so pickle writes it as a PickleBuffer. """
+    __slots__ = ('value',)
     
-except ImportError:
-    pass
+    def __init__(self, value):
+        self.value = value
+    
+    def __reduce_ex__(self, protocol):
+        value = self.value
+        typecode = getattr(value, 'typecode', None)
+        from pickle import PickleBuffer     # loaded already, as we are being pickled
+        return (_from_buffer, (type(value), typecode, PickleBuffer(value)))
+
+def _from_buffer(t, typecode, buf):
+    if typecode is None:
+        return buf if type(buf) is t else t(buf)
+    value = t(typecode)
+    value.frombytes(buf)
+    return value
 
+def _out_of_band(items):
+    for k, v in items:
+        if type(v) in _BUFFER_TYPES and len(v) * getattr(v, 'itemsize', 1) >= OUT_OF_BAND_MIN_SIZE:
+            v = _Buffer(v)
+        yield k, v
 
 
+### Lazy views
 
-try:
-    # Attempt to register ourself with PyYAML as a representer
-    import yaml
-    from yaml.representer import Representer, SafeRepresenter
+class BunchABCType(BunchType, ABCMeta):
+    """ Metaclass for Bunch-style collections that are built on the abstract
+        collection classes rather than on dict (lazy views, records).
+    """
+
+
+class LazyBunch(MutableMapping, metaclass=BunchABCType):
+    """ A zero-copy, attribute-style view over an existing dictionary.
+        
+        Nested dicts and lists are wrapped only when they are touched, and the
+        wrapper is cached so repeated access returns the same object.
+        
+        >>> data = {'user': {'name': 'Ada', 'langs': [{'name': 'python'}]}}
+        >>> b = LazyBunch(data)
+        >>> b.user.name
+        'Ada'
+        >>> b.user is b.user
+        True
+        >>> b.user.langs[0].name
+        'python'
+        
+        Nothing is copied: the view reads from and writes through to ``data``.
+        
+        >>> b.user.name = 'Grace'
+        >>> data['user']['name']
+        'Grace'
+        >>> b.toDict() is data
+        False
+        
+        Until something is modified, toDict() hands back the wrapped dictionary
+        itself instead of rebuilding it.
+        
+        >>> LazyBunch(data).toDict() is data
+        True
+        >>> LazyBunch(data).user.toDict() is data['user']
+        True
+        
+        A LazyBunch is a MutableMapping, not a dict: use toDict() or toJSON()
+        where a real dictionary is required.
+    """
+    __slots__ = ('_data', '_cache', '_state')
     
-    def from_yaml(loader, node):
-        """ PyYAML support for Bunches using the tag ``!bunch`` and ``!bunch.Bunch``.
-            
-            >>> import yaml
-            >>> yaml.full_load('''
-            ... Flow style: !bunch.Bunch { Clark: Evans, Brian: Ingerson, Oren: Ben-Kiki }
-            ... Block style: !bunch
-            ...   Clark : Evans
-            ...   Brian : Ingerson
-            ...   Oren  : Ben-Kiki
-            ... ''') #doctest: +NORMALIZE_WHITESPACE
-            {'Flow style': Bunch(Brian='Ingerson', Clark='Evans', Oren='Ben-Kiki'), 
-             'Block style': Bunch(Brian='Ingerson', Clark='Evans', Oren='Ben-Kiki')}
+    def __init__(self, data=None, **kwargs):
+        if data is None:
+            data = kwargs
+        elif kwargs:
+            data.update(kwargs)
+        self._data = data
+        self._cache = {}
+        self._state = [False]   # [modified], shared by every view of one tree
+    
+    @classmethod
+    def _view(cls, data, state):
+        self = cls.__new__(cls)
+        self._data = data
+        self._cache = {}
+        self._state = state
+        return self
+    
+    @classmethod
+    def fromDict(cls, d):
+        """ Wraps a dictionary without copying it; the same as ``LazyBunch(d)``.
             
-            This module registers itself automatically to cover both Bunch and any 
-            subclasses. Should you want to customize the representation of a subclass,
-            simply register it with PyYAML yourself.
+            >>> LazyBunch.fromDict({'a': {'b': 1}}).a.b
+            1
         """
-        data = Bunch()
-        yield data
-        value = loader.construct_mapping(node)
-        data.update(value)
+        return cls(d)
+    
+    def __getitem__(self, k):
+        try:
+            return self._cache[k]
+        except KeyError:
+            pass
+        value = self._data[k]
+        t = type(value)
+        if t is dict:
+            value = self._cache[k] = type(self)._view(value, self._state)
+        elif t is list:
+            value = self._cache[k] = LazyList._view(value, self._state, type(self))
+        return value
+    
+    def __setitem__(self, k, v):
+        self._state[0] = True
+        self._cache.pop(k, None)
+        self._data[k] = _unwrap_lazy(v)
+    
+    def __delitem__(self, k):
+        del self._data[k]
+        self._state[0] = True
+        self._cache.pop(k, None)
     
+    def __iter__(self):
+        return iter(self._data)
     
-    def to_yaml_safe(dumper, data):
-        """ Converts Bunch to a normal mapping node, making it appear as a
-            dict in the YAML output.
+    def __len__(self):
+        return len(self._data)
+    
+    def __contains__(self, k):
+        """ >>> b = LazyBunch({'ponies': 'are pretty!'})
+            >>> 'ponies' in b
+            True
+            >>> 'foo' in b
+            False
+            >>> 'values' in b
+            True
+        """
+        if k in self._data:
+            return True
+        names = type(self)._attr_names
+        return (k in names and hasattr(self, k)) or ('__dict__' in names and k in self.__dict__)
+    
+    def __getattr__(self, k):
+        """ Gets key if it exists, otherwise throws AttributeError.
             
-            >>> b = Bunch(foo=['bar', Bunch(lol=True)], hello=42)
-            >>> import yaml
-            >>> yaml.safe_dump(b, default_flow_style=True)
-            '{foo: [bar, {lol: true}], hello: 42}\\n'
+            >>> LazyBunch({'bar': 'baz'}).foo
+            Traceback (most recent call last):
+                ...
+            AttributeError: foo
         """
-        return dumper.represent_dict(data)
+        if k in type(self)._attr_names:
+            # an unset slot, eg. while unpickling; don't look for it in the keys
+            raise AttributeError(k)
+        try:
+            return self[k]
+        except KeyError:
+            raise AttributeError(k)
+    
+    __setattr__ = Bunch.__dict__['__setattr__']
+    __delattr__ = Bunch.__dict__['__delattr__']
     
-    def to_yaml(dumper, data):
-        """ Converts Bunch to a representation node.
+    def __eq__(self, other):
+        """ Compares the underlying data, without wrapping anything.
             
-            >>> b = Bunch(foo=['bar', Bunch(lol=True)], hello=42)
-            >>> import yaml
-            >>> yaml.dump(b, default_flow_style=True)
-            '!bunch.Bunch {foo: [bar, !bunch.Bunch {lol: true}], hello: 42}\\n'
+            >>> LazyBunch({'a': {'b': 1}}) == {'a': {'b': 1}}
+            True
+            >>> Bunch(a=Bunch(b=1)) == LazyBunch({'a': {'b': 1}})
+            True
         """
-        return dumper.represent_mapping(u('!bunch.Bunch'), data)
+        if isinstance(other, (LazyBunch, LazyList)):
+            other = other._data
+        return self._data == other
     
+    def __ne__(self, other):
+        return not self == other
     
-    yaml.add_constructor(u('!bunch'), from_yaml)
-    yaml.add_constructor(u('!bunch.Bunch'), from_yaml)
+    __hash__ = None
     
-    SafeRepresenter.add_representer(Bunch, to_yaml_safe)
-    SafeRepresenter.add_multi_representer(Bunch, to_yaml_safe)
+    def __reduce__(self):
+        return (type(self), (self._data,))
     
-    Representer.add_representer(Bunch, to_yaml)
-    Representer.add_multi_representer(Bunch, to_yaml)
+    def copy(self):
+        """ Makes a shallow copy of the underlying dictionary and wraps it.
+            
+            >>> a = LazyBunch({'foo': {'bar': 'baz'}})
+            >>> b = a.copy()
+            >>> b._data is a._data, b.foo == a.foo
+            (False, True)
+        """
+        return type(self)(dict(self._data))
     
+    def toDict(self, DictClass=dict):
+        """ Returns the wrapped dictionary if nothing in this tree was modified
+            through a view, otherwise a converted copy (see unbunchify).
+            
+            >>> b = LazyBunch({'foo': {'lol': True}})
+            >>> b.foo.lol = Bunch(cats=1)
+            >>> b.toDict()
+            {'foo': {'lol': {'cats': 1}}}
+        """
+        if DictClass is dict and not self._state[0]:
+            return self._data
+        return unbunchify(self._data, DictClass)
     
-    # Instance methods for YAML conversion
-    def toYAML(self, **options):
-        """ Serializes this Bunch to YAML, using ``yaml.safe_dump()`` if 
-            no ``Dumper`` is provided. See the PyYAML documentation for more info.
+    def __repr__(self):
+        """ Invertible string-form of the view: the class wrapping the data's repr.
             
-            >>> b = Bunch(foo=['bar', Bunch(lol=True)], hello=42)
-            >>> import yaml
-            >>> yaml.safe_dump(b, default_flow_style=True)
-            '{foo: [bar, {lol: true}], hello: 42}\\n'
-            >>> b.toYAML(default_flow_style=True)
-            '{foo: [bar, {lol: true}], hello: 42}\\n'
-            >>> yaml.dump(b, default_flow_style=True)
-            '!bunch.Bunch {foo: [bar, !bunch.Bunch {lol: true}], hello: 42}\\n'
-            >>> b.toYAML(Dumper=yaml.Dumper, default_flow_style=True)
-            '!bunch.Bunch {foo: [bar, !bunch.Bunch {lol: true}], hello: 42}\\n'
+            >>> LazyBunch({'foo': [{'bar': 1}]})
+            LazyBunch({'foo': [{'bar': 1}]})
         """
-        opts = dict(indent=2, default_flow_style=None)
-        opts.update(options)
-        if 'Dumper' not in opts:
-            return yaml.safe_dump(self, **opts)
+        return '%s(%r)' % (self.__class__.__name__, self._data)
+
+
+class LazyList(MutableSequence, metaclass=BunchABCType):
+    """ A zero-copy view over a list, created by LazyBunch for nested lists.
+        
+        Dicts and lists inside are wrapped on access and cached by index.
+        
+        >>> b = LazyBunch({'rows': [{'n': 1}, {'n': 2}]})
+        >>> b.rows[-1].n
+        2
+        >>> b.rows[1] is b.rows[-1]
+        True
+        >>> b.rows.insert(0, {'n': 0})
+        >>> [ row.n for row in b.rows ]
+        [0, 1, 2]
+    """
+    __slots__ = ('_data', '_cache', '_state', '_bunch')
+    
+    @classmethod
+    def _view(cls, data, state, BunchClass=LazyBunch):
+        self = cls.__new__(cls)
+        self._data = data
+        self._cache = {}
+        self._state = state
+        self._bunch = BunchClass
+        return self
+    
+    def __init__(self, data=None):
+        self._data = [] if data is None else data
+        self._cache = {}
+        self._state = [False]
+        self._bunch = LazyBunch
+    
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [ self[j] for j in range(*i.indices(len(self._data))) ]
+        if i < 0:
+            i += len(self._data)
+        try:
+            return self._cache[i]
+        except KeyError:
+            pass
+        value = self._data[i]
+        t = type(value)
+        if t is dict:
+            value = self._cache[i] = self._bunch._view(value, self._state)
+        elif t is list:
+            value = self._cache[i] = LazyList._view(value, self._state, self._bunch)
+        return value
+    
+    def __setitem__(self, i, v):
+        self._state[0] = True
+        if isinstance(i, slice):
+            self._cache.clear()
+            self._data[i] = [ _unwrap_lazy(x) for x in v ]
         else:
-            return yaml.dump(self, **opts)
-    
-    
-    def fromYAML(cls, *args, **kwargs):
-        """ Convenience method for loading YAML and getting Bunches.
-            
-            >>> document = '''
-            ... foo:
-            ... - bar
-            ... - lol: true
-            ... hello: 42
-            ... '''
-            >>> Bunch.fromYAML(document)
-            Bunch(foo=['bar', Bunch(lol=True)], hello=42)
-            
-            Uses ``yaml.load()`` by default, but accepts the following for convenience:
-            - ``safe=True`` for SafeLoader
-            - ``full=True`` for FullLoader (default)
-            - ``unsafe=True`` for UnsafeLoader
-            - ``all=True`` to load all documents (returning a list)
-            
-            >>> documents = '''
-            ... ---
-            ... - name: Hero
-            ...   level: 4
-            ...   hp: 34
-            ... - name: Goblin
-            ...   level: 1
-            ...   hp: 8
-            ... ---
-            ... - name: Orc
-            ...   level: 2
-            ...   hp: 12
-            ... '''
-            >>> Bunch.fromYAML(documents, all=True) #doctest: +NORMALIZE_WHITESPACE
-            [[Bunch(hp=34, level=4, name='Hero'), Bunch(hp=8, level=1, name='Goblin')],
-              [Bunch(hp=12, level=2, name='Orc')]]
-            
-            All other options are passed to PyYAML, so you can still specify a
-            custom loader with ``Bunch.fromYAML(data, Loader=CustomLoader)``. (Note that 
-            supplying a kw argument ``Loader`` overrides ``safe``, ``full``, and ``unsafe``.)
-            
-            See https://msg.pyyaml.org/load for more info.
+            if i < 0:
+                i += len(self._data)
+            self._data[i] = _unwrap_lazy(v)
+            self._cache.pop(i, None)
+    
+    def __delitem__(self, i):
+        del self._data[i]
+        self._state[0] = True
+        self._cache.clear()
+    
+    def insert(self, i, v):
+        self._state[0] = True
+        self._cache.clear()
+        self._data.insert(i, _unwrap_lazy(v))
+    
+    def __len__(self):
+        return len(self._data)
+    
+    def __getattr__(self, k):
+        # unset slots, eg. while unpickling
+        raise AttributeError(k)
+    
+    __eq__ = LazyBunch.__dict__['__eq__']
+    __ne__ = LazyBunch.__dict__['__ne__']
+    __hash__ = None
+    __reduce__ = LazyBunch.__dict__['__reduce__']
+    __repr__ = LazyBunch.__dict__['__repr__']
+    
+    def toList(self):
+        """ Returns the wrapped list if nothing in this tree was modified
+            through a view, otherwise a converted copy.
         """
-        method_name = 'full_load'
-        for prefix in ('safe', 'full', 'unsafe'):
-            # we want to pop all the prefix keys anyway, so put the test for Loader last
-            if kwargs.pop(prefix, False) and 'Loader' not in kwargs:
-                method_name = prefix+'_load'
-        
-        if kwargs.pop('all', False):
-            data = list(getattr(yaml, method_name+'_all')(*args, **kwargs))
+        if not self._state[0]:
+            return self._data
+        return unbunchify(self._data)
+
+
+def _unwrap_lazy(value):
+    """ Returns the data underneath a lazy view, so views never nest inside the
+        documents they wrap.
+    """
+    if isinstance(value, (LazyBunch, LazyList)):
+        return value._data
+    return value
+
+
+### Records
+
+class BunchRecord(MutableMapping, metaclass=BunchABCType):
+    """ Base class for the compact, fixed-field Bunches made by ``Bunch.record()``.
+        
+        Each field is stored in a ``__slots__`` entry instead of a per-instance
+        hash table. Keys that are not fields go into an overflow Bunch, created
+        only when needed, so any key can still be set.
+    """
+    __slots__ = ('_extra',)
+    _fields = ()        # field keys, in order
+    _slot_of = {}       # field key -> slot name
+    _BunchClass = Bunch # class of the overflow Bunch
+    
+    def __init__(self, *args, **kwargs):
+        self._extra = None
+        if len(args) > 1:
+            raise TypeError('expected at most 1 positional argument, got %d' % len(args))
+        if args:
+            other = args[0]
+            if isinstance(other, Mapping):
+                self._fill( (k, other[k]) for k in other )
+            else:
+                self._fill(other)
+        if kwargs:
+            self._fill(kwargs.items())
+    
+    def _fill(self, items):
+        slot_of = self._slot_of
+        for k, v in items:
+            slot = slot_of.get(k)
+            if slot is not None:
+                object.__setattr__(self, slot, v)
+            else:
+                self[k] = v
+    
+    @classmethod
+    def fromDict(cls, d):
+        """ Makes a record from a mapping, bunchifying the values. """
+        return cls( (k, bunchify(d[k], cls._BunchClass)) for k in d )
+    
+    def __getitem__(self, k):
+        slot = self._slot_of.get(k)
+        if slot is not None:
+            try:
+                return getattr(self, slot)
+            except AttributeError:
+                raise KeyError(k)
+        if self._extra is None:
+            raise KeyError(k)
+        return self._extra[k]
+    
+    def __setitem__(self, k, v):
+        slot = self._slot_of.get(k)
+        if slot is not None:
+            object.__setattr__(self, slot, v)
+        else:
+            if self._extra is None:
+                self._extra = self._BunchClass()
+            self._extra[k] = v
+    
+    def __delitem__(self, k):
+        slot = self._slot_of.get(k)
+        if slot is not None:
+            try:
+                object.__delattr__(self, slot)
+            except AttributeError:
+                raise KeyError(k)
+        elif self._extra is None:
+            raise KeyError(k)
         else:
-            data = getattr(yaml, method_name)(*args, **kwargs)
-        return bunchify(data, cls)
+            del self._extra[k]
+    
+    def __iter__(self):
+        for k in self._fields:
+            if hasattr(self, self._slot_of[k]):
+                yield k
+        if self._extra:
+            for k in self._extra:
+                yield k
+    
+    def __len__(self):
+        return sum(1 for _ in self)
+    
+    def __contains__(self, k):
+        slot = self._slot_of.get(k)
+        if slot is not None:
+            return hasattr(self, slot)
+        if self._extra is not None and k in self._extra:
+            return True
+        names = type(self)._attr_names
+        return (k in names and hasattr(self, k)) or ('__dict__' in names and k in self.__dict__)
     
-    Bunch.toYAML = toYAML
-    Bunch.fromYAML = classmethod(fromYAML)
+    def __getattr__(self, k):
+        if k in type(self)._attr_names:
+            # an unset field or slot
+            raise AttributeError(k)
+        try:
+            return self[k]
+        except KeyError:
+            raise AttributeError(k)
+    
+    __setattr__ = Bunch.__dict__['__setattr__']
+    __delattr__ = Bunch.__dict__['__delattr__']
     
-except ImportError:
-    pass
+    def __reduce__(self):
+        return (type(self), (dict(self),))
+    
+    def copy(self):
+        """ Makes a shallow copy of the record. """
+        return type(self)(self)
+    
+    def toDict(self, DictClass=dict):
+        """ Recursively converts the record into a dictionary (see unbunchify). """
+        return unbunchify(self, DictClass)
+    
+    def __repr__(self):
+        if not self:
+            return '%s()' % (self.__class__.__name__,)
+        args = ', '.join( ('%s=%r' % (k, self[k]) for k in self) )
+        return '%s(%s)' % (self.__class__.__name__, args)
+
+
+def _is_field_name(k):
+    """ True for ASCII identifiers that do not start with an underscore. """
+    return isinstance(k, str) and k.isidentifier() and k.isascii() and not k.startswith('_')
+
+def _record_class(name, fields, BunchClass=Bunch, module=None):
+    """ Builds a BunchRecord subclass called ``name`` with the given fields. """
+    fields = tuple(fields)
+    if len(set(fields)) != len(fields):
+        raise ValueError('Duplicate field in %r' % (fields,))
+    
+    # Fields that are not plain identifiers, or that would shadow a method,
+    # get a private slot name; they stay reachable as items, like Bunch keys
+    # named 'keys' or 'values'.
+    slot_of = {}
+    for i, k in enumerate(fields):
+        if _is_field_name(k) and k not in BunchRecord._attr_names:
+            slot_of[k] = k
+        else:
+            slot_of[k] = '_f%d' % i
+    
+    cls = BunchABCType(str(name), (BunchRecord,), {
+        '__slots__'   : tuple(slot_of[k] for k in fields),
+        '__module__'  : module or __name__,
+        '_fields'     : fields,
+        '_slot_of'    : slot_of,
+        '_BunchClass' : BunchClass,
+    })
+    return cls
+
+
+def record(cls, name, fields, module=None):
+    """ Creates a memory-compact Bunch class with a fixed set of fields.
+        
+        ``fields`` is an iterable of keys, or a sample mapping whose keys are used.
+        Instances keep the Bunch API (attribute and item access, toDict, toJSON,
+        toYAML, repr) but store fields in ``__slots__``, so they take a fraction of
+        the memory of a Bunch when you hold many objects with the same keys.
+        
+        >>> Row = Bunch.record('Row', ['id', 'name', 'items'])
+        >>> r = Row(id=1, name='widget')
+        >>> r.name, r['id']
+        ('widget', 1)
+        >>> r
+        Row(id=1, name='widget')
+        >>> 'items' in r, r.get('items')
+        (False, None)
+        >>> r['items'] = [1, 2]
+        >>> r['items'], r.toDict() == {'id': 1, 'name': 'widget', 'items': [1, 2]}
+        ([1, 2], True)
+        
+        Keys that are not fields are kept in an ordinary Bunch on the side.
+        
+        >>> r.colour = 'red'
+        >>> r
+        Row(id=1, name='widget', items=[1, 2], colour='red')
+        >>> r._extra
+        Bunch(colour='red')
+        
+        For pickling, pass ``module`` (the module where the class is stored)
+        unless it is created at the top level of the calling module.
+    """
+    if module is None:
+        try:
+            module = sys._getframe(1).f_globals.get('__name__', '__main__')
+        except (AttributeError, ValueError):
+            pass
+    return _record_class(name, fields, cls, module)
+
+Bunch.record = classmethod(record)
+del record
+
+
+### Bunch-like classes
+#
+# Bunch, LazyBunch, BunchRecord and the classes that bunch.frozen,
+# bunch.layered and bunch.snapshot register with _bunch_like() when they are
+# imported share the methods attached with _share(); most of those start out
+# as stand-ins (see Optional features, below).
+
+_BUNCH_LIKE = (Bunch, LazyBunch, BunchRecord)
+_shared = {}        # name -> (method, mutating), as last shared
+
+def _attach(cls, name, method, mutating, replacing=None):
+    if cls.__dict__.get(name) is not replacing:
+        return      # the class defines its own, or it was wrapped (eg. by bunch.instrument)
+    if mutating and not issubclass(cls, MutableMapping):
+        return
+    setattr(cls, name, method)
+
+def _share(name, method, mutating=False):
+    """ Attaches ``method`` as ``name`` to every Bunch-like class (only the
+        mutable ones if ``mutating``). It replaces the method last shared
+        under that name, but not one a class defines itself or one wrapped since.
+    """
+    replacing = _shared.get(name, (None,))[0]
+    _shared[name] = (method, mutating)
+    for cls in _BUNCH_LIKE:
+        _attach(cls, name, method, mutating, replacing)
+
+def _bunch_like(cls):
+    """ Adds a Bunch-like class defined in a submodule, with the shared methods. """
+    global _BUNCH_LIKE
+    if cls not in _BUNCH_LIKE:
+        _BUNCH_LIKE += (cls,)
+        for name, (method, mutating) in _shared.items():
+            _attach(cls, name, method, mutating)
+    yaml_support = _installed.get('bunch.yaml_support')
+    if yaml_support is not None:
+        yaml_support.register_types()
+    return cls
+
+
+### Paths
+
+_MISSING = object()
+_SEQUENCE_TYPES = (list, tuple)
+_path_cache = {}
+_MAXCACHE = 512
+
+def _compile_path(spec):
+    """ Splits a path into ``(key, index)`` steps; ``index`` is the key as an
+        int when it could also address a list.
+    """
+    if isinstance(spec, str):
+        keys = spec.split('.')
+    else:
+        keys = tuple(spec)
+    steps = []
+    for key in keys:
+        try:
+            index = int(key)
+        except (TypeError, ValueError):
+            index = None
+        steps.append( (key, index) )
+    return tuple(steps)
+
+def _walk(obj, steps, default):
+    for key, index in steps:
+        if isinstance(obj, dict):
+            obj = obj.get(key, _MISSING)
+        elif index is not None and isinstance(obj, _SEQUENCE_TYPES):
+            obj = obj[index] if -len(obj) <= index < len(obj) else _MISSING
+        elif isinstance(obj, Mapping):
+            obj = obj.get(key, _MISSING)
+        else:
+            return default
+        if obj is _MISSING:
+            return default
+    return obj
+
+
+class BunchPath(object):
+    """ A compiled accessor for one or more paths into nested mappings and
+        lists; create them with ``bunch.path()``.
+        
+        Like ``operator.itemgetter``, a single path returns its value, several
+        paths return a tuple.
+    """
+    __slots__ = ('specs', '_steps', '_single')
+    
+    def __init__(self, *specs):
+        if not specs:
+            raise TypeError('BunchPath needs at least one path')
+        self.specs = specs
+        self._steps = tuple(_compile_path(spec) for spec in specs)
+        self._single = self._steps[0] if len(specs) == 1 else None
+    
+    def __call__(self, obj, default=None):
+        """ Returns the value at the path in ``obj``, or ``default`` when any
+            step along it is missing.
+        """
+        if self._single is not None:
+            return _walk(obj, self._single, default)
+        return tuple(_walk(obj, steps, default) for steps in self._steps)
+    
+    get = __call__
+    
+    def many(self, objs, default=None):
+        """ Applies the accessor to each of ``objs``, returning a list.
+            
+            >>> rows = [Bunch(id=1, user=Bunch(name='Ada')), Bunch(id=2, user=None)]
+            >>> path('user.name').many(rows)
+            ['Ada', None]
+            >>> path('id', 'user.name').many(rows, '?')
+            [(1, 'Ada'), (2, '?')]
+        """
+        single = self._single
+        if single is not None:
+            return [ _walk(obj, single, default) for obj in objs ]
+        steps = self._steps
+        return [ tuple(_walk(obj, s, default) for s in steps) for obj in objs ]
+    
+    def set(self, obj, value, BunchClass=Bunch):
+        """ Sets the value at the path in ``obj``, creating missing mappings
+            along the way as ``BunchClass`` instances.
+        """
+        if self._single is None:
+            raise TypeError('Cannot set several paths at once: %r' % (self.specs,))
+        steps = self._single
+        for key, index in steps[:-1]:
+            if index is not None and isinstance(obj, _SEQUENCE_TYPES):
+                obj = obj[index]
+                continue
+            child = obj.get(key, _MISSING)
+            if child is _MISSING:
+                child = obj[key] = BunchClass()
+            obj = child
+        key, index = steps[-1]
+        if index is not None and isinstance(obj, list):
+            obj[index] = value
+        else:
+            obj[key] = value
+    
+    def __eq__(self, other):
+        return isinstance(other, BunchPath) and self.specs == other.specs
+    
+    def __ne__(self, other):
+        return not self == other
+    
+    def __hash__(self):
+        return hash(self.specs)
+    
+    def __repr__(self):
+        return 'path(%s)' % ', '.join(map(repr, self.specs))
+
+
+def path(*specs):
+    """ Returns a compiled accessor for the given paths, cached per path.
+        
+        A path is a dotted string, or a sequence of keys for keys that contain
+        dots or are not strings. Integer components also index into lists.
+        
+        >>> b = Bunch.fromDict({'user': {'address': {'city': 'Paris'}, 'tags': ['a', 'b']}})
+        >>> city = path('user.address.city')
+        >>> city(b)
+        'Paris'
+        >>> path('user.tags.-1')(b), path('user.zip')(b, 'n/a')
+        ('b', 'n/a')
+        >>> path('user.address.city', ('user', 'tags', 0))(b)
+        ('Paris', 'a')
+        >>> path('user.address.city') is city
+        True
+    """
+    try:
+        accessor = _path_cache[specs]
+    except KeyError:
+        accessor = BunchPath(*specs)
+        if len(_path_cache) >= _MAXCACHE:
+            _path_cache.clear()
+        _path_cache[specs] = accessor
+    except TypeError:
+        # an unhashable (eg. list) spec
+        accessor = BunchPath(*specs)
+    return accessor
+
+
+def get_path(self, spec, default=None):
+    """ Returns the value at a dotted path, or ``default`` if any step along
+        it is missing.
+        
+        >>> b = Bunch.fromDict({'user': {'address': {'city': 'Paris'}}})
+        >>> b.get_path('user.address.city')
+        'Paris'
+        >>> b.get_path('user.phone.mobile', 'unknown')
+        'unknown'
+        
+        See ``bunch.path`` for the path syntax.
+    """
+    return path(spec)(self, default)
+
+def set_path(self, spec, value):
+    """ Sets the value at a dotted path, creating missing Bunches on the way.
+        
+        >>> b = Bunch()
+        >>> b.set_path('user.address.city', 'Paris')
+        >>> b
+        Bunch(user=Bunch(address=Bunch(city='Paris')))
+    """
+    path(spec).set(self, value, type(self))
+
+_share('get_path', get_path)
+Bunch.set_path = set_path
+del get_path, set_path
+
+
+### Optional features
+#
+# Everything beyond the classes above lives in submodules that are not
+# imported with bunch: the JSON and YAML support (bunch.json_support,
+# bunch.yaml_support), the asyncio readers (bunch.aio), and the other
+# Bunch types and tools. Each method they provide starts out as a stand-in
+# that imports its module and installs the real methods when first called;
+# the classes and functions exported from bunch are served by the module
+# __getattr__. PyYAML is also told about Bunches as soon as the application
+# imports it, so ``yaml.dump()`` and the ``!bunch`` tags work without calling
+# any Bunch method first.
+
+# module -> (methods shared by the Bunch-like classes, Bunch classmethods)
+_FEATURES = {
+    'bunch.json_support': (('toJSON',), ('fromJSON', 'iterJSONLines')),
+    'bunch.yaml_support': (('toYAML',), ('fromYAML',)),
+    'bunch.aio':          ((), ('afromJSON', 'aiterJSONLines')),
+    'bunch.snapshot':     (('dump_snapshot',), ('load_snapshot',)),
+    'bunch.tracked':      (('diff', 'apply_patch'), ()),
+    'bunch.fingerprint':  (('fingerprint',), ()),
+    'bunch.flat':         (('iterflatten', 'flatten'), ('unflatten',)),
+}
+_MUTATING = frozenset(['apply_patch'])
+
+# name -> the module that defines it, for names served by __getattr__;
+# the JSON and YAML helpers used to be defined in this module
+_LAZY_NAMES = dict(
+    [ (name, 'bunch.frozen') for name in ('FrozenBunch',) ] +
+    [ (name, 'bunch.layered') for name in ('LayeredBunch',) ] +
+    [ (name, 'bunch.frame') for name in ('BunchFrame',) ] +
+    [ (name, 'bunch.snapshot') for name in ('SnapshotBunch', 'SnapshotList') ] +
+    [ (name, 'bunch.tracked') for name in ('TrackedBunch',) ] +
+    [ (name, 'bunch.cache') for name in ('CachedBunch',) ] +
+    [ (name, 'bunch.index') for name in ('BunchIndex',) ] +
+    [ (name, 'bunch.schema') for name in ('Schema', 'Field', 'SchemaError') ] +
+    [ (name, 'bunch.json_support') for name in ('json_default', 'toJSON', 'fromJSON', 'iterJSONLines') ] +
+    [ (name, 'bunch.yaml_support') for name in ('from_yaml', 'to_yaml_safe', 'to_yaml', 'lazy_to_yaml',
+                                                'yaml_class', 'bunch_loader', 'toYAML', 'fromYAML') ]
+)
+
+_installed = {}     # module name -> module, once its methods are installed
+_standins = {}      # Bunch classmethod name -> its stand-in
+
+def _install(name):
+    """ Imports a submodule, once, installing its methods in place of the
+        stand-ins (leaving alone any that were wrapped since).
+    """
+    module = _installed.get(name)
+    if module is None:
+        __import__(name)
+        module = sys.modules[name]
+        methods, classmethods = _FEATURES.get(name, ((), ()))
+        for method in methods:
+            _share(method, getattr(module, method), method in _MUTATING)
+        for method in classmethods:
+            if Bunch.__dict__.get(method) is _standins[method]:
+                setattr(Bunch, method, classmethod(getattr(module, method)))
+        _installed[name] = module
+    return module
+
+def _install_json():
+    return _install('bunch.json_support')
+
+def _install_yaml():
+    """ Registers Bunch with PyYAML; raises ImportError without PyYAML. """
+    return _install('bunch.yaml_support')
+
+def _install_aio():
+    return _install('bunch.aio')
+
+
+def _deferred(module, name):
+    """ Returns a stand-in for the method ``name`` of ``module``, which
+        installs the real methods and calls the real one.
+    """
+    def method(self, *args, **kwargs):
+        return getattr(_install(module), name)(self, *args, **kwargs)
+    method.__name__ = method.__qualname__ = name
+    method.__doc__ = 'See ``%s.%s``, which is imported on first use.' % (module, name)
+    return method
+
+for _module, (_methods, _classmethods) in _FEATURES.items():
+    for _name in _methods:
+        _share(_name, _deferred(_module, _name), _name in _MUTATING)
+    for _name in _classmethods:
+        _standins[_name] = classmethod(_deferred(_module, _name))
+        setattr(Bunch, _name, _standins[_name])
+del _module, _methods, _classmethods, _name
+
+
+def __getattr__(name):
+    module = _LAZY_NAMES.get(name)
+    if module is None:
+        raise AttributeError('module %r has no attribute %r' % (__name__, name))
+    return getattr(_install(module), name)
+
+
+class _YAMLImportHook(object):
+    """ A ``sys.meta_path`` finder that calls ``_install_yaml`` once the
+        application has imported ``yaml``, then removes itself.
+    """
+    
+    def find_spec(self, name, path=None, target=None):
+        if name != 'yaml':
+            return None
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+        for finder in sys.meta_path:
+            find_spec = getattr(finder, 'find_spec', None)
+            spec = find_spec and find_spec(name, path, target)
+            if spec is not None:
+                break
+        else:
+            return None
+        loader = spec.loader
+        if loader is None or not hasattr(loader, 'exec_module'):
+            return spec
+        exec_module = loader.exec_module
+        def exec_and_install(module):
+            exec_module(module)
+            if 'bunch.yaml_support' not in sys.modules:  # else it is importing yaml itself
+                _install_yaml()
+        loader.exec_module = exec_and_install
+        return spec
+
+if 'yaml' in sys.modules:
+    try:
+        _install_yaml()
+    except ImportError:
+        pass
+else:
+    sys.meta_path.insert(0, _YAMLImportHook())
 
 
 if __name__ == "__main__":
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+""" asyncio decoding of JSON and JSON Lines into Bunches.
+
+    These are installed as ``Bunch.afromJSON`` and ``Bunch.aiterJSONLines``.
+    They read from an ``asyncio.StreamReader`` (anything with an awaitable
+    ``read(n)``) or from any async iterator of ``bytes`` chunks, such as an
+    HTTP client's body stream.
+"""
+
+import asyncio
+import functools
+import json
+
+from bunch.json_support import _with_hook
+
+__all__ = ('afromJSON', 'aiterJSONLines')
+
+
+async def _chunks(source, chunk_size):
+    if hasattr(source, 'read'):
+        while True:
+            chunk = await source.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+    else:
+        async for chunk in source:
+            yield chunk
+
+
+async def _decode(decode, data, offload_size, executor, options):
+    """ Decodes on the loop, or in ``executor`` if one is given and ``data`` is
+        at least ``offload_size`` characters, so a large record does not block
+        the loop.
+    """
+    if executor is not None and len(data) >= offload_size:
+        # a JSONDecoder cannot be pickled, so process pools get json.loads
+        loads = functools.partial(json.loads, **options)
+        return await asyncio.get_running_loop().run_in_executor(executor, loads, data)
+    return decode(data)
+
+
+async def afromJSON(cls, source, chunk_size=1 << 16, executor=None, offload_size=1 << 20, **options):
+    """ Reads a JSON document from a stream and decodes it into Bunches.
+
+        >>> import asyncio
+        >>> from bunch import Bunch
+        >>> async def main():
+        ...     reader = asyncio.StreamReader()
+        ...     reader.feed_data(b'{"user": {"name": "Ada"},')
+        ...     reader.feed_data(b' "tags": ["x"]}')
+        ...     reader.feed_eof()
+        ...     return await Bunch.afromJSON(reader)
+        >>> asyncio.run(main())
+        Bunch(tags=['x'], user=Bunch(name='Ada'))
+
+        As with ``Bunch.fromJSON``, an ``object_hook`` replaces the Bunches.
+
+        >>> async def main():
+        ...     reader = asyncio.StreamReader()
+        ...     reader.feed_data(b'{"user": {"name": "Ada"}}')
+        ...     reader.feed_eof()
+        ...     return await Bunch.afromJSON(reader, object_hook=len)
+        >>> asyncio.run(main())
+        1
+
+        The body is read ``chunk_size`` bytes at a time, letting other tasks
+        run while it arrives. Given an ``executor``, documents of
+        ``offload_size`` characters or more are decoded there instead of on
+        the loop. Decoding holds the GIL, so only a
+        ``concurrent.futures.ProcessPoolExecutor`` keeps the loop responsive;
+        the result is pickled back, so ``cls`` must be importable. Other
+        keyword options are passed to ``json.loads()``.
+    """
+    parts = []
+    async for chunk in _chunks(source, chunk_size):
+        parts.append(chunk)
+    _with_hook(cls, options)
+    decode = json.JSONDecoder(**options).decode
+    data = b''.join(parts).decode('utf-8')
+    return await _decode(decode, data, offload_size, executor, options)
+
+
+async def aiterJSONLines(cls, source, chunk_size=1 << 16, executor=None, offload_size=1 << 20, **options):
+    """ Async generator over the records of a JSON Lines stream, each decoded
+        into Bunches as soon as its line is complete. Blank lines are skipped.
+
+        >>> import asyncio
+        >>> from bunch import Bunch
+        >>> async def body():
+        ...     yield b'{"id": 1}\\n{"id"'
+        ...     yield b': 2}\\n\\n{"id": 3}'
+        >>> async def main():
+        ...     return [ b.id async for b in Bunch.aiterJSONLines(body()) ]
+        >>> asyncio.run(main())
+        [1, 2, 3]
+        >>> async def main():
+        ...     return [ r async for r in Bunch.aiterJSONLines(body(), object_hook=dict) ]
+        >>> asyncio.run(main())
+        [{'id': 1}, {'id': 2}, {'id': 3}]
+
+        Control returns to the event loop after every record, so a long body
+        does not stall other tasks. Given an ``executor``, records of
+        ``offload_size`` characters or more are decoded there, as with
+        ``afromJSON``. Other keyword options are passed to
+        ``json.JSONDecoder``.
+    """
+    _with_hook(cls, options)
+    decode = json.JSONDecoder(**options).decode
+    parts = []
+    async for chunk in _chunks(source, chunk_size):
+        cut = chunk.rfind(b'\n')
+        if cut < 0:
+            parts.append(chunk)
+            continue
+        parts.append(chunk[:cut])
+        lines = b''.join(parts).split(b'\n')
+        parts = [chunk[cut + 1:]]
+        for line in lines:
+            if line and not line.isspace():
+                record = await _decode(decode, line.decode('utf-8'), offload_size, executor, options)
+                await asyncio.sleep(0)
+                yield record
+    line = b''.join(parts)
+    if line and not line.isspace():
+        yield await _decode(decode, line.decode('utf-8'), offload_size, executor, options)
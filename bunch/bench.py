@@ -0,0 +1,593 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+""" Benchmarks for Bunch hot paths.
+
+    Run with ``python -m bunch.bench``. Each operation is timed on Bunches and
+    on the equivalent plain-``dict`` code, over synthetic documents that are
+    flat, wide or deep, small or large::
+
+        python -m bunch.bench --json results.json
+        python -m bunch.bench --baseline results.json --threshold 0.1
+
+    With ``--baseline``, the run fails (exit status 1) if any case got slower
+    than the saved results by more than the threshold.
+"""
+from __future__ import print_function
+
+import argparse
+import gc
+import hashlib
+import json
+import pickle
+import platform
+import subprocess
+import sys
+import timeit
+import tracemalloc
+
+import bunch
+from bunch import Bunch, bunchify, unbunchify
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+
+class Bunch102(dict):
+    """ Attribute access exactly as shipped in bunch 1.0.2, kept as the
+        baseline the current implementation is measured against.
+    """
+
+    def __contains__(self, k):
+        return dict.__contains__(self, k) or hasattr(self, k)
+
+    def __getattr__(self, k):
+        try:
+            return object.__getattribute__(self, k)
+        except AttributeError:
+            try:
+                return self[k]
+            except KeyError:
+                raise AttributeError(k)
+
+    def __setattr__(self, k, v):
+        try:
+            object.__getattribute__(self, k)
+        except AttributeError:
+            try:
+                self[k] = v
+            except KeyError:
+                raise AttributeError(k)
+        else:
+            object.__setattr__(self, k, v)
+
+    def __delattr__(self, k):
+        try:
+            object.__getattribute__(self, k)
+        except AttributeError:
+            try:
+                del self[k]
+            except KeyError:
+                raise AttributeError(k)
+        else:
+            object.__delattr__(self, k)
+
+
+ATTRIBUTE_CASES = (
+    ('getattr', 'b.foo'),
+    ('setattr', 'b.foo = 1'),
+    ('delattr', 'b.tmp = 1; del b.tmp'),
+    ('contains-hit', "'foo' in b"),
+    ('contains-miss', "'nope' in b"),
+)
+
+
+def best_of(stmt, setup='pass', namespace=None, number=None, repeat=5, min_time=0.05):
+    """ Returns the best time per loop, in nanoseconds, for ``stmt``.
+
+        Without ``number``, the loop count is raised until one batch takes at
+        least ``min_time`` seconds.
+
+        >>> best_of('x + 1', 'x = 1', number=10, repeat=1) > 0
+        True
+    """
+    timer = timeit.Timer(stmt, setup, globals=namespace)
+    if number is None:
+        number = 1
+        while timer.timeit(number) < min_time:
+            number *= 10
+    return min(timer.repeat(repeat=repeat, number=number)) / number * 1e9
+
+
+def bench_attribute_access(number=100000, repeat=5):
+    """ Times attribute reads, writes, deletes and membership tests on
+        ``Bunch`` against the 1.0.2 implementation.
+
+        Returns a list of ``(case, baseline_ns, current_ns)`` tuples.
+    """
+    results = []
+    for case, stmt in ATTRIBUTE_CASES:
+        timings = []
+        for cls in (Bunch102, Bunch):
+            namespace = { 'b': cls(foo=1, bar=2) }
+            timings.append(best_of(stmt, namespace=namespace, number=number, repeat=repeat))
+        results.append( (case,) + tuple(timings) )
+    return results
+
+
+RECORD_FIELDS = ('id', 'name', 'price', 'qty', 'active')
+
+
+def memory_per_million(factory, n=100000):
+    """ Returns the bytes allocated to hold a million objects built by
+        ``factory(i)``, extrapolated from ``n`` of them.
+
+        >>> memory_per_million(lambda i: [i], n=1000) > 0
+        True
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        held = [ factory(i) for i in range(n) ]
+        used = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+    del held
+    return used * (1000000.0 / n)
+
+
+def bench_record_memory(n=100000):
+    """ Measures memory per million rows for dicts, Bunches and records with
+        the same five fields. The field values are built beforehand, so only
+        the containers are counted. Returns a list of ``(kind, bytes)`` tuples.
+    """
+    Row = Bunch.record('Row', RECORD_FIELDS)
+    rows = [ dict(zip(RECORD_FIELDS, (i, 'item%d' % i, i * 0.5, i % 7, bool(i % 2))))
+             for i in range(n) ]
+    return [
+        ('dict',   memory_per_million(lambda i: dict(rows[i]), n)),
+        ('Bunch',  memory_per_million(lambda i: Bunch(rows[i]), n)),
+        ('record', memory_per_million(lambda i: Row(rows[i]), n)),
+    ]
+
+
+def bench_transfer(shape='wide', size=2000, repeat=5):
+    """ Times the per-task cost of sending a tree to a worker process: a
+        pickle round trip of the Bunch itself, against one of a view over the
+        tree published once with ``bunch.snapshot.SharedSnapshot``. Returns a
+        list of ``(kind, ns)`` tuples.
+    """
+    from bunch.snapshot import SharedSnapshot
+    b = bunchify(make_document(shape, size))
+    results = [ ('pickle', best_of('pickle.loads(pickle.dumps(b, -1))',
+                                   namespace={ 'pickle': pickle, 'b': b }, repeat=repeat)) ]
+    with SharedSnapshot(b) as shared:
+        view = shared.bunch
+        results.append( ('shared', best_of('pickle.loads(pickle.dumps(view, -1))',
+                                           namespace={ 'pickle': pickle, 'view': view }, repeat=repeat)) )
+        del view
+    return results
+
+
+def bench_fingerprint(size=2000, repeat=5):
+    """ Times keying a wide tree for a cache: the digest of its sorted JSON,
+        a fingerprint() of a fresh Bunch, of an unchanged FrozenBunch, and of
+        a TrackedBunch after a single change. A fresh Bunch is checked for
+        non-string keys and then encoded as sorted JSON, so it costs more than
+        the JSON digest; the gains are in the remembered trees, which only
+        re-encode what changed. Returns a list of ``(kind, ns)`` tuples.
+    """
+    from bunch import FrozenBunch, TrackedBunch
+    d = make_document('wide', size)
+    b = bunchify(d)
+    frozen = FrozenBunch.fromDict(d)
+    frozen.fingerprint()
+    tracked = TrackedBunch.fromDict(d)
+    tracked.fingerprint()
+    return [
+        ('json digest', best_of('json_digest(b)', namespace={ 'json_digest': json_digest, 'b': b }, repeat=repeat)),
+        ('fingerprint', best_of('b.fingerprint()', namespace={ 'b': b }, repeat=repeat)),
+        ('fingerprint, frozen', best_of('f.fingerprint()', namespace={ 'f': frozen }, repeat=repeat)),
+        ('fingerprint, tracked', best_of('t.k0.id += 1; t.fingerprint()',
+                                         namespace={ 't': tracked }, repeat=repeat)),
+    ]
+
+
+ORDER_SCHEMA = {
+    'id': int,
+    'customer': { 'name': str, 'email': str },
+    'items': [{ 'sku': str, 'qty': int, 'price': float, 'gift': bool }],
+    'notes': [str],
+}
+
+def make_order(i):
+    return {
+        'id': i,
+        'customer': { 'name': 'c%d' % i, 'email': 'c%d@example.com' % i },
+        'items': [ { 'sku': 's%d' % j, 'qty': j, 'price': j * 1.5, 'gift': bool(j % 2) } for j in range(5) ],
+        'notes': ['leave at door'],
+    }
+
+
+def validate_after(value, spec):
+    """ The convert-then-validate baseline for schemas: a second pass over an
+        already bunchified tree that walks the declaration, checking and
+        coercing values in place.
+    """
+    from bunch.schema import Field, SchemaError, _COERCIONS, _MISSING
+    if isinstance(spec, dict):
+        if not isinstance(value, dict):
+            raise SchemaError('expected a mapping')
+        for key, sub in spec.items():
+            field = sub if isinstance(sub, Field) else Field(sub)
+            if key not in value:
+                if field.default is not _MISSING:
+                    value[key] = bunchify(field.default)
+                elif field.required:
+                    raise SchemaError('missing required key', (key,))
+                continue
+            value[key] = validate_after(value[key], field.schema)
+        return value
+    if isinstance(spec, list):
+        if not isinstance(value, list):
+            raise SchemaError('expected a list')
+        return [ validate_after(item, spec[0]) for item in value ]
+    if spec is object or type(value) is spec:
+        return value
+    return _COERCIONS[spec](value)
+
+
+def bench_schema(n=2000, repeat=5):
+    """ Times building ``n`` orders with a compiled schema against bunchify
+        followed by a separate validation pass. Returns a list of
+        ``(kind, ns)`` tuples, per order.
+    """
+    from bunch.schema import Schema
+    docs = [ make_order(i) for i in range(n) ]
+    schema = Schema([ORDER_SCHEMA])
+    namespace = { 'docs': docs, 'schema': schema, 'spec': [ORDER_SCHEMA],
+                  'bunchify': bunchify, 'validate_after': validate_after }
+    return [
+        ('bunchify', best_of('bunchify(docs)', namespace=namespace, repeat=repeat) / n),
+        ('bunchify + validate', best_of('validate_after(bunchify(docs), spec)',
+                                        namespace=namespace, repeat=repeat) / n),
+        ('bunchify(schema=)', best_of('bunchify(docs, schema=schema)', namespace=namespace, repeat=repeat) / n),
+    ]
+
+
+def naive_flatten(it, sep='.', prefix=''):
+    """ Recursive flatten without key escaping, the baseline for
+        Bunch.flatten().
+    """
+    flat = {}
+    for key, value in (it.items() if isinstance(it, dict) else enumerate(it)):
+        key = '%s%s' % (prefix, key)
+        if value and isinstance(value, (dict, list)):
+            flat.update(naive_flatten(value, sep, key + sep))
+        else:
+            flat[key] = value
+    return flat
+
+
+def naive_unflatten(flat, sep='.'):
+    """ Splits every key and walks it from the root, then recursively turns
+        the levels keyed by digits into lists; the baseline for
+        Bunch.unflatten().
+    """
+    root = {}
+    for key, value in flat.items():
+        parts = key.split(sep)
+        node = root
+        for part in parts[:-1]:
+            node = node.setdefault(part, {})
+        node[parts[-1]] = value
+    return _naive_nest(root)
+
+def _naive_nest(it):
+    if not isinstance(it, dict) or not it:
+        return it
+    if all( key.isdigit() for key in it ):
+        return [ _naive_nest(it[key]) for key in sorted(it, key=int) ]
+    return Bunch( (key, _naive_nest(value)) for key, value in it.items() )
+
+
+def bench_flatten(leaves=1000000, repeat=3):
+    """ Times flattening a wide tree of about ``leaves`` leaf values to dotted
+        keys and rebuilding it, against the naive recursive versions. Returns
+        a list of ``(kind, ns)`` tuples, per leaf.
+    """
+    b = bunchify(make_document('wide', leaves // 6))    # each record has 6 leaves
+    flat = b.flatten()
+    n = len(flat)
+    namespace = { 'b': b, 'flat': flat, 'Bunch': Bunch,
+                  'naive_flatten': naive_flatten, 'naive_unflatten': naive_unflatten }
+    return [ (kind, best_of(stmt, namespace=namespace, number=1, repeat=repeat) / n)
+             for kind, stmt in (('naive flatten', 'naive_flatten(b)'),
+                                ('flatten', 'b.flatten()'),
+                                ('naive unflatten', 'naive_unflatten(flat)'),
+                                ('unflatten', 'Bunch.unflatten(flat)')) ]
+
+
+IMPORT_CASES = (
+    ('bunch', 'import bunch'),
+    # what importing bunch costs with every optional submodule loaded
+    ('bunch + all features', 'import bunch; [ bunch._install(m) for m in sorted(bunch._FEATURES) ]; '
+                             'import bunch.frozen, bunch.layered, bunch.frame, bunch.cache, bunch.index, bunch.schema'),
+    # 1.0.2 itself was small, but imported these eagerly
+    ('1.0.2 dependencies', 'import collections.abc, json, yaml'),
+)
+
+
+def import_time(code, repeat=5):
+    """ Returns the best cumulative ``python -X importtime`` total, in
+        microseconds, over the top-level imports made by ``code`` in a fresh
+        interpreter.
+
+        >>> import_time('import bunch', repeat=1) > 0
+        True
+    """
+    best = None
+    for _ in range(repeat):
+        # the marker separates the interpreter's own startup imports
+        marker = 'bunch.bench: start'
+        err = subprocess.run([sys.executable, '-X', 'importtime', '-c',
+                              'import sys; sys.stderr.write(%r + "\\n"); %s' % (marker, code)],
+                             stderr=subprocess.PIPE, universal_newlines=True, check=True).stderr
+        total = 0
+        for line in err.split(marker, 1)[-1].splitlines():
+            # "import time: self [us] | cumulative | <indent>name"; top level has no indent
+            parts = line.split('|')
+            if len(parts) == 3 and parts[2].startswith(' ') and not parts[2].startswith('  '):
+                try:
+                    total += int(parts[1])
+                except ValueError:
+                    pass    # the header
+        best = total if best is None else min(best, total)
+    return best
+
+
+def bench_import(repeat=5):
+    """ Times ``import bunch`` in fresh interpreters, alone and with every
+        submodule it defers until first use loaded, against the modules 1.0.2
+        imported with itself. Returns a list of ``(kind, us)`` tuples.
+    """
+    return [ (kind, import_time(code, repeat)) for kind, code in IMPORT_CASES ]
+
+
+### Workloads
+
+def _leaf(i):
+    return { 'id': i, 'name': 'item%d' % i, 'price': i * 0.25, 'tags': ['a', 'b'], 'active': bool(i % 2) }
+
+
+def make_document(shape, size):
+    """ Builds a plain-dict document of the given shape, always with a
+        top-level key ``k0``:
+
+        - ``flat``: ``size`` scalar values
+        - ``wide``: ``size`` small records
+        - ``deep``: a chain of ``size`` nested levels
+
+        >>> sorted(make_document('flat', 3))
+        ['k0', 'k1', 'k2']
+        >>> make_document('deep', 2)['child']['k0']
+        2
+    """
+    if shape == 'flat':
+        return dict( ('k%d' % i, i) for i in range(size) )
+    if shape == 'wide':
+        return dict( ('k%d' % i, _leaf(i)) for i in range(size) )
+    if shape == 'deep':
+        doc = { 'k0': size }
+        for i in range(size - 1, 0, -1):
+            doc = { 'k0': i, 'name': 'level%d' % i, 'child': doc }
+        return doc
+    raise ValueError('Unknown document shape %r' % (shape,))
+
+
+WORKLOADS = (
+    ('flat-small', 'flat', 10),
+    ('flat-large', 'flat', 10000),
+    ('wide-small', 'wide', 10),
+    ('wide-large', 'wide', 2000),
+    ('deep-small', 'deep', 10),
+    ('deep-large', 'deep', 100),    # deep, but within repr()'s recursion limit
+)
+
+
+def json_digest(it):
+    """ The usual cache key: a digest of the sorted JSON dump, the baseline
+        for fingerprint().
+    """
+    return hashlib.sha256(json.dumps(it, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def copy_tree(it):
+    """ Recursive plain-dict copy, the baseline for bunchify/unbunchify. """
+    if isinstance(it, dict):
+        return dict( (k, copy_tree(v)) for k, v in it.items() )
+    if isinstance(it, (list, tuple)):
+        return type(it)( copy_tree(v) for v in it )
+    return it
+
+
+# (name, Bunch statement, dict baseline statement, needs yaml)
+CASES = (
+    ('getattr',    'b.k0',                          "d['k0']",                      False),
+    ('setattr',    'b.k0 = 1',                      "d['k0'] = 1",                  False),
+    ('bunchify',   'bunchify(d)',                   'copy_tree(d)',                 False),
+    ('unbunchify', 'unbunchify(b)',                 'copy_tree(d)',                 False),
+    ('toJSON',     'b.toJSON()',                    'json.dumps(d)',                False),
+    ('fromJSON',   'Bunch.fromJSON(j)',             'json.loads(j)',                False),
+    ('toYAML',     'b.toYAML()',                    'yaml.dump(d, Dumper=Dumper)',  True),
+    ('fromYAML',   'Bunch.fromYAML(y, safe=True)',  'yaml.load(y, Loader=Loader)',  True),
+    ('repr',       'repr(b)',                       'repr(d)',                      False),
+    ('copy',       'b.copy()',                      'd.copy()',                     False),
+    ('add',        'b + other',                     'dict(d, **other)',             False),
+    ('pickle',     'pickle.dumps(b, -1)',           'pickle.dumps(d, -1)',          False),
+    ('unpickle',   'pickle.loads(pb)',              'pickle.loads(pd)',             False),
+    ('fingerprint', 'b.fingerprint()',              'json_digest(d)',               False),
+)
+
+
+def run_suite(cases=None, workloads=None, repeat=3, min_time=0.05, out=None):
+    """ Runs every case on every workload, or only those whose names contain
+        one of the ``cases`` / ``workloads`` substrings.
+
+        Returns a dict mapping ``'<case>/<workload>'`` to
+        ``{'bunch_ns': ..., 'dict_ns': ..., 'ratio': ...}``, where ratio is the
+        Bunch time over the dict time.
+
+        >>> results = run_suite(['getattr'], ['flat-small'], repeat=1, min_time=0.001)
+        >>> sorted(results['getattr/flat-small'])
+        ['bunch_ns', 'dict_ns', 'ratio']
+    """
+    results = {}
+    for workload, shape, size in WORKLOADS:
+        if workloads and not any(w in workload for w in workloads):
+            continue
+        d = make_document(shape, size)
+        namespace = {
+            'd': d, 'b': bunchify(d), 'j': json.dumps(d), 'other': { 'extra': 1, 'k0': 2 },
+            'json': json, 'Bunch': Bunch, 'bunchify': bunchify, 'unbunchify': unbunchify,
+            'copy_tree': copy_tree, 'json_digest': json_digest, 'pickle': pickle,
+            'pd': pickle.dumps(d, -1), 'pb': pickle.dumps(bunchify(d), -1),
+        }
+        if yaml is not None:
+            namespace.update(
+                yaml=yaml, y=yaml.safe_dump(d),
+                Loader=getattr(yaml, 'CSafeLoader', yaml.SafeLoader),
+                Dumper=getattr(yaml, 'CSafeDumper', yaml.SafeDumper),
+            )
+        for case, bunch_stmt, dict_stmt, needs_yaml in CASES:
+            if cases and not any(c in case for c in cases):
+                continue
+            if needs_yaml and yaml is None:
+                continue
+            # some statements mutate, so give each case its own top-level copies
+            ns = dict(namespace, d=dict(d), b=Bunch(namespace['b']))
+            bunch_ns = best_of(bunch_stmt, namespace=ns, repeat=repeat, min_time=min_time)
+            dict_ns = best_of(dict_stmt, namespace=ns, repeat=repeat, min_time=min_time)
+            key = '%s/%s' % (case, workload)
+            results[key] = { 'bunch_ns': bunch_ns, 'dict_ns': dict_ns, 'ratio': bunch_ns / dict_ns }
+            if out is not None:
+                print('%-24s %14.1f %14.1f %8.2fx' % (key, bunch_ns, dict_ns, bunch_ns / dict_ns), file=out)
+    return results
+
+
+def compare(results, baseline, threshold=0.1, metric='bunch_ns'):
+    """ Compares two result sets case by case. Returns a list of
+        ``(key, baseline, current, change)`` for every case whose ``metric`` grew
+        by more than ``threshold`` (a fraction: 0.1 is 10% slower).
+
+        >>> old = {'getattr/flat-small': {'bunch_ns': 100.0, 'ratio': 2.0}}
+        >>> new = {'getattr/flat-small': {'bunch_ns': 125.0, 'ratio': 2.1}}
+        >>> compare(new, old)
+        [('getattr/flat-small', 100.0, 125.0, 0.25)]
+        >>> compare(new, old, metric='ratio')
+        []
+    """
+    regressions = []
+    for key in sorted(results):
+        if key not in baseline:
+            continue
+        before, after = baseline[key][metric], results[key][metric]
+        change = (after - before) / before
+        if change > threshold:
+            regressions.append( (key, before, after, change) )
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m bunch.bench',
+                                     description='Benchmarks for Bunch hot paths.')
+    parser.add_argument('-c', '--case', action='append',
+                        help='only run cases whose name contains this (repeatable)')
+    parser.add_argument('-w', '--workload', action='append',
+                        help='only run workloads whose name contains this (repeatable)')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='timing repeats per measurement; the best is kept')
+    parser.add_argument('--min-time', type=float, default=0.05,
+                        help='minimum seconds per timed batch')
+    parser.add_argument('--json', metavar='PATH',
+                        help="write machine-readable results to PATH ('-' for stdout)")
+    parser.add_argument('--baseline', metavar='PATH',
+                        help='compare against results saved with --json')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='allowed slowdown against the baseline, as a fraction')
+    parser.add_argument('--metric', choices=('bunch_ns', 'ratio'), default='bunch_ns',
+                        help='compare raw Bunch times, or times relative to the dict '
+                             'baseline (steadier across machines)')
+    parser.add_argument('--extras', action='store_true',
+                        help='also compare attribute access with 1.0.2, measure record memory, '
+                             'time sending a tree to workers, keying it for a cache, schema '
+                             'validation, flattening 1M leaves and importing bunch')
+    args = parser.parse_args(argv)
+
+    report = sys.stderr if args.json == '-' else sys.stdout
+    print('%-24s %14s %14s %9s' % ('case/workload', 'Bunch (ns)', 'dict (ns)', 'ratio'), file=report)
+    results = run_suite(args.case, args.workload, args.repeat, args.min_time, out=report)
+
+    if args.extras:
+        print(file=report)
+        print('%-24s %14s %14s %9s' % ('attribute', '1.0.2 (ns)', 'now (ns)', 'speedup'), file=report)
+        for case, old, new in bench_attribute_access():
+            print('%-24s %14.1f %14.1f %8.2fx' % (case, old, new, old / new), file=report)
+        print(file=report)
+        print('%-24s %14s' % ('1M rows', 'MiB'), file=report)
+        for kind, used in bench_record_memory():
+            print('%-24s %14.1f' % (kind, used / 2.0**20), file=report)
+        print(file=report)
+        print('%-24s %14s' % ('send to worker', 'ns'), file=report)
+        for kind, ns in bench_transfer():
+            print('%-24s %14.1f' % (kind, ns), file=report)
+        print(file=report)
+        print('%-24s %14s' % ('cache key', 'ns'), file=report)
+        for kind, ns in bench_fingerprint():
+            print('%-24s %14.1f' % (kind, ns), file=report)
+        print(file=report)
+        print('%-24s %14s' % ('per order', 'ns'), file=report)
+        for kind, ns in bench_schema():
+            print('%-24s %14.1f' % (kind, ns), file=report)
+        print(file=report)
+        print('%-24s %14s' % ('1M leaves, per leaf', 'ns'), file=report)
+        for kind, ns in bench_flatten():
+            print('%-24s %14.1f' % (kind, ns), file=report)
+        print(file=report)
+        print('%-24s %14s' % ('-X importtime', 'us'), file=report)
+        for kind, us in bench_import():
+            print('%-24s %14d' % (kind, us), file=report)
+
+    if args.json:
+        document = {
+            'bunch': bunch.__version__,
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'results': results,
+        }
+        if args.json == '-':
+            json.dump(document, sys.stdout, indent=2, sort_keys=True)
+            print()
+        else:
+            with open(args.json, 'w') as f:
+                json.dump(document, f, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline, args.threshold, args.metric)
+        print(file=report)
+        if not regressions:
+            print('No regressions beyond %.0f%% against %s' % (args.threshold * 100, args.baseline), file=report)
+            return 0
+        print('Regressions beyond %.0f%% (%s):' % (args.threshold * 100, args.metric), file=report)
+        for key, before, after, change in regressions:
+            print('  %-24s %12.2f -> %12.2f  (+%.0f%%)' % (key, before, after, change * 100), file=report)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
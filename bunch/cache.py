@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+""" Serialization caching for Bunch trees that are encoded far more often than
+    they change.
+
+    A CachedBunch is a TrackedBunch whose ``toJSON`` and ``toYAML`` results are
+    memoized per node, keyed by the options, and reused until the node's
+    mutation version changes. Encoding a tree after one leaf changed only
+    re-encodes the nodes on the path to that leaf: the JSON of every untouched
+    subtree is spliced in from the cache.
+"""
+
+from collections import OrderedDict
+import os
+import re
+import threading
+import weakref
+
+import bunch
+from bunch import Bunch
+from bunch.tracked import TrackedBunch
+
+__all__ = ('CachedBunch', 'SerializationCache', 'default_cache')
+
+
+class SerializationCache(object):
+    """ A least-recently-used store of encoded subtrees, bounded by the total
+        length of the cached text (``max_bytes`` characters, so bytes for
+        ASCII output).
+
+        >>> cache = SerializationCache(max_bytes=1000)
+        >>> sorted(cache.stats())
+        ['bytes', 'entries', 'evictions', 'hits', 'max_bytes', 'misses']
+    """
+
+    def __init__(self, max_bytes=64 << 20):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()   # (id(node),) + key -> (weakref, version, text)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, node, key):
+        """ Returns the cached text for ``node`` if it has not changed since it
+            was stored, else None.
+        """
+        k = (id(node),) + key
+        with self._lock:
+            entry = self._entries.get(k)
+            # the weakref guards against a new node reusing a dead one's id
+            if entry is not None and entry[0]() is node and entry[1] == node._version:
+                self._entries.move_to_end(k)
+                self.hits += 1
+                return entry[2]
+            self.misses += 1
+            return None
+
+    def put(self, node, key, text):
+        size = len(text)
+        if size > self.max_bytes:
+            return
+        k = (id(node),) + key
+        with self._lock:
+            old = self._entries.pop(k, None)
+            if old is not None:
+                self._bytes -= len(old[2])
+            self._entries[k] = (weakref.ref(node), node._version, text)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (ref, version, evicted) = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """ Returns the hit, miss and eviction counts and the current size. """
+        with self._lock:
+            return {
+                'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'entries': len(self._entries), 'bytes': self._bytes, 'max_bytes': self.max_bytes,
+            }
+
+default_cache = SerializationCache()
+
+
+# Children are encoded separately and spliced into their parent's JSON in
+# place of a placeholder string; the nonce keeps it from matching real data.
+_PLACEHOLDER = 'bunch.cache.%s.' % os.urandom(16).hex()
+_PLACEHOLDER_RE = re.compile('"%s(\\d+)"' % re.escape(_PLACEHOLDER))
+
+class _Child(object):
+    __slots__ = ('token',)
+    def __init__(self, i):
+        self.token = _PLACEHOLDER + str(i)
+
+
+def _options_key(kind, options):
+    try:
+        key = (kind,) + tuple(sorted(
+            (k, tuple(v) if isinstance(v, list) else v) for k, v in options.items()
+        ))
+        hash(key)
+    except TypeError:
+        return None     # unhashable options: don't cache
+    return key
+
+def _json_spliced(node, dumps, options, key, cache):
+    text = cache.get(node, key)
+    if text is not None:
+        return text
+    children = []
+    shallow = {}
+    for k, v in dict.items(node):
+        if isinstance(v, CachedBunch):
+            shallow[k] = _Child(len(children))
+            children.append(v)
+        else:
+            shallow[k] = v
+    if not children:
+        text = dumps(node, **options)
+    else:
+        default = options['default']
+        def placeholder(obj):
+            if type(obj) is _Child:
+                return obj.token
+            return default(obj)
+        text = dumps(shallow, **dict(options, default=placeholder))
+        texts = [ _json_spliced(child, dumps, options, key, cache) for child in children ]
+        text = _PLACEHOLDER_RE.sub(lambda m: texts[int(m.group(1))], text)
+    cache.put(node, key, text)
+    return text
+
+
+class CachedBunch(TrackedBunch):
+    """ A TrackedBunch that memoizes its serializations.
+
+        >>> cfg = CachedBunch.fromDict({'db': {'host': 'a', 'port': 5432}, 'flags': {'beta': True}})
+        >>> cfg._serialization_cache = cache = SerializationCache()
+        >>> cfg.toJSON(sort_keys=True)
+        '{"db": {"host": "a", "port": 5432}, "flags": {"beta": true}}'
+        >>> cfg.toJSON(sort_keys=True) is cfg.toJSON(sort_keys=True)
+        True
+
+        After a change, only the changed nodes and their ancestors are
+        encoded again; ``flags`` comes from the cache.
+
+        >>> cfg.db.host = 'b'
+        >>> before = cache.stats()['hits']
+        >>> cfg.toJSON(sort_keys=True)
+        '{"db": {"host": "b", "port": 5432}, "flags": {"beta": true}}'
+        >>> cache.stats()['hits'] - before
+        1
+        >>> cfg |= {'flags': {'beta': False}}
+        >>> cfg.toJSON(sort_keys=True)
+        '{"db": {"host": "b", "port": 5432}, "flags": {"beta": false}}'
+
+        The CachedBunches in a list belong to the node holding the list, so
+        their changes are seen as well.
+
+        >>> c = CachedBunch.fromDict({'rows': [{'a': 1}]})
+        >>> c._serialization_cache = SerializationCache()
+        >>> c.toJSON()
+        '{"rows": [{"a": 1}]}'
+        >>> c.rows[0].a = 2
+        >>> c.toJSON()
+        '{"rows": [{"a": 2}]}'
+
+        Results are keyed by the serialization options. JSON without
+        ``indent`` (or a custom encoder ``cls``) is cached per subtree; other
+        JSON and all YAML are cached for the node they are requested on.
+
+        Only changes made through the CachedBunches themselves are seen: a
+        list (or other mutable value) changed in place is not, so reassign it
+        instead. Unlike a TrackedBunch, a CachedBunch does not record dirty
+        paths.
+    """
+    # set on a subclass (or an instance's root) to use a separate cache
+    _serialization_cache = default_cache
+
+    def _record(self, path):
+        pass
+
+    def toJSON(self, **options):
+        """ Serializes to JSON like ``Bunch.toJSON``, reusing cached results. """
+        support = bunch._install_json()
+        options.setdefault('default', support.json_default)
+        key = _options_key('json', options)
+        if key is None:
+            return Bunch.toJSON(self, **options)
+        cache = self._root()._serialization_cache
+        if options.get('indent') is None and options.get('cls') is None:
+            return _json_spliced(self, support.json.dumps, options, key, cache)
+        text = cache.get(self, key)
+        if text is None:
+            text = Bunch.toJSON(self, **options)
+            cache.put(self, key, text)
+        return text
+
+    def toYAML(self, **options):
+        """ Serializes to YAML like ``Bunch.toYAML``, reusing cached results. """
+        key = _options_key('yaml', options)
+        if key is None:
+            return Bunch.toYAML(self, **options)
+        cache = self._root()._serialization_cache
+        text = cache.get(self, key)
+        if text is None:
+            text = Bunch.toYAML(self, **options)
+            cache.put(self, key, text)
+        return text
@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+""" Structural fingerprints of Bunch trees, for use as cache keys.
+
+    A fingerprint is a hex digest of a tree's canonical text. It does not
+    depend on key order, on which mapping or sequence types hold the data (a
+    Bunch and the equal dict, or a list and the equal tuple, fingerprint the
+    same), or on the process, as it never uses ``hash()``, which is randomized
+    per process for strings.
+
+    The canonical text is the compact JSON of the tree with sorted keys, with
+    one extension: a mapping with keys other than strings lists them as their
+    own canonical text (``{1:"a"}``, ``{[1,2]:"b"}``), sorted by that text,
+    which JSON's quoted keys can never match.
+
+    Subtrees of dicts, Bunches, lists and scalars with string keys are checked
+    in one pass and encoded by the json module's C encoder in one call; only
+    the rest is encoded in Python. FrozenBunches and TrackedBunches keep
+    their canonical text between calls, so their parents splice it in rather
+    than encoding them again.
+"""
+
+from collections.abc import Mapping, Sequence
+import json
+import os
+
+from bunch import Bunch
+from bunch.frozen import FrozenBunch
+from bunch.tracked import TrackedBunch
+
+__all__ = ('fingerprint',)
+
+DIGEST_SIZE = 16
+
+_dumps = json.JSONEncoder(sort_keys=True, separators=(',', ':')).encode
+
+_SCALARS = frozenset([str, int, float, bool, type(None)])
+_STR = frozenset([str])
+_SEQUENCES = frozenset([list, tuple])
+_PLAIN_MAPPINGS = frozenset([dict, Bunch])
+_REMEMBERING = (TrackedBunch, FrozenBunch)
+
+_blake2b = None     # hashlib is imported on first use, to keep ``import bunch`` fast
+
+def _hexdigest(text):
+    global _blake2b
+    if _blake2b is None:
+        from hashlib import blake2b as _blake2b
+    return _blake2b(text.encode('utf-8'), digest_size=DIGEST_SIZE).hexdigest()
+
+
+def _plain(root):
+    """ Whether the C encoder gives the canonical text of ``root``: it holds
+        only dicts, Bunches, lists and tuples of scalars, and string keys.
+    """
+    stack = [root]
+    pop = stack.pop
+    append = stack.append
+    seen = set()        # shared subtrees are checked once (and cycles end)
+    scalars = _SCALARS
+    all_scalars = _SCALARS.issuperset
+    all_str = _STR.issuperset
+    while stack:
+        node = pop()
+        if id(node) in seen:
+            continue
+        seen.add(id(node))
+        t = type(node)
+        if t in _SEQUENCES:
+            values = node
+        elif t in _PLAIN_MAPPINGS:
+            if not all_str(map(type, node)):
+                return False
+            values = node.values()
+        else:
+            return False
+        if all_scalars(map(type, values)):
+            continue
+        for v in values:
+            t = type(v)
+            if t in scalars or t is list and all_scalars(map(type, v)):
+                continue    # lists of scalars are common enough to check here
+            append(v)
+    return True
+
+
+def _key(k, active):
+    if isinstance(k, str):
+        return _dumps(str.__str__(k))
+    return _encode(k, active)
+
+def _encode(v, active):
+    """ Returns the canonical text of any value. """
+    t = type(v)
+    if t in _SCALARS:
+        return _dumps(v)
+    if isinstance(v, _REMEMBERING):
+        return _subtree(v, active)
+    if t in _SEQUENCES or t in _PLAIN_MAPPINGS:
+        if _plain(v):
+            try:
+                return _dumps(v)
+            except ValueError:
+                pass    # a cycle; reported below
+    if isinstance(v, (str, int, float)):
+        return _dumps(v)    # subclasses, such as IntEnum members
+    if isinstance(v, (dict, Mapping)):
+        return _subtree(v, active)
+    if isinstance(v, (list, tuple, Sequence)) and not isinstance(v, (bytes, bytearray)):
+        return _subtree(v, active)
+    raise TypeError('Cannot fingerprint %r' % (v,))
+
+def _text(node, active):
+    """ Returns the canonical text of one mapping or sequence, encoding what
+        it holds with _encode.
+    """
+    if not isinstance(node, (dict, Mapping)):
+        return '[' + ','.join([ _encode(v, active) for v in node ]) + ']'
+    if all( isinstance(k, str) for k in node ):
+        entries = sorted( (str.__str__(k), v) for k, v in node.items() )
+        return '{' + ','.join([ _dumps(k) + ':' + _encode(v, active) for k, v in entries ]) + '}'
+    entries = sorted( (_key(k, active), v) for k, v in node.items() )
+    return '{' + ','.join([ k + ':' + _encode(v, active) for k, v in entries ]) + '}'
+
+
+# FrozenBunches and TrackedBunches keep ``[text, digest]`` in _fingerprint
+# (a TrackedBunch's with its _version), the digest once it is asked for.
+
+def _remembered(node):
+    if isinstance(node, TrackedBunch):
+        memo = node._fingerprint
+        if memo is not None and memo[0] == node._version:
+            return memo[1]
+        return None
+    if isinstance(node, FrozenBunch):
+        return node._fingerprint
+    return None
+
+def _remember(node, text):
+    if isinstance(node, TrackedBunch):
+        node._fingerprint = (node._version, [text, None])
+    elif isinstance(node, FrozenBunch):
+        object.__setattr__(node, '_fingerprint', [text, None])
+
+def _subtree(node, active):
+    memo = _remembered(node)
+    if memo is not None:
+        return memo[0]
+    if id(node) in active:
+        raise ValueError('Circular reference detected')
+    active.add(id(node))
+    text = None
+    if isinstance(node, _REMEMBERING):
+        shallow = dict(node.items())
+        if _plain(shallow):
+            text = _dumps(shallow)
+    if text is None:
+        text = _text(node, active)
+    active.discard(id(node))
+    _remember(node, text)
+    return text
+
+
+def fingerprint(self):
+    """ Returns a digest of this tree's structure and values that is stable
+        across processes, for use as a cache key.
+
+        >>> a = Bunch.fromDict({'q': 'shoes', 'filters': {'size': [9, 10], 'new': True}})
+        >>> b = Bunch.fromDict({'filters': {'new': True, 'size': (9, 10)}, 'q': 'shoes'})
+        >>> a.fingerprint() == b.fingerprint()
+        True
+        >>> len(a.fingerprint())
+        32
+        >>> a.filters.size.append(11)
+        >>> a.fingerprint() == b.fingerprint()
+        False
+
+        Mappings and sequences of any type may be nested; other values must
+        be strings, numbers, booleans or None. Keys and values of different
+        types differ (``1``, ``1.0``, ``True`` and ``'1'``); keys may be any
+        of those, or tuples and FrozenBunches of them.
+
+        >>> Bunch({1: 'a'}).fingerprint() == Bunch({'1': 'a'}).fingerprint()
+        False
+        >>> Bunch({'a': 1, 2: 'b', (3, 4): 'c'}).fingerprint() == Bunch({(3, 4): 'c', 2: 'b', 'a': 1}).fingerprint()
+        True
+
+        FrozenBunches and TrackedBunches (and so CachedBunches) keep their
+        canonical text between calls, so only the subtrees that changed since
+        are encoded again; fingerprinting an unchanged one costs a lookup. A
+        plain Bunch cannot tell when it changes, so it is encoded on every
+        call: freeze a tree that is used as a key repeatedly. As with their
+        caching elsewhere, a TrackedBunch does not see lists changed in place.
+
+        >>> from bunch import FrozenBunch, TrackedBunch
+        >>> FrozenBunch(b).fingerprint() == b.fingerprint()
+        True
+        >>> t = TrackedBunch.fromDict(b)
+        >>> t.filters.new = False
+        >>> t.fingerprint() == b.fingerprint()
+        False
+    """
+    if isinstance(self, _REMEMBERING):
+        _subtree(self, set())
+        memo = _remembered(self)
+        if memo[1] is None:
+            memo[1] = _hexdigest(memo[0])
+        return memo[1]
+    if _plain(self):
+        return _hexdigest(_dumps(self))
+    return _hexdigest(_encode(self, set()))
@@ -0,0 +1,225 @@
+# -*- coding: utf-8 -*-
+""" Conversion between nested Bunches and flat mappings of dotted keys, as
+    used by key-value stores and environment variables.
+
+    A flat key joins the keys along the path to a value with ``sep``; list
+    items contribute their index. Within a key, a backslash escapes the next
+    character: occurrences of ``sep`` and of backslashes in keys are escaped,
+    as are keys made only of digits, which would otherwise read back as list
+    indexes. Empty mappings and lists are kept as values.
+"""
+
+from collections.abc import Mapping
+
+from bunch import Bunch
+
+__all__ = ('flatten', 'iterflatten', 'unflatten')
+
+_MISSING = object()
+_LEAF_TYPES = frozenset((str, int, float, bool, type(None)))
+
+
+def _escaper(sep):
+    escaped_sep = ''.join( '\\' + c for c in sep )
+    def escape(key):
+        if not isinstance(key, str):
+            return escape(str(key))
+        if sep in key or '\\' in key:
+            key = key.replace('\\', '\\\\').replace(sep, escaped_sep)
+        elif key.isdigit():
+            key = '\\' + key
+        return key
+    return escape
+
+
+def iterflatten(self, sep='.'):
+    """ Generator over the ``(flat key, value)`` pairs of this tree, in
+        depth-first order, so a very large tree can be written out without
+        building the flat mapping.
+
+        >>> b = Bunch.fromDict({'db': {'host': 'x', 'ports': [5432, 5433]}, 'a.b': {}})
+        >>> list(b.iterflatten())
+        [('db.host', 'x'), ('db.ports.0', 5432), ('db.ports.1', 5433), ('a\\\\.b', Bunch())]
+    """
+    escape = _escaper(sep)
+    escaped = {}        # str key -> its escaped form; keys repeat across records
+    leaf_types = _LEAF_TYPES
+    stack = [ ('', iter(self.items()), True) ]
+    while stack:
+        prefix, items, keyed = stack[-1]
+        for key, value in items:
+            if keyed:
+                part = escaped.get(key)
+                if part is None:
+                    part = escape(key)
+                    if type(key) is str:
+                        escaped[key] = part
+                key = prefix + part
+            else:
+                key = prefix + str(key)
+            if type(value) in leaf_types or not value:
+                yield key, value
+            elif isinstance(value, (dict, Mapping)):
+                stack.append( (key + sep, iter(value.items()), True) )
+                break
+            elif isinstance(value, (list, tuple)):
+                stack.append( (key + sep, enumerate(value), False) )
+                break
+            else:
+                yield key, value
+        else:
+            stack.pop()
+
+
+def flatten(self, sep='.'):
+    """ Returns a dict mapping flat keys to the leaf values of this tree.
+
+        >>> b = Bunch.fromDict({'db': {'host': 'x', 'ports': [5432, 5433]}, 'debug': False})
+        >>> flat = b.flatten()
+        >>> flat
+        {'db.host': 'x', 'db.ports.0': 5432, 'db.ports.1': 5433, 'debug': False}
+        >>> Bunch.unflatten(flat) == b
+        True
+        >>> Bunch.unflatten(Bunch(x={'v.1': 1, '2': 2}).flatten(sep='__'), sep='__')
+        Bunch(x=Bunch(2=2, v.1=1))
+
+        Both directions walk the tree iteratively, so depth is not bounded by
+        the recursion limit; see ``iterflatten`` to stream the pairs instead.
+    """
+    return dict(iterflatten(self, sep))
+
+
+def _split(key, sep):
+    """ Splits a flat key holding escapes into ``(segment, is_index)`` pairs. """
+    parts = []
+    buf = []
+    escaped = False
+    i = 0
+    n = len(key)
+    while i < n:
+        c = key[i]
+        if c == '\\' and i + 1 < n:
+            buf.append(key[i + 1])
+            escaped = True
+            i += 2
+        elif key.startswith(sep, i):
+            part = ''.join(buf)
+            parts.append( (part, not escaped and part.isdigit()) )
+            buf = []
+            escaped = False
+            i += len(sep)
+        else:
+            buf.append(c)
+            i += 1
+    part = ''.join(buf)
+    parts.append( (part, not escaped and part.isdigit()) )
+    return parts
+
+
+class _Items(dict):
+    """ A list under construction, as a dict of index -> item. """
+    __slots__ = ()
+
+
+def unflatten(cls, mapping, sep='.'):
+    """ Builds a tree of ``cls`` instances from a mapping (or an iterable of
+        pairs) of flat keys, as made by ``flatten``. Unescaped all-digit
+        segments are list indexes; each list must have indexes 0 to n-1.
+
+        >>> Bunch.unflatten({'a.b': 1, 'a.c.0': 'x', 'a.c.1': 'y'})
+        Bunch(a=Bunch(b=1, c=['x', 'y']))
+        >>> Bunch.unflatten({'a': 1, 'a.b': 2})
+        Traceback (most recent call last):
+          ...
+        ValueError: 'a.b' conflicts with another key at 'a'
+    """
+    root = cls()
+    lists = []          # (parent, key, _Items), in creation order
+    parents = {}        # the parent part of an unescaped flat key -> its container
+    parent_of = parents.get
+    step = len(sep)
+
+    def child(node, segment, is_index, list_next, flat):
+        key = _key(node, segment, is_index, root, flat)
+        found = node.get(key, _MISSING)
+        if found is _MISSING:
+            found = node[key] = _Items() if list_next else cls()
+            if list_next:
+                lists.append( (node, key, found) )
+        elif not isinstance(found, (_Items, cls)):
+            raise ValueError('%r conflicts with another key at %r' % (flat, segment))
+        return found
+
+    pairs = mapping.items() if isinstance(mapping, (dict, Mapping)) else mapping
+    for flat, value in pairs:
+        if '\\' in flat:
+            segments = _split(flat, sep)
+            node = root
+            for i in range(len(segments) - 1):
+                segment, is_index = segments[i]
+                node = child(node, segment, is_index, segments[i + 1][1], flat)
+            key, is_index = segments[-1]
+        else:
+            cut = flat.rfind(sep)
+            if cut < 0:
+                node = root
+                key = flat
+            else:
+                key = flat[cut + step:]
+                node = parent_of(flat[:cut])
+                if node is None:
+                    # walk back to the nearest known container, then create
+                    # the missing ones down to the parent
+                    cuts = [cut]
+                    while True:
+                        c = flat.rfind(sep, 0, cuts[-1])
+                        if c < 0:
+                            node = root
+                            start = 0
+                            break
+                        node = parent_of(flat[:c])
+                        if node is not None:
+                            start = c + step
+                            break
+                        cuts.append(c)
+                    for j in range(len(cuts) - 1, -1, -1):
+                        c = cuts[j]
+                        segment = flat[start:c]
+                        after = flat[c + step:cuts[j - 1]] if j else key
+                        node = child(node, segment, segment.isdigit(), after.isdigit(), flat)
+                        parents[flat[:c]] = node
+                        start = c + step
+            is_index = key.isdigit()
+
+        if type(node) is _Items:
+            if not is_index:
+                raise ValueError('%r mixes list indexes and keys' % (flat,))
+            key = int(key)
+        elif is_index and node is not root:
+            raise ValueError('%r mixes list indexes and keys' % (flat,))
+        size = len(node)
+        node[key] = value
+        if len(node) == size:
+            raise ValueError('%r conflicts with another key' % (flat,))
+
+    for parent, key, items in reversed(lists):
+        n = len(items)
+        if any( i not in items for i in range(n) ):
+            raise ValueError('The list at %r needs the indexes 0 to %d, not %r' % (
+                key, n - 1, sorted(items)))
+        parent[key] = [ items[i] for i in range(n) ]
+    return root
+
+
+def _key(node, key, is_index, root, flat):
+    """ The key for a segment in ``node``: an int in a list, else the text.
+        Indexes and keys cannot share a container (except at the root, where
+        an index is taken as a plain key).
+    """
+    if type(node) is _Items:
+        if not is_index:
+            raise ValueError('%r mixes list indexes and keys' % (flat,))
+        return int(key)
+    if is_index and node is not root:
+        raise ValueError('%r mixes list indexes and keys' % (flat,))
+    return key
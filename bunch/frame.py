@@ -0,0 +1,282 @@
+# -*- coding: utf-8 -*-
+""" BunchFrame: a columnar store for many Bunches with the same keys.
+
+    Each key becomes one column, held as an ``array`` of machine numbers when
+    all of its values are ints or all are floats (as a NumPy array, when NumPy
+    is installed), and as a list otherwise. A million rows then cost a handful
+    of objects instead of a million Bunches.
+"""
+
+from array import array
+from collections.abc import Mapping
+
+from bunch import Bunch, BunchType, BunchABCType, bunchify, unbunchify
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+__all__ = ('BunchFrame', 'BunchFrameRow')
+
+
+def _make_column(values):
+    """ Stores a list of values in the most compact column type that holds
+        them exactly.
+    """
+    types = set(map(type, values))
+    if len(types) == 1:
+        t = types.pop()
+        if numpy is not None and t in (int, float, bool):
+            try:
+                return numpy.array(values)
+            except OverflowError:
+                pass
+        elif t is float:
+            return array('d', values)
+        elif t is int:
+            try:
+                return array('q', values)
+            except OverflowError:
+                pass
+    return list(values)
+
+def _as_column(values):
+    if isinstance(values, array) or (numpy is not None and isinstance(values, numpy.ndarray)):
+        return values
+    return _make_column(list(values))
+
+def _to_list(column):
+    """ The values of a column as plain Python objects. """
+    if type(column) is list:
+        return column
+    return column.tolist()
+
+def _take(column, indices):
+    if numpy is not None and isinstance(column, numpy.ndarray):
+        return column[indices]
+    if isinstance(column, array):
+        return array(column.typecode, [ column[i] for i in indices ])
+    return [ column[i] for i in indices ]
+
+
+class BunchFrame(object, metaclass=BunchType):
+    """ A table of rows stored as columns.
+
+        >>> frame = BunchFrame([
+        ...     Bunch(sku='a1', price=9.5, qty=3),
+        ...     Bunch(sku='b2', price=120.0, qty=1),
+        ...     Bunch(sku='c3', price=35.25, qty=12),
+        ... ])
+        >>> frame
+        BunchFrame(3 rows, columns=['sku', 'price', 'qty'])
+        >>> frame.columns
+        ['sku', 'price', 'qty']
+
+        Columns are read as attributes (or items), whole:
+
+        >>> sum(frame.price)
+        164.75
+
+        Iterating yields lightweight, read-only row views with the Bunch API.
+
+        >>> [ row.sku for row in frame if row.qty > 2 ]
+        ['a1', 'c3']
+        >>> frame[-1]
+        BunchFrameRow(sku='c3', price=35.25, qty=12)
+
+        A sequence of booleans (such as a NumPy comparison, or a list
+        comprehension over a column) filters rows; a slice or a sequence of
+        indices selects them, and ``select`` picks columns.
+
+        >>> cheap = frame[[ p < 50 for p in frame.price ]]
+        >>> cheap.select('sku').toDict()
+        [{'sku': 'a1'}, {'sku': 'c3'}]
+        >>> frame[1:].bunchify()
+        [Bunch(price=120.0, qty=1, sku='b2'), Bunch(price=35.25, qty=12, sku='c3')]
+
+        Rows missing a key hold ``None`` in that column.
+
+        New columns are assigned whole:
+
+        >>> frame.total = [ p * q for p, q in zip(frame.price, frame.qty) ]
+        >>> frame[0].total
+        28.5
+    """
+    __slots__ = ('_columns', '_len')
+
+    def __init__(self, rows=None):
+        rows = list(rows or ())
+        names = {}
+        for row in rows:
+            names.update(dict.fromkeys(row))
+        columns = {}
+        for name in names:
+            columns[name] = _make_column([ row.get(name) for row in rows ])
+        object.__setattr__(self, '_columns', columns)
+        object.__setattr__(self, '_len', len(rows))
+
+    @classmethod
+    def fromColumns(cls, columns):
+        """ Builds a frame from a mapping of column names to sequences, which
+            must all have the same length.
+
+            >>> BunchFrame.fromColumns({'x': [1, 2], 'y': ['a', 'b']})[1]
+            BunchFrameRow(x=2, y='b')
+        """
+        self = cls.__new__(cls)
+        object.__setattr__(self, '_columns', {})
+        object.__setattr__(self, '_len', 0)
+        for name in columns:
+            self[name] = columns[name]
+        return self
+
+    @classmethod
+    def fromJSON(cls, s, **options):
+        """ Builds a frame from a JSON array of objects.
+
+            >>> BunchFrame.fromJSON('[{"a": 1}, {"a": 2, "b": true}]').toDict()
+            [{'a': 1, 'b': None}, {'a': 2, 'b': True}]
+        """
+        import json
+        return cls(json.loads(s, **options))
+
+    @property
+    def columns(self):
+        """ The column names, in the order they were first seen. """
+        return list(self._columns)
+
+    def __len__(self):
+        return self._len
+
+    def __iter__(self):
+        for i in range(self._len):
+            yield BunchFrameRow(self, i)
+
+    def _derive(self, columns, length):
+        frame = type(self).__new__(type(self))
+        object.__setattr__(frame, '_columns', columns)
+        object.__setattr__(frame, '_len', length)
+        return frame
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return self._columns[key]
+        if isinstance(key, int) or (numpy is not None and isinstance(key, numpy.integer)):
+            key = int(key)
+            if key < 0:
+                key += self._len
+            if not 0 <= key < self._len:
+                raise IndexError('BunchFrame index out of range')
+            return BunchFrameRow(self, key)
+        if isinstance(key, slice):
+            columns = dict( (name, col[key]) for name, col in self._columns.items() )
+            return self._derive(columns, len(range(*key.indices(self._len))))
+        return self._filter(key)
+
+    def _filter(self, key):
+        if numpy is not None and isinstance(key, numpy.ndarray) and key.dtype == bool:
+            indices = numpy.flatnonzero(key)
+        else:
+            key = list(key)
+            if len(key) == self._len and all(type(k) is bool for k in key):
+                indices = [ i for i, keep in enumerate(key) if keep ]
+            else:
+                indices = key
+        columns = dict( (name, _take(col, indices)) for name, col in self._columns.items() )
+        return self._derive(columns, len(indices))
+
+    def __setitem__(self, name, values):
+        column = _as_column(values)
+        if self._columns and len(column) != self._len:
+            raise ValueError('Column %r has %d values for %d rows' % (name, len(column), self._len))
+        self._columns[name] = column
+        object.__setattr__(self, '_len', len(column))
+
+    def __delitem__(self, name):
+        del self._columns[name]
+
+    def __contains__(self, name):
+        return name in self._columns
+
+    def __getattr__(self, k):
+        if k in type(self)._attr_names:
+            raise AttributeError(k)
+        try:
+            return self._columns[k]
+        except KeyError:
+            raise AttributeError(k)
+
+    __setattr__ = Bunch.__dict__['__setattr__']
+    __delattr__ = Bunch.__dict__['__delattr__']
+
+    def __reduce__(self):
+        return (type(self).fromColumns, (self._columns,))
+
+    def select(self, *names):
+        """ Returns a frame with only the given columns, sharing their storage. """
+        return self._derive(dict( (name, self._columns[name]) for name in names ), self._len)
+
+    def toDict(self, DictClass=dict):
+        """ Converts the frame into a list of ``DictClass`` rows, recursively
+            (see unbunchify).
+        """
+        names = list(self._columns)
+        values = zip(*[ _to_list(self._columns[name]) for name in names ])
+        return unbunchify([ dict(zip(names, row)) for row in values ], DictClass)
+
+    def bunchify(self, BunchClass=Bunch):
+        """ Converts the frame into a list of ``BunchClass`` rows, recursively
+            (see bunchify).
+        """
+        return bunchify(self.toDict(), BunchClass)
+
+    def toJSON(self, **options):
+        """ Serializes the frame as a JSON array of objects. """
+        import json
+        return json.dumps(self.toDict(), **options)
+
+    def __repr__(self):
+        return '%s(%d rows, columns=%r)' % (self.__class__.__name__, self._len, self.columns)
+
+
+class BunchFrameRow(Mapping, metaclass=BunchABCType):
+    """ A read-only view of one row of a BunchFrame. """
+    __slots__ = ('_frame', '_index')
+
+    def __init__(self, frame, index):
+        object.__setattr__(self, '_frame', frame)
+        object.__setattr__(self, '_index', index)
+
+    def __getitem__(self, k):
+        column = self._frame._columns[k]
+        if type(column) is list or isinstance(column, array):
+            return column[self._index]
+        return column.item(self._index)
+
+    def __iter__(self):
+        return iter(self._frame._columns)
+
+    def __len__(self):
+        return len(self._frame._columns)
+
+    def __getattr__(self, k):
+        if k in type(self)._attr_names:
+            raise AttributeError(k)
+        try:
+            return self[k]
+        except KeyError:
+            raise AttributeError(k)
+
+    def __setattr__(self, k, v):
+        raise AttributeError('%s is read-only' % type(self).__name__)
+
+    def __delattr__(self, k):
+        raise AttributeError('%s is read-only' % type(self).__name__)
+
+    def toDict(self, DictClass=dict):
+        return unbunchify(dict(self), DictClass)
+
+    def __repr__(self):
+        args = ', '.join( ('%s=%r' % (k, self[k]) for k in self) )
+        return '%s(%s)' % (self.__class__.__name__, args)
@@ -0,0 +1,412 @@
+# -*- coding: utf-8 -*-
+""" FrozenBunch: an immutable, hashable Bunch with cheap updates.
+
+    A FrozenBunch is stored as a hash array mapped trie (HAMT), the structure
+    behind most persistent maps: ``set``, ``delete`` and ``+`` return a new
+    FrozenBunch that shares every untouched node with the original, so an
+    update costs O(log32 n) instead of a full copy.
+"""
+
+from collections.abc import ItemsView, Mapping, ValuesView
+
+from bunch import Bunch, BunchABCType, _SCALAR_TYPES, _bunch_like
+
+__all__ = ('FrozenBunch',)
+
+
+### Hash array mapped trie
+#
+# A node is a tuple ``(bitmap, array)``. Each set bit of the bitmap marks one
+# occupied slot for the next 5 bits of the key hash; ``array`` holds two items
+# per slot, either ``key, value`` or ``_NODE, child``. Once the hash is used up,
+# keys whose hashes collide entirely share a collision node ``(None, array)``
+# holding plain ``key, value`` pairs.
+
+_BITS = 5
+_MASK = (1 << _BITS) - 1
+_HASH_BITS = 64
+_HASH_MASK = (1 << _HASH_BITS) - 1
+
+_NODE = object()
+_MISSING = object()
+_EMPTY = (0, ())
+
+try:
+    _popcount = int.bit_count
+except AttributeError:
+    def _popcount(n):
+        return bin(n).count('1')
+
+def _hash(key):
+    return hash(key) & _HASH_MASK
+
+def _get(node, h, key, default):
+    shift = 0
+    while True:
+        bitmap, array = node
+        if bitmap is None:
+            for i in range(0, len(array), 2):
+                k = array[i]
+                if k is key or k == key:
+                    return array[i+1]
+            return default
+        bit = 1 << ((h >> shift) & _MASK)
+        if not bitmap & bit:
+            return default
+        i = 2 * _popcount(bitmap & (bit - 1))
+        k = array[i]
+        if k is _NODE:
+            node = array[i+1]
+            shift += _BITS
+        elif k is key or k == key:
+            return array[i+1]
+        else:
+            return default
+
+def _pair(shift, h1, k1, v1, h2, k2, v2):
+    """ Makes the smallest subtree holding two keys that share a slot. """
+    if shift >= _HASH_BITS:
+        return (None, (k1, v1, k2, v2))
+    i1 = (h1 >> shift) & _MASK
+    i2 = (h2 >> shift) & _MASK
+    if i1 == i2:
+        return (1 << i1, (_NODE, _pair(shift + _BITS, h1, k1, v1, h2, k2, v2)))
+    if i1 < i2:
+        return ((1 << i1) | (1 << i2), (k1, v1, k2, v2))
+    return ((1 << i1) | (1 << i2), (k2, v2, k1, v1))
+
+def _assoc(node, shift, h, key, value):
+    """ Returns ``(new_node, added)``; ``new_node is node`` if nothing changed. """
+    bitmap, array = node
+    if bitmap is None:
+        for i in range(0, len(array), 2):
+            k = array[i]
+            if k is key or k == key:
+                if array[i+1] is value:
+                    return node, False
+                return (None, array[:i+1] + (value,) + array[i+2:]), False
+        return (None, array + (key, value)), True
+
+    bit = 1 << ((h >> shift) & _MASK)
+    i = 2 * _popcount(bitmap & (bit - 1))
+    if not bitmap & bit:
+        return (bitmap | bit, array[:i] + (key, value) + array[i:]), True
+    k, v = array[i], array[i+1]
+    if k is _NODE:
+        child, added = _assoc(v, shift + _BITS, h, key, value)
+        if child is v:
+            return node, False
+        return (bitmap, array[:i+1] + (child,) + array[i+2:]), added
+    if k is key or k == key:
+        if v is value:
+            return node, False
+        return (bitmap, array[:i+1] + (value,) + array[i+2:]), False
+    child = _pair(shift + _BITS, _hash(k), k, v, h, key, value)
+    return (bitmap, array[:i] + (_NODE, child) + array[i+2:]), True
+
+def _without(node, shift, h, key):
+    """ Returns the node minus ``key`` (None once empty); raises KeyError if absent. """
+    bitmap, array = node
+    if bitmap is None:
+        for i in range(0, len(array), 2):
+            k = array[i]
+            if k is key or k == key:
+                return (None, array[:i] + array[i+2:]) if len(array) > 2 else None
+        raise KeyError(key)
+
+    bit = 1 << ((h >> shift) & _MASK)
+    if not bitmap & bit:
+        raise KeyError(key)
+    i = 2 * _popcount(bitmap & (bit - 1))
+    k, v = array[i], array[i+1]
+    if k is _NODE:
+        child = _without(v, shift + _BITS, h, key)
+        if child is not None:
+            if len(child[1]) == 2 and child[1][0] is not _NODE:
+                # a lone pair moves back up into this slot
+                return (bitmap, array[:i] + child[1] + array[i+2:])
+            return (bitmap, array[:i+1] + (child,) + array[i+2:])
+    elif not (k is key or k == key):
+        raise KeyError(key)
+    bitmap &= ~bit
+    if not bitmap:
+        return None
+    return (bitmap, array[:i] + array[i+2:])
+
+def _build(entries, shift=0):
+    """ Builds a node from ``(hash, key, value)`` triples with distinct keys in
+        one pass, rather than by repeated insertion.
+    """
+    if shift >= _HASH_BITS:
+        array = []
+        for h, k, v in entries:
+            array += (k, v)
+        return (None, tuple(array))
+    buckets = {}
+    for entry in entries:
+        idx = (entry[0] >> shift) & _MASK
+        if idx in buckets:
+            buckets[idx].append(entry)
+        else:
+            buckets[idx] = [entry]
+    bitmap = 0
+    array = []
+    for idx in sorted(buckets):
+        bucket = buckets[idx]
+        bitmap |= 1 << idx
+        if len(bucket) == 1:
+            array += bucket[0][1:]
+        else:
+            array += (_NODE, _build(bucket, shift + _BITS))
+    return (bitmap, tuple(array))
+
+def _iter_items(node):
+    stack = [node[1]]
+    while stack:
+        array = stack.pop()
+        for i in range(0, len(array), 2):
+            k = array[i]
+            if k is _NODE:
+                stack.append(array[i+1][1])
+            else:
+                yield k, array[i+1]
+
+
+### FrozenBunch
+
+class FrozenBunch(Mapping, metaclass=BunchABCType):
+    """ An immutable, hashable Bunch.
+
+        >>> fb = FrozenBunch(name='db', pool={'size': 10}, hosts=['a', 'b'])
+        >>> fb.pool.size, fb['hosts']
+        (10, ('a', 'b'))
+
+        It is frozen all the way down: nested mappings become FrozenBunches,
+        lists become tuples and sets become frozensets.
+
+        >>> fb.name = 'cache'
+        Traceback (most recent call last):
+            ...
+        AttributeError: FrozenBunch is immutable
+        >>> fb.pool['size'] = 20
+        Traceback (most recent call last):
+            ...
+        TypeError: 'FrozenBunch' object does not support item assignment
+
+        So it can be hashed, eg. to serve as a cache key; the hash is computed
+        once and remembered.
+
+        >>> cache = { fb: 'connection' }
+        >>> cache[FrozenBunch.fromDict({'hosts': ['a', 'b'], 'name': 'db', 'pool': {'size': 10}})]
+        'connection'
+
+        Updates return a new FrozenBunch that shares all unchanged structure
+        with the original, at O(log n) per key.
+
+        >>> tenant = fb.set('name', 'tenant-db') + {'timeout': 5}
+        >>> tenant
+        FrozenBunch(hosts=('a', 'b'), name='tenant-db', pool=FrozenBunch(size=10), timeout=5)
+        >>> tenant.pool is fb.pool
+        True
+        >>> fb.delete('hosts')
+        FrozenBunch(name='db', pool=FrozenBunch(size=10))
+        >>> fb
+        FrozenBunch(hosts=('a', 'b'), name='db', pool=FrozenBunch(size=10))
+    """
+    __slots__ = ('_root', '_len', '_hash', '_fingerprint')
+
+    def __init__(self, *args, **kwargs):
+        d = dict(*args, **kwargs)
+        object.__setattr__(self, '_root', _build(
+            [ (_hash(k), k, _freeze(v, type(self))) for k, v in d.items() ]
+        ))
+        object.__setattr__(self, '_len', len(d))
+        object.__setattr__(self, '_hash', None)
+        object.__setattr__(self, '_fingerprint', None)
+
+    @classmethod
+    def _from_root(cls, root, length):
+        self = cls.__new__(cls)
+        object.__setattr__(self, '_root', root)
+        object.__setattr__(self, '_len', length)
+        object.__setattr__(self, '_hash', None)
+        object.__setattr__(self, '_fingerprint', None)
+        return self
+
+    @classmethod
+    def fromDict(cls, d):
+        """ Recursively freezes a mapping (a dict, Bunch, ...) into a FrozenBunch.
+
+            >>> FrozenBunch.fromDict(Bunch(foo=Bunch(lol=[1, {'a': 2}])))
+            FrozenBunch(foo=FrozenBunch(lol=(1, FrozenBunch(a=2))))
+        """
+        if type(d) is cls:
+            return d
+        return cls(d)
+
+    def toDict(self, DictClass=dict):
+        """ Recursively thaws the FrozenBunch into a ``DictClass`` (eg. ``dict``
+            or ``Bunch``), turning tuples back into lists, mirroring ``fromDict``.
+
+            >>> FrozenBunch(foo={'lol': [1, 2]}).toDict(Bunch)
+            Bunch(foo=Bunch(lol=[1, 2]))
+        """
+        return _thaw(self, DictClass)
+
+    def __getitem__(self, k):
+        value = _get(self._root, _hash(k), k, _MISSING)
+        if value is _MISSING:
+            raise KeyError(k)
+        return value
+
+    def get(self, k, default=None):
+        return _get(self._root, _hash(k), k, default)
+
+    def __contains__(self, k):
+        return _get(self._root, _hash(k), k, _MISSING) is not _MISSING
+
+    def __iter__(self):
+        for k, v in _iter_items(self._root):
+            yield k
+
+    def __len__(self):
+        return self._len
+
+    def items(self):
+        return _FrozenItems(self)
+
+    def values(self):
+        return _FrozenValues(self)
+
+    def __getattr__(self, k):
+        if k in type(self)._attr_names:
+            raise AttributeError(k)
+        value = _get(self._root, _hash(k), k, _MISSING)
+        if value is _MISSING:
+            raise AttributeError(k)
+        return value
+
+    def __setattr__(self, k, v):
+        raise AttributeError('%s is immutable' % type(self).__name__)
+
+    def __delattr__(self, k):
+        raise AttributeError('%s is immutable' % type(self).__name__)
+
+    def __hash__(self):
+        if self._hash is None:
+            object.__setattr__(self, '_hash', hash(frozenset(_iter_items(self._root))))
+        return self._hash
+
+    def __eq__(self, other):
+        if self is other:
+            return True
+        if isinstance(other, FrozenBunch):
+            if self._len != other._len:
+                return False
+            if self._hash is not None and other._hash is not None and self._hash != other._hash:
+                return False
+            for k, v in _iter_items(self._root):
+                if other.get(k, _MISSING) != v:
+                    return False
+            return True
+        return Mapping.__eq__(self, other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __reduce__(self):
+        return (type(self), (dict(_iter_items(self._root)),))
+
+    def copy(self):
+        """ FrozenBunches are immutable, so a copy is the FrozenBunch itself. """
+        return self
+
+    def set(self, k, v):
+        """ Returns a new FrozenBunch with key ``k`` set to (a frozen) ``v``.
+
+            >>> a = FrozenBunch(foo=1)
+            >>> a.set('bar', [2]), a
+            (FrozenBunch(bar=(2,), foo=1), FrozenBunch(foo=1))
+        """
+        root, added = _assoc(self._root, 0, _hash(k), k, _freeze(v, type(self)))
+        if root is self._root:
+            return self
+        return self._from_root(root, self._len + added)
+
+    def delete(self, k):
+        """ Returns a new FrozenBunch without key ``k``; raises KeyError if missing.
+
+            >>> FrozenBunch(foo=1, bar=2).delete('bar')
+            FrozenBunch(foo=1)
+            >>> FrozenBunch().delete('bar')
+            Traceback (most recent call last):
+                ...
+            KeyError: 'bar'
+        """
+        root = _without(self._root, 0, _hash(k), k)
+        return self._from_root(root or _EMPTY, self._len - 1)
+
+    def __add__(self, other):
+        """ Returns a new FrozenBunch with another Mapping (or Iterable of key-value
+            pairs) merged in, like ``Bunch.__add__`` but sharing structure.
+
+            >>> FrozenBunch(foo=1) + { 'lol': True }
+            FrozenBunch(foo=1, lol=True)
+            >>> { 'reversed': True } + FrozenBunch(foo=1)
+            FrozenBunch(foo=1, reversed=True)
+        """
+        if isinstance(other, Mapping):
+            pairs = ( (k, other[k]) for k in other )
+        else:
+            pairs = other
+        root, length, cls = self._root, self._len, type(self)
+        for k, v in pairs:
+            root, added = _assoc(root, 0, _hash(k), k, _freeze(v, cls))
+            length += added
+        if root is self._root:
+            return self
+        return self._from_root(root, length)
+
+    __radd__ = __add__
+
+    def __repr__(self):
+        if not self._len:
+            return '%s()' % (self.__class__.__name__,)
+        args = ', '.join( ('%s=%r' % (k, self[k]) for k in sorted(self)) )
+        return '%s(%s)' % (self.__class__.__name__, args)
+
+_bunch_like(FrozenBunch)
+
+
+class _FrozenItems(ItemsView):
+    __slots__ = ()
+    def __iter__(self):
+        return _iter_items(self._mapping._root)
+
+class _FrozenValues(ValuesView):
+    __slots__ = ()
+    def __iter__(self):
+        for k, v in _iter_items(self._mapping._root):
+            yield v
+
+
+def _freeze(value, FrozenClass=FrozenBunch):
+    """ Returns a deeply immutable equivalent of ``value``. """
+    t = type(value)
+    if t in _SCALAR_TYPES or isinstance(value, FrozenBunch):
+        return value
+    if isinstance(value, Mapping):
+        return FrozenClass(value)
+    if isinstance(value, (list, tuple)):
+        return tuple( _freeze(v, FrozenClass) for v in value )
+    if isinstance(value, (set, frozenset)):
+        return frozenset(value)
+    return value
+
+def _thaw(value, DictClass=dict):
+    """ Inverse of _freeze: FrozenBunches become ``DictClass``, tuples lists. """
+    if isinstance(value, FrozenBunch):
+        return DictClass( (k, _thaw(v, DictClass)) for k, v in _iter_items(value._root) )
+    if isinstance(value, tuple):
+        return [ _thaw(v, DictClass) for v in value ]
+    return value
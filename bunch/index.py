@@ -0,0 +1,316 @@
+# -*- coding: utf-8 -*-
+""" BunchIndex: a collection of Bunches with hash and sorted indexes on
+    dotted field paths, for lookups that would otherwise scan a list.
+"""
+
+from bisect import bisect_left, bisect_right
+from collections.abc import Mapping
+from operator import itemgetter
+
+from bunch import path
+
+__all__ = ('BunchIndex',)
+
+_MISSING = object()
+
+
+def _hashable(value):
+    """ Returns the key a value is indexed under: lists become tuples. """
+    if isinstance(value, list):
+        return tuple(map(_hashable, value))
+    if isinstance(value, (dict, Mapping)):
+        raise TypeError('Cannot index the mapping %r' % (value,))
+    return value
+
+
+class _HashIndex(object):
+    """ Maps each value of a field to the items holding it, as a dict keyed
+        by ``id(item)`` so items come out in insertion order and are removed in
+        O(1). ``keys`` remembers what each item was indexed under, so an item
+        can be removed even after it has changed.
+    """
+    __slots__ = ('field', 'get', 'buckets', 'keys')
+
+    def __init__(self, field):
+        self.field = field
+        self.get = path(field)
+        self.buckets = {}
+        self.keys = {}
+
+    def add(self, item):
+        key = self.get(item, _MISSING)
+        if key is _MISSING:
+            return
+        key = _hashable(key)
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = self.buckets[key] = {}
+        bucket[id(item)] = item
+        self.keys[id(item)] = key
+
+    def extend(self, items):
+        for item in items:
+            self.add(item)
+
+    def remove(self, item):
+        key = self.keys.pop(id(item), _MISSING)
+        if key is _MISSING:
+            return key
+        bucket = self.buckets[key]
+        del bucket[id(item)]
+        if not bucket:
+            del self.buckets[key]
+        return key
+
+    def bucket(self, value):
+        try:
+            return self.buckets.get(_hashable(value), {})
+        except TypeError:
+            return {}
+
+
+class _SortedIndex(_HashIndex):
+    """ A hash index that also keeps its keys sorted, for range queries.
+        Items whose value is None are left out of the sorted keys.
+    """
+    __slots__ = ('sorted_keys', 'sorted_items')
+
+    def __init__(self, field):
+        _HashIndex.__init__(self, field)
+        self.sorted_keys = []
+        self.sorted_items = []
+
+    def add(self, item):
+        key = self.get(item, None)
+        if key is not None:
+            key = _hashable(key)
+            i = bisect_right(self.sorted_keys, key)  # raises for incomparable keys, before any change
+        _HashIndex.add(self, item)
+        if key is not None:
+            self.sorted_keys.insert(i, key)
+            self.sorted_items.insert(i, item)
+
+    def extend(self, items):
+        """ Adds many items with one sort rather than an insertion each. """
+        added = []
+        get = self.get
+        for item in items:
+            key = get(item, None)
+            if key is not None:
+                added.append( (_hashable(key), item) )
+        if added:
+            pairs = list(zip(self.sorted_keys, self.sorted_items)) + added
+            pairs.sort(key=itemgetter(0))   # raises for incomparable keys, before any change
+        for item in items:
+            _HashIndex.add(self, item)
+        if added:
+            self.sorted_keys = [ key for key, _ in pairs ]
+            self.sorted_items = [ item for _, item in pairs ]
+
+    def remove(self, item):
+        key = _HashIndex.remove(self, item)
+        if key is not _MISSING and key is not None:
+            i = bisect_left(self.sorted_keys, key)
+            while self.sorted_items[i] is not item:
+                i += 1
+            del self.sorted_keys[i]
+            del self.sorted_items[i]
+        return key
+
+    def range(self, lo, hi, inclusive):
+        keys = self.sorted_keys
+        if lo is None:
+            start = 0
+        else:
+            start = (bisect_left if inclusive[0] else bisect_right)(keys, lo)
+        if hi is None:
+            end = len(keys)
+        else:
+            end = (bisect_right if inclusive[1] else bisect_left)(keys, hi)
+        return self.sorted_items[start:end]
+
+
+class BunchIndex(object):
+    """ A collection of Bunches (or any mappings) indexed on one or more
+        fields, each a path as accepted by ``bunch.path``.
+
+        >>> from bunch import Bunch
+        >>> people = [ Bunch.fromDict(p) for p in [
+        ...     {'name': 'Ada', 'age': 36, 'address': {'city': 'London'}},
+        ...     {'name': 'Alan', 'age': 41, 'address': {'city': 'Wilmslow'}},
+        ...     {'name': 'Grace', 'age': 85, 'address': {'city': 'London'}} ]]
+        >>> idx = BunchIndex(people, fields=['address.city'], sorted_fields=['age'])
+        >>> [ p.name for p in idx.get('address.city', 'London') ]
+        ['Ada', 'Grace']
+        >>> [ p.name for p in idx.range('age', 40, 90) ]
+        ['Alan', 'Grace']
+        >>> [ p.name for p in idx.find({'address.city': 'London'}, age=85) ]
+        ['Grace']
+
+        Items are kept, and compared, by identity. Adding and removing items
+        updates every index incrementally. Changing an indexed field of an
+        item already in the collection does not; call ``reindex(item)`` after.
+
+        >>> ada = people[0]
+        >>> ada.address.city = 'Paris'
+        >>> idx.reindex(ada)
+        >>> [ p.name for p in idx.get('address.city', 'Paris') ]
+        ['Ada']
+        >>> idx.remove(ada)
+        >>> len(idx), idx.get('address.city', 'Paris')
+        (2, [])
+
+        Items missing an indexed field are not indexed on it. List values are
+        indexed as tuples; mapping values cannot be indexed.
+    """
+
+    def __init__(self, items=(), fields=(), sorted_fields=()):
+        self._items = {}        # id(item) -> item, in insertion order
+        self._indexes = {}      # field -> _HashIndex or _SortedIndex
+        for field in fields:
+            self.add_index(field)
+        for field in sorted_fields:
+            self.add_index(field, sorted=True)
+        self.extend(items)
+
+    def add_index(self, field, sorted=False):
+        """ Indexes the items on ``field``; with ``sorted=True``, also for
+            ``range`` queries. Replaces any index on the field.
+        """
+        index = (_SortedIndex if sorted else _HashIndex)(field)
+        index.extend(list(self._items.values()))
+        self._indexes[field] = index
+
+    def drop_index(self, field):
+        del self._indexes[field]
+
+    @property
+    def fields(self):
+        """ The indexed fields. """
+        return list(self._indexes)
+
+    def add(self, item):
+        """ Adds an item, unless it is already in the collection. """
+        if id(item) in self._items:
+            return
+        self._items[id(item)] = item
+        try:
+            for index in self._indexes.values():
+                index.add(item)
+        except Exception:
+            self.discard(item)
+            raise
+
+    def extend(self, items):
+        """ Adds many items, building each sorted index with a single sort. """
+        new = []
+        for item in items:
+            if id(item) not in self._items:
+                self._items[id(item)] = item
+                new.append(item)
+        try:
+            for index in self._indexes.values():
+                index.extend(new)
+        except Exception:
+            for item in new:
+                self.discard(item)
+            raise
+
+    def remove(self, item):
+        """ Removes an item; raises KeyError if it is not in the collection. """
+        if id(item) not in self._items:
+            raise KeyError(item)
+        self.discard(item)
+
+    def discard(self, item):
+        if self._items.pop(id(item), None) is None:
+            return
+        for index in self._indexes.values():
+            index.remove(item)
+
+    def reindex(self, item):
+        """ Updates the indexes for an item whose fields have changed. """
+        if id(item) not in self._items:
+            raise KeyError(item)
+        for index in self._indexes.values():
+            index.remove(item)
+            index.add(item)
+
+    def clear(self):
+        self._items.clear()
+        for field, index in list(self._indexes.items()):
+            self._indexes[field] = type(index)(field)
+
+    def __len__(self):
+        return len(self._items)
+
+    def __iter__(self):
+        return iter(list(self._items.values()))
+
+    def __contains__(self, item):
+        return id(item) in self._items
+
+    def __repr__(self):
+        return 'BunchIndex(<%d items>, fields=%r)' % (len(self), self.fields)
+
+    def _index(self, field):
+        try:
+            return self._indexes[field]
+        except KeyError:
+            raise KeyError('No index on %r' % (field,))
+
+    def get(self, field, value):
+        """ Returns the items whose ``field`` equals ``value``, in the order
+            they were added (or reindexed).
+        """
+        return list(self._index(field).bucket(value).values())
+
+    def first(self, field, value, default=None):
+        """ Returns one item whose ``field`` equals ``value``, or ``default``. """
+        for item in self._index(field).bucket(value).values():
+            return item
+        return default
+
+    def count(self, field, value):
+        return len(self._index(field).bucket(value))
+
+    def values(self, field):
+        """ Returns the distinct values of an indexed field. """
+        return list(self._index(field).buckets)
+
+    def range(self, field, lo=None, hi=None, inclusive=(True, True)):
+        """ Returns the items whose ``field`` lies between ``lo`` and ``hi``
+            (either may be None for no bound), in field order. ``field`` needs
+            a sorted index.
+        """
+        index = self._index(field)
+        if not isinstance(index, _SortedIndex):
+            raise KeyError('No sorted index on %r' % (field,))
+        return index.range(lo, hi, inclusive)
+
+    def find(self, criteria=None, **fields):
+        """ Returns the items matching every ``field: value`` pair, given as a
+            dict (for dotted fields) and/or as keyword arguments.
+
+            Indexed fields are looked up, starting from the one with the fewest
+            matches; other fields are compared on those candidates only, or on
+            every item if no field is indexed.
+        """
+        criteria = dict(criteria or (), **fields)
+        buckets = []
+        scanned = []
+        for field, value in criteria.items():
+            index = self._indexes.get(field)
+            if index is None:
+                scanned.append( (path(field), value) )
+            else:
+                buckets.append(index.bucket(value))
+        if buckets:
+            buckets.sort(key=len)
+            others = buckets[1:]
+            candidates = [ item for item in buckets[0].values()
+                           if all(id(item) in bucket for bucket in others) ]
+        else:
+            candidates = self._items.values()
+        return [ item for item in candidates
+                 if all(get(item, _MISSING) == value for get, value in scanned) ]
@@ -0,0 +1,272 @@
+# -*- coding: utf-8 -*-
+""" Opt-in instrumentation of Bunch attribute access and conversion.
+
+    Nothing is instrumented until ``enable()`` is called: it swaps wrapped
+    versions of the hot methods into place, and ``disable()`` puts the
+    originals back, so there is no cost at all while disabled.
+
+    >>> from bunch import Bunch, bunchify
+    >>> from bunch import instrument
+    >>> instrument.enable(sample_every=1)
+    >>> b = bunchify({'user': {'name': 'Ada'}, 'tags': ['x']})
+    >>> b.user.name
+    'Ada'
+    >>> getattr(b, 'missing', None)
+    >>> instrument.disable()
+    >>> stats = instrument.snapshot()
+    >>> stats['counters']['getattr.fallback'], stats['counters']['getattr.miss']
+    (3, 1)
+    >>> stats['timings']['bunchify']['calls'], stats['timings']['bunchify']['nodes']
+    (1, 5)
+    >>> site, count = stats['sites']['getattr.miss'][0]
+    >>> site[2], count
+    ('<module>', 1)
+    >>> instrument.reset()
+    >>> instrument.snapshot()['counters']
+    {}
+
+    Methods that are imported on first use are counted from the first call.
+
+    >>> instrument.enable(sample_every=0)
+    >>> for _ in range(3): _ = b.toJSON()
+    >>> instrument.disable()
+    >>> instrument.snapshot()['timings']['toJSON']['calls']
+    3
+    >>> from bunch.json_support import toJSON
+    >>> Bunch.toJSON is toJSON
+    True
+    >>> instrument.reset()
+
+    Conversions are timed once per call to ``bunchify`` or ``unbunchify``,
+    including those validated by a schema.
+
+    >>> with instrument.recording(sample_every=0):
+    ...     _ = bunchify({'port': '80', 'tags': [{'x': 1}]}, schema={'port': int, 'tags': [{'x': int}]})
+    ...     _ = b.toDict()
+    >>> sorted( (name, stats['calls']) for name, stats in instrument.snapshot()['timings'].items() )
+    [('bunchify', 1), ('unbunchify', 1)]
+    >>> instrument.reset()
+
+    Recorded:
+
+    - counters: ``getattr.fallback`` (attribute reads that fell through to
+      the keys), ``getattr.miss`` (those that raised AttributeError)
+    - timings for ``bunchify``, ``unbunchify`` and ``toJSON``: calls, total
+      and max time, nodes visited, and a histogram of call times in
+      power-of-two nanosecond buckets
+    - sites: every ``sample_every``-th event is attributed to the
+      ``(filename, lineno, function)`` it came from
+"""
+
+import sys
+import threading
+import time
+
+import bunch
+
+__all__ = ('enable', 'disable', 'is_enabled', 'recording', 'snapshot', 'reset')
+
+_now_ns = time.perf_counter_ns
+
+
+_lock = threading.Lock()
+_counters = {}
+_timings = {}
+_sites = {}
+_originals = []       # (owner, name, original) swapped out by enable()
+_entry_points = {}    # code object -> the name conversions are timed under
+_sampling = { 'every': 0, 'tick': 0 }
+
+
+def _count(name, frame_depth):
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + 1
+        _sample(name, frame_depth + 1)
+
+def _sample(name, frame_depth):
+    # called with _lock held
+    every = _sampling['every']
+    if not every:
+        return
+    _sampling['tick'] += 1
+    if _sampling['tick'] % every:
+        return
+    try:
+        frame = sys._getframe(frame_depth + 1)
+    except ValueError:
+        return
+    site = (frame.f_code.co_filename, frame.f_lineno, frame.f_code.co_name)
+    sites = _sites.setdefault(name, {})
+    sites[site] = sites.get(site, 0) + 1
+
+def _time(name, elapsed, nodes, frame_depth):
+    with _lock:
+        stats = _timings.get(name)
+        if stats is None:
+            stats = _timings[name] = { 'calls': 0, 'total_ns': 0, 'max_ns': 0, 'nodes': 0, 'histogram': {} }
+        stats['calls'] += 1
+        stats['total_ns'] += elapsed
+        stats['nodes'] += nodes
+        if elapsed > stats['max_ns']:
+            stats['max_ns'] = elapsed
+        bucket = 1 << max(elapsed, 1).bit_length()   # upper bound, in ns
+        stats['histogram'][bucket] = stats['histogram'].get(bucket, 0) + 1
+        _sample(name, frame_depth + 1)
+
+
+def count_nodes(it):
+    """ Counts the containers and leaves in a document, visiting shared
+        objects once.
+
+        >>> count_nodes({'a': [1, 2], 'b': {'c': None}})
+        6
+    """
+    seen = set()
+    stack = [it]
+    nodes = 0
+    while stack:
+        node = stack.pop()
+        nodes += 1
+        if isinstance(node, (dict, list, tuple, bunch.Mapping)):
+            if id(node) in seen:
+                continue
+            seen.add(id(node))
+            if isinstance(node, (dict, bunch.Mapping)):
+                stack.extend(node[k] for k in node)
+            else:
+                stack.extend(node)
+    return nodes
+
+
+### Wrappers
+
+def _wrap_getattr(original):
+    def __getattr__(self, k):
+        _count('getattr.fallback', 1)
+        try:
+            return original(self, k)
+        except AttributeError:
+            _count('getattr.miss', 1)
+            raise
+    __getattr__.__doc__ = original.__doc__
+    return __getattr__
+
+def _wrap_convert(original):
+    # Conversions are timed as the public entry point that started them:
+    # calls made from anywhere else, such as the functions a Schema compiles,
+    # are part of one already being timed. The site is the frame above it.
+    def convert(*args, **kwargs):
+        name = _entry_points.get(sys._getframe(1).f_code)
+        if name is None:
+            return original(*args, **kwargs)
+        start = _now_ns()
+        result = original(*args, **kwargs)
+        _time(name, _now_ns() - start, count_nodes(result), 2)
+        return result
+    convert.__name__ = original.__name__
+    convert.__doc__ = original.__doc__
+    return convert
+
+def _wrap_toJSON(original):
+    def toJSON(self, **options):
+        start = _now_ns()
+        result = original(self, **options)
+        _time('toJSON', _now_ns() - start, count_nodes(self), 1)
+        return result
+    toJSON.__doc__ = original.__doc__
+    return toJSON
+
+
+def _swap(owner, name, wrapper):
+    original = vars(owner).get(name)
+    if original is None:
+        return
+    _originals.append( (owner, name, original) )
+    setattr(owner, name, wrapper(original))
+
+def _restore(owner, name, original):
+    shared = bunch._shared.get(name)
+    if shared is not None and isinstance(owner, type):
+        # a method imported on first use was installed behind the wrapper of
+        # its stand-in: put back the one shared now
+        original = shared[0]
+    setattr(owner, name, original)
+
+
+def is_enabled():
+    return bool(_originals)
+
+def enable(sample_every=100):
+    """ Starts recording. Every ``sample_every``-th event is attributed to its
+        calling site (0 disables site sampling).
+    """
+    with _lock:
+        _sampling['every'] = sample_every
+    if is_enabled():
+        return
+    # load the Bunch types defined in submodules, so they are covered too, and
+    # the schema module, so it keeps the uninstrumented _convert
+    bunch._install('bunch.frozen')
+    bunch._install('bunch.layered')
+    schema = bunch._install('bunch.schema')
+    for cls in bunch._BUNCH_LIKE:
+        _swap(cls, '__getattr__', _wrap_getattr)
+    toJSON = bunch.Bunch.__dict__.get('toJSON')
+    for cls in bunch._BUNCH_LIKE:
+        if toJSON is not None and cls.__dict__.get('toJSON') is toJSON:
+            _swap(cls, 'toJSON', _wrap_toJSON)
+    _entry_points.update( (getattr(bunch, name).__code__, name) for name in ('bunchify', 'unbunchify') )
+    _swap(bunch, '_convert', _wrap_convert)
+    _swap(schema.Schema, '__call__', _wrap_convert)
+
+def disable():
+    """ Stops recording and restores the uninstrumented methods. Recorded data
+        is kept until ``reset()``.
+    """
+    while _originals:
+        _restore(*_originals.pop())
+
+class recording(object):
+    """ Context manager enabling instrumentation for the duration of a block.
+
+        >>> with recording(sample_every=0):
+        ...     is_enabled()
+        True
+        >>> is_enabled()
+        False
+    """
+    def __init__(self, sample_every=100):
+        self.sample_every = sample_every
+
+    def __enter__(self):
+        self.was_enabled = is_enabled()
+        enable(self.sample_every)
+        return self
+
+    def __exit__(self, *exc_info):
+        if not self.was_enabled:
+            disable()
+        return False
+
+
+def snapshot():
+    """ Returns a copy of everything recorded so far:
+        ``{'counters': {...}, 'timings': {...}, 'sites': {...}}``, with the sites
+        for each event as ``[(site, count), ...]``, most frequent first.
+    """
+    with _lock:
+        return {
+            'counters': dict(_counters),
+            'timings': dict( (name, dict(stats, histogram=dict(stats['histogram'])))
+                             for name, stats in _timings.items() ),
+            'sites': dict( (name, sorted(sites.items(), key=lambda item: -item[1]))
+                           for name, sites in _sites.items() ),
+        }
+
+def reset():
+    """ Discards everything recorded so far. """
+    with _lock:
+        _counters.clear()
+        _timings.clear()
+        _sites.clear()
+        _sampling['tick'] = 0
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+""" JSON support: ``toJSON``, ``fromJSON`` and ``iterJSONLines``.
+
+    Imported the first time one of these methods is called; see
+    ``bunch._install_json``.
+"""
+
+from collections.abc import Mapping, Sequence
+import json
+
+from bunch import Bunch, LazyBunch, _unwrap_lazy
+
+__all__ = ('json_default', 'toJSON', 'fromJSON', 'iterJSONLines')
+
+
+def json_default(obj):
+    """ ``default`` hook for ``json.dumps()`` that serializes the Bunch-like
+        collections which are not dicts or lists (lazy views, records).
+
+        >>> json.dumps([LazyBunch({'a': 1})], default=json_default)
+        '[{"a": 1}]'
+    """
+    data = _unwrap_lazy(obj)
+    if data is not obj:
+        return data
+    if isinstance(obj, Mapping):
+        return dict(obj)
+    if isinstance(obj, Sequence):
+        return list(obj)
+    raise TypeError('Object of type %s is not JSON serializable' % type(obj).__name__)
+
+def toJSON(self, **options):
+    """ Serializes this Bunch to JSON. Accepts the same keyword options as ``json.dumps()``.
+
+        >>> b = Bunch(foo=Bunch(lol=True), hello=42, ponies='are pretty!')
+        >>> json.dumps(b)
+        '{"foo": {"lol": true}, "hello": 42, "ponies": "are pretty!"}'
+        >>> b.toJSON()
+        '{"foo": {"lol": true}, "hello": 42, "ponies": "are pretty!"}'
+
+        Lazy views and records serialize too, on their own or nested.
+
+        >>> LazyBunch({'foo': {'lol': True}}).toJSON()
+        '{"foo": {"lol": true}}'
+        >>> Row = Bunch.record('Row', ['id'])
+        >>> Bunch(rows=[Row(id=1), Row(id=2)]).toJSON()
+        '{"rows": [{"id": 1}, {"id": 2}]}'
+    """
+    options.setdefault('default', json_default)
+    return json.dumps(self, **options)
+
+
+def _with_hook(cls, options):
+    # the caller's object_hook takes precedence over the pairs hook, which
+    # json would otherwise call instead of it
+    if options.get('object_hook') is None:
+        options.setdefault('object_pairs_hook', cls)
+    return options
+
+
+def fromJSON(cls, s, **options):
+    """ Loads JSON from a string, bytes or file, building Bunches directly as
+        objects are parsed (no separate bunchify pass). Accepts the same keyword
+        options as ``json.loads()``.
+
+        >>> b = Bunch.fromJSON('{"foo": {"lol": true}, "hello": [42, {"ponies": "are pretty!"}]}')
+        >>> b.foo.lol, b.hello[1].ponies
+        (True, 'are pretty!')
+        >>> Bunch.fromJSON(b'{"foo": 1}')
+        Bunch(foo=1)
+
+        >>> import io
+        >>> Bunch.fromJSON(io.StringIO('{"foo": 1}'))
+        Bunch(foo=1)
+
+        Given an ``object_hook``, objects are whatever it makes of each dict.
+
+        >>> Bunch.fromJSON('{"foo": {"n": 1}}', object_hook=len)
+        1
+    """
+    if hasattr(s, 'read'):
+        s = s.read()
+    return json.loads(s, **_with_hook(cls, options))
+
+def iterJSONLines(cls, f, chunk_size=1 << 20, **options):
+    """ Generator over the records of a JSON Lines (newline-delimited JSON)
+        stream, each decoded straight into Bunches. Blank lines are skipped.
+
+        ``f`` may be a file opened in binary or text mode, or a path. It is
+        read ``chunk_size`` characters at a time, so memory stays bounded by
+        the chunk size and the longest record. Other keyword options are passed
+        to ``json.JSONDecoder``.
+
+        >>> import io
+        >>> stream = io.BytesIO(b'{"name": "Hero", "hp": 34}\\n\\n{"name": "Orc", "hp": 12}')
+        >>> [ b.name for b in Bunch.iterJSONLines(stream) ]
+        ['Hero', 'Orc']
+        >>> list(Bunch.iterJSONLines(io.StringIO('[1, {"a": 2}]\\n'), chunk_size=3))
+        [[1, Bunch(a=2)]]
+    """
+    if not hasattr(f, 'read'):
+        with open(f, 'rb') as fh:
+            for record in cls.iterJSONLines(fh, chunk_size, **options):
+                yield record
+        return
+
+    decode = json.JSONDecoder(**_with_hook(cls, options)).decode
+
+    pending = None
+    while True:
+        chunk = f.read(chunk_size)
+        if not chunk:
+            break
+        if pending:
+            chunk = pending + chunk
+        cut = chunk.rfind(b'\n' if isinstance(chunk, bytes) else '\n')
+        if cut < 0:
+            pending = chunk
+            continue
+        pending = chunk[cut+1:]
+        lines = chunk[:cut]
+        if isinstance(lines, bytes):
+            lines = lines.decode('utf-8')
+        for line in lines.split('\n'):
+            if line and not line.isspace():
+                yield decode(line)
+
+    if pending:
+        if isinstance(pending, bytes):
+            pending = pending.decode('utf-8')
+        if not pending.isspace():
+            yield decode(pending)
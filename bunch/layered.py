@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+""" LayeredBunch: a copy-free stack of Bunches, for configuration layering.
+"""
+
+from collections.abc import Mapping, MutableMapping
+
+from bunch import Bunch, BunchABCType, bunchify, unbunchify, _bunch_like
+
+__all__ = ('LayeredBunch',)
+
+_MISSING = object()
+
+
+class LayeredBunch(MutableMapping, metaclass=BunchABCType):
+    """ A view over a stack of mappings, searched from the first (top) layer to
+        the last, like ``collections.ChainMap`` with Bunch attribute access.
+
+        >>> defaults = Bunch(debug=False, db=Bunch(host='localhost', pool=Bunch(size=5, timeout=30)))
+        >>> tenant = {'db': {'pool': {'size': 20}}}
+        >>> request = Bunch(debug=True)
+        >>> cfg = LayeredBunch(request, tenant, defaults)
+        >>> cfg.debug
+        True
+
+        Nested mappings resolve through every layer, so a deep key can come from
+        any of them.
+
+        >>> cfg.db.pool.size, cfg.db.pool.timeout, cfg.db.host
+        (20, 30, 'localhost')
+
+        Nothing is copied, so building a view costs O(layers) whatever the size
+        of the documents. Writes and deletes only ever touch the top layer,
+        creating nested Bunches there as needed.
+
+        >>> cfg.db.pool.timeout = 5
+        >>> request
+        Bunch(db=Bunch(pool=Bunch(timeout=5)), debug=True)
+        >>> defaults.db.pool.timeout
+        30
+
+        ``flatten()`` materializes the merged result as a plain Bunch.
+
+        >>> cfg.flatten()
+        Bunch(db=Bunch(host='localhost', pool=Bunch(size=20, timeout=5)), debug=True)
+    """
+    __slots__ = ('_layers', '_parent', '_key')
+
+    def __init__(self, *layers):
+        self._layers = list(layers) or [Bunch()]
+        self._parent = None
+        self._key = None
+
+    @classmethod
+    def _nested(cls, layers, parent, key):
+        self = cls.__new__(cls)
+        self._layers = layers
+        self._parent = parent
+        self._key = key
+        return self
+
+    @property
+    def layers(self):
+        """ The list of layers, top first. """
+        return self._layers
+
+    def new_child(self, layer=None):
+        """ Returns a view with ``layer`` (or a new Bunch) stacked on top.
+
+            >>> base = LayeredBunch(Bunch(a=1))
+            >>> req = base.new_child()
+            >>> req.a = 2
+            >>> req.a, base.a
+            (2, 1)
+        """
+        if layer is None:
+            layer = Bunch()
+        return type(self)(layer, *self._layers)
+
+    @property
+    def parents(self):
+        """ A view over every layer but the top one. """
+        return type(self)(*self._layers[1:])
+
+    def _top(self, create=True):
+        """ Returns the top layer's mapping for this view, creating it if
+            needed, or returning None when it is missing and not ``create``.
+        """
+        if self._parent is None:
+            return self._layers[0]
+        parent = self._parent._top(create)
+        if parent is None:
+            return None
+        top = parent.get(self._key, _MISSING)
+        if top is _MISSING:
+            if not create:
+                return None
+            top = parent[self._key] = Bunch()
+        if not self._layers or self._layers[0] is not top:
+            self._layers.insert(0, top)
+        return top
+
+    def __getitem__(self, k):
+        nested = None
+        for layer in self._layers:
+            v = layer.get(k, _MISSING)
+            if v is _MISSING:
+                continue
+            if not (isinstance(v, dict) or isinstance(v, Mapping)):
+                if nested is None:
+                    return v
+                break   # a plain value hides the mappings below it
+            if nested is None:
+                nested = [v]
+            else:
+                nested.append(v)
+        if nested is None:
+            raise KeyError(k)
+        return type(self)._nested(nested, self, k)
+
+    def __setitem__(self, k, v):
+        self._top()[k] = v
+
+    def __delitem__(self, k):
+        """ Deletes from the top layer only.
+
+            >>> cfg = LayeredBunch(Bunch(a=1), Bunch(a=0, b=2))
+            >>> del cfg.a
+            >>> cfg.a
+            0
+            >>> del cfg.b
+            Traceback (most recent call last):
+                ...
+            AttributeError: b
+
+            A failed delete on a nested view leaves the top layer as it was.
+
+            >>> cfg = LayeredBunch(Bunch(), Bunch(db=Bunch(port=1)))
+            >>> del cfg.db.port
+            Traceback (most recent call last):
+                ...
+            AttributeError: port
+            >>> cfg._layers[0]
+            Bunch()
+        """
+        top = self._top(create=False)
+        if top is None:
+            raise KeyError(k)
+        del top[k]
+
+    def __iter__(self):
+        keys = {}
+        for layer in reversed(self._layers):
+            keys.update(dict.fromkeys(layer))
+        return iter(keys)
+
+    def __len__(self):
+        return len(set().union(*self._layers))
+
+    def __contains__(self, k):
+        for layer in self._layers:
+            if layer.get(k, _MISSING) is not _MISSING:
+                return True
+        names = type(self)._attr_names
+        return (k in names and hasattr(self, k)) or ('__dict__' in names and k in self.__dict__)
+
+    def __getattr__(self, k):
+        if k in type(self)._attr_names:
+            # an unset slot, eg. while unpickling
+            raise AttributeError(k)
+        try:
+            return self[k]
+        except KeyError:
+            raise AttributeError(k)
+
+    __setattr__ = Bunch.__dict__['__setattr__']
+    __delattr__ = Bunch.__dict__['__delattr__']
+
+    def __reduce__(self):
+        return (type(self), tuple(self._layers))
+
+    def flatten(self, BunchClass=Bunch):
+        """ Merges the layers into a new ``BunchClass``, recursively. """
+        return bunchify(self, BunchClass)
+
+    def toDict(self, DictClass=dict):
+        """ Merges the layers into a new ``DictClass``, recursively (see unbunchify). """
+        return unbunchify(self, DictClass)
+
+    def __repr__(self):
+        return '%s(%s)' % (self.__class__.__name__, ', '.join(map(repr, self._layers)))
+
+_bunch_like(LayeredBunch)
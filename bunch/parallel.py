@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+""" Parallel decoding of JSON Lines files into Bunches.
+
+    The file is cut into byte ranges that end on line boundaries; worker
+    processes each read and decode their own ranges, so the parent only
+    receives finished Bunches (or whatever ``transform`` made of them).
+"""
+
+from collections import deque
+import concurrent.futures
+import json
+import os
+
+from bunch import Bunch
+
+__all__ = ('load_jsonl',)
+
+
+def _ranges(path, chunk_size):
+    """ Yields ``(start, end)`` byte ranges of roughly ``chunk_size`` bytes,
+        each ending just after a newline (or at the end of the file).
+    """
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        start = 0
+        while start < size:
+            f.seek(min(start + chunk_size, size))
+            f.readline()
+            end = f.tell()
+            yield start, end
+            start = end
+
+
+def _load_range(path, start, end, BunchClass, transform, options):
+    """ Decodes the records in one byte range. Runs in the worker processes. """
+    with open(path, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+    options = dict(options, object_pairs_hook=BunchClass)
+    decode = json.JSONDecoder(**options).decode
+    records = []
+    offset = start
+    for line in data.split(b'\n'):
+        if line and not line.isspace():
+            try:
+                record = decode(line.decode('utf-8'))
+            except ValueError as e:
+                raise ValueError('%s: invalid JSON in the line at byte %d: %s' % (path, offset, e))
+            if transform is not None:
+                record = transform(record)
+            records.append(record)
+        offset += len(line) + 1
+    return records
+
+
+def load_jsonl(path, workers=None, ordered=True, chunk_size=4 << 20, prefetch=2,
+               BunchClass=Bunch, transform=None, executor=None, **options):
+    """ Generator over the records of a JSON Lines file, decoded into
+        ``BunchClass`` by a pool of ``workers`` processes (one per CPU by
+        default).
+
+        >>> import os, tempfile
+        >>> path = os.path.join(tempfile.mkdtemp(), 'feed.jsonl')
+        >>> with open(path, 'w') as f:
+        ...     for i in range(1000):
+        ...         _ = f.write('{"id": %d, "user": {"name": "u%d"}}\\n' % (i, i))
+        >>> records = list(load_jsonl(path, workers=2, chunk_size=4096))
+        >>> len(records), records[-1].user.name
+        (1000, 'u999')
+        >>> [ r.id for r in records ] == list(range(1000))
+        True
+
+        Records come back in file order unless ``ordered=False``, which yields
+        each chunk as soon as it is ready. At most ``workers * prefetch`` chunks
+        of ``chunk_size`` bytes are decoded ahead of the consumer, so memory
+        stays bounded however large the file is and however slowly the
+        results are consumed.
+
+        Decoded records still have to be unpickled here, which costs roughly
+        half as much as decoding them did, so that is what bounds the speedup.
+        ``transform`` (a picklable function, such as one defined at module
+        level) is applied to each record in the workers; use it to filter or
+        project records so less has to be sent back. Records it maps to None
+        are still yielded. Pass an existing ``concurrent.futures`` executor to
+        reuse its processes, and ``workers=0`` to decode in this process. Other
+        keyword options are passed to ``json.JSONDecoder``.
+
+        >>> sorted(load_jsonl(path, workers=0, transform=len, ordered=False))[:2]
+        [2, 2]
+    """
+    ranges = _ranges(path, chunk_size)
+    if workers == 0:
+        for start, end in ranges:
+            for record in _load_range(path, start, end, BunchClass, transform, options):
+                yield record
+        return
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    owned = executor is None
+    if owned:
+        executor = concurrent.futures.ProcessPoolExecutor(workers)
+    limit = max(1, workers * prefetch)
+
+    pending = deque()
+    try:
+        while True:
+            while len(pending) < limit:
+                try:
+                    start, end = next(ranges)
+                except StopIteration:
+                    break
+                pending.append(executor.submit(_load_range, path, start, end, BunchClass, transform, options))
+            if not pending:
+                break
+            if ordered:
+                done = pending.popleft()
+            else:
+                done = next(concurrent.futures.as_completed(pending))
+                pending.remove(done)
+            for record in done.result():
+                yield record
+    finally:
+        ranges.close()
+        for future in pending:
+            future.cancel()
+        if owned:
+            executor.shutdown(wait=True)
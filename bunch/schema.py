@@ -0,0 +1,391 @@
+# -*- coding: utf-8 -*-
+""" Schemas that bunchify validates against, coercing values and filling in
+    defaults as it builds the Bunches.
+
+    A schema is declared with plain Python values:
+
+    - a type (``int``, ``float``, ``str``, ``bool``, or any class) for a
+      scalar, or ``object`` for anything;
+    - a dict of ``key: schema`` for a mapping;
+    - a one-item list ``[schema]`` for a list of items;
+    - a ``Field(schema, ...)`` wherever a key needs a default, may be left out
+      or may be None.
+
+    ``Schema(declaration)`` compiles it, once per Bunch class, into Python
+    functions specialized to the declaration, so a conversion is a single pass
+    with no interpretation of the schema left in it.
+"""
+
+from collections.abc import Mapping
+
+from bunch import Bunch, _convert, _fills_on_init, _SCALAR_TYPES
+
+__all__ = ('Schema', 'Field', 'SchemaError')
+
+_MISSING = object()
+
+
+class SchemaError(ValueError):
+    """ A value that does not match its schema. ``path`` holds the keys and
+        list indexes leading to it from the root.
+    """
+
+    def __init__(self, reason, path=()):
+        ValueError.__init__(self, reason)
+        self.reason = reason
+        self.path = tuple(path)
+
+    def __str__(self):
+        if not self.path:
+            return self.reason
+        return '%s: %s' % (format_path(self.path), self.reason)
+
+def format_path(path):
+    """ Formats a path as ``items[2].qty``.
+
+        >>> format_path(('items', 2, 'qty'))
+        'items[2].qty'
+    """
+    out = []
+    for key in path:
+        if isinstance(key, int):
+            out.append('[%d]' % key)
+        else:
+            out.append(('.' if out else '') + str(key))
+    return ''.join(out)
+
+
+class Field(object):
+    """ Options for one key of a mapping schema.
+
+        - ``default``: the value used when the key is missing (containers are
+          copied for every use); implies ``required=False``.
+        - ``required``: whether a missing key is an error; without a default,
+          an optional key that is missing stays missing.
+        - ``nullable``: whether None is accepted as is.
+        - ``convert``: a function applied to the value instead of the type's
+          coercion; a TypeError or ValueError it raises becomes a SchemaError.
+    """
+    __slots__ = ('schema', 'default', 'required', 'nullable', 'convert')
+
+    def __init__(self, schema=object, default=_MISSING, required=None, nullable=False, convert=None):
+        self.schema = schema
+        self.default = default
+        self.required = (default is _MISSING) if required is None else required
+        self.nullable = nullable
+        self.convert = convert
+
+    def __repr__(self):
+        return 'Field(%r)' % (self.schema,)
+
+
+### Coercion
+
+def _describe(value):
+    text = repr(value)
+    if len(text) > 40:
+        text = text[:37] + '...'
+    return '%s %s' % (type(value).__name__, text)
+
+def _expected(name, value, key):
+    return SchemaError('expected %s, got %s' % (name, _describe(value)), () if key is _MISSING else (key,))
+
+def _to_int(value, key=_MISSING):
+    if isinstance(value, bool):
+        raise _expected('int', value, key)
+    if isinstance(value, int):
+        return int(value)
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, str):
+        try:
+            return int(value.strip())
+        except ValueError:
+            pass
+    raise _expected('int', value, key)
+
+def _to_float(value, key=_MISSING):
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            return float(value.strip())
+        except ValueError:
+            pass
+    raise _expected('float', value, key)
+
+def _to_str(value, key=_MISSING):
+    if isinstance(value, str):
+        return str(value)
+    raise _expected('str', value, key)
+
+_TRUE = frozenset(['true', 'yes', 'on', '1'])
+_FALSE = frozenset(['false', 'no', 'off', '0'])
+
+def _to_bool(value, key=_MISSING):
+    if isinstance(value, int) and value in (0, 1):
+        return bool(value)
+    if isinstance(value, str):
+        text = value.strip().lower()
+        if text in _TRUE:
+            return True
+        if text in _FALSE:
+            return False
+    raise _expected('bool', value, key)
+
+_COERCIONS = { int: _to_int, float: _to_float, str: _to_str, bool: _to_bool }
+
+def _instance_of(cls):
+    def check(value, key=_MISSING):
+        if isinstance(value, cls):
+            return value
+        raise _expected(cls.__name__, value, key)
+    return check
+
+def _converting(convert, name):
+    def check(value, key=_MISSING):
+        try:
+            return convert(value)
+        except (TypeError, ValueError) as e:
+            raise SchemaError('cannot convert %s with %s: %s' % (_describe(value), name, e),
+                              () if key is _MISSING else (key,))
+    return check
+
+
+### Compilation
+
+class _Compiler(object):
+    """ Generates the source of one function per mapping and list in a
+        schema (and one for a scalar root), and compiles them together.
+    """
+
+    def __init__(self, BunchClass, extra):
+        self.BunchClass = BunchClass
+        self.extra = extra
+        self.lines = []
+        self.pending = []
+        self.functions = []
+        self.namespace = {
+            'SchemaError': SchemaError, 'Mapping': Mapping, 'BunchClass': BunchClass,
+            '_MISSING': _MISSING, '_expected': _expected, '_convert': _convert, '_SCALARS': _SCALAR_TYPES,
+        }
+        self.count = 0
+
+    def name(self, prefix, value=_MISSING):
+        """ Returns a new global name, bound to ``value`` if one is given. """
+        name = '%s%d' % (prefix, self.count)
+        self.count += 1
+        if value is not _MISSING:
+            self.namespace[name] = value
+        return name
+
+    def emit(self, indent, line):
+        self.lines.append('    ' * indent + line)
+
+    def compile(self, schema):
+        entry = self.converter(schema)
+        self.source = '\n\n'.join(self.functions) + '\n'
+        exec(compile(self.source, '<bunch.schema>', 'exec'), self.namespace)
+        return self.namespace[entry]
+
+    def converter(self, schema):
+        """ Returns the name of a function converting one value of ``schema``. """
+        if isinstance(schema, Field):
+            schema = schema.schema
+        if isinstance(schema, dict):
+            return self.mapping(schema)
+        if isinstance(schema, list):
+            return self.sequence(schema)
+        name = self.start(self.name('value_'))
+        self.emit(0, 'def %s(v):' % name)
+        self.value(1, schema, None, _MISSING)
+        self.emit(1, 'return v')
+        self.finish()
+        return name
+
+    def value(self, indent, schema, field, key):
+        """ Emits the statements that check and convert ``v`` in place. """
+        if field is not None and field.nullable:
+            self.emit(indent, 'if v is not None:')
+            indent += 1
+        keyarg = '' if key is _MISSING else ', %r' % (key,)
+        if field is not None and field.convert is not None:
+            name = getattr(field.convert, '__name__', repr(field.convert))
+            check = self.name('convert_', _converting(field.convert, name))
+            self.emit(indent, 'v = %s(v%s)' % (check, keyarg))
+        elif isinstance(schema, (dict, list)):
+            sub = self.converter(schema)
+            if key is _MISSING:
+                self.emit(indent, 'v = %s(v)' % sub)
+            else:
+                self.emit(indent, 'try:')
+                self.emit(indent + 1, 'v = %s(v)' % sub)
+                self.emit(indent, 'except SchemaError as e:')
+                self.emit(indent + 1, 'e.path = (%r,) + e.path' % (key,))
+                self.emit(indent + 1, 'raise')
+        elif schema is object:
+            self.emit(indent, 'if type(v) not in _SCALARS:')
+            self.emit(indent + 1, 'v = _convert(v, BunchClass)')
+        else:
+            if not isinstance(schema, type):
+                raise TypeError('Not a schema: %r' % (schema,))
+            check = self.name('check_', _COERCIONS.get(schema) or _instance_of(schema))
+            t = self.name('type_', schema)
+            self.emit(indent, 'if type(v) is not %s:' % t)
+            self.emit(indent + 1, 'v = %s(v%s)' % (check, keyarg))
+
+    def start(self, name):
+        """ Starts a function; nested ones may be started and finished
+            before it is.
+        """
+        self.pending.append(self.lines)
+        self.lines = []
+        return name
+
+    def finish(self):
+        self.functions.append('\n'.join(self.lines))
+        self.lines = self.pending.pop()
+
+    def mapping(self, schema):
+        name = self.start(self.name('mapping_'))
+        fields = []
+        for key, spec in schema.items():
+            field = spec if isinstance(spec, Field) else Field(spec)
+            fields.append( (key, field) )
+
+        self.emit(0, 'def %s(node):' % name)
+        self.emit(1, 'if type(node) is not dict and not isinstance(node, Mapping):')
+        self.emit(2, "raise _expected('a mapping', node, _MISSING)")
+        self.emit(1, 'get = node.get')
+        # see bunch._fills_on_init
+        make = 'dict' if _fills_on_init(self.BunchClass) else 'BunchClass'
+        if self.extra == 'keep':
+            self.emit(1, 'out = %s(node)' % make)
+        else:
+            self.emit(1, 'out = %s()' % make)
+        self.emit(1, 'present = 0')
+        for key, field in fields:
+            self.emit(1, 'v = get(%r, _MISSING)' % (key,))
+            self.emit(1, 'if v is _MISSING:')
+            if field.default is not _MISSING:
+                default = self.name('default_', field.default)
+                if type(field.default) in _SCALAR_TYPES:
+                    self.emit(2, 'out[%r] = %s' % (key, default))
+                else:
+                    self.emit(2, 'out[%r] = _convert(%s, BunchClass)' % (key, default))
+            elif field.required:
+                self.emit(2, "raise SchemaError('missing required key', (%r,))" % (key,))
+            else:
+                self.emit(2, 'pass')
+            self.emit(1, 'else:')
+            self.emit(2, 'present += 1')
+            self.value(2, field.schema, field, key)
+            self.emit(2, 'out[%r] = v' % (key,))
+
+        self.emit(1, 'if len(node) > present:')
+        if self.extra == 'keep':
+            known = self.name('known_', frozenset(k for k, _ in fields))
+            self.emit(2, 'for k, v in node.items():')
+            self.emit(3, 'if k not in %s and type(v) not in _SCALARS:' % known)
+            self.emit(4, 'out[k] = _convert(v, BunchClass)')
+        elif self.extra == 'error':
+            known = self.name('known_', frozenset(k for k, _ in fields))
+            self.emit(2, 'for k in node:')
+            self.emit(3, 'if k not in %s:' % known)
+            self.emit(4, "raise SchemaError('unexpected key', (k,))")
+        else:
+            self.emit(2, 'pass')
+        self.emit(1, 'return out' if make == 'BunchClass' else 'return BunchClass(out)')
+        self.finish()
+        return name
+
+    def sequence(self, schema):
+        if len(schema) != 1:
+            raise TypeError('A list schema holds exactly one item schema, not %r' % (schema,))
+        item = schema[0]
+        field = item if isinstance(item, Field) else None
+        item_schema = item.schema if field is not None else item
+        name = self.start(self.name('list_'))
+        self.emit(0, 'def %s(node):' % name)
+        self.emit(1, 'if type(node) is not list and not isinstance(node, (list, tuple)):')
+        self.emit(2, "raise _expected('a list', node, _MISSING)")
+        if isinstance(item_schema, type) and item_schema in _SCALAR_TYPES and field is None:
+            # all already of the right type: a plain copy
+            types = self.name('types_', frozenset([item_schema]))
+            self.emit(1, 'if %s.issuperset(map(type, node)):' % types)
+            self.emit(2, 'return list(node)')
+        self.emit(1, 'out = []')
+        self.emit(1, 'append = out.append')
+        self.emit(1, 'for i, v in enumerate(node):')
+        self.emit(2, 'try:')
+        self.value(3, item_schema, field, _MISSING)
+        self.emit(2, 'except SchemaError as e:')
+        self.emit(3, 'e.path = (i,) + e.path')
+        self.emit(3, 'raise')
+        self.emit(2, 'append(v)')
+        self.emit(1, 'return out')
+        self.finish()
+        return name
+
+
+class Schema(object):
+    """ A compiled schema; pass it to ``bunchify`` or ``Bunch.fromDict``.
+
+        >>> from bunch import bunchify
+        >>> order = Schema({
+        ...     'id': int,
+        ...     'customer': {'name': str, 'email': Field(str, required=False)},
+        ...     'items': [{'sku': str, 'qty': Field(int, default=1), 'price': float}],
+        ...     'paid': Field(bool, default=False),
+        ... })
+        >>> b = bunchify({'id': '17', 'customer': {'name': 'Ada'},
+        ...               'items': [{'sku': 'A1', 'price': 3}, {'sku': 'B2', 'qty': 2, 'price': '1.5'}]},
+        ...              schema=order)
+        >>> b
+        Bunch(customer=Bunch(name='Ada'), id=17, items=[Bunch(price=3.0, qty=1, sku='A1'), Bunch(price=1.5, qty=2, sku='B2')], paid=False)
+
+        Values are coerced to the declared type where that is lossless: ints
+        and floats from numeric strings, floats from ints, bools from
+        ``'true'``/``'false'``-like strings and 0/1. Other classes must match
+        with ``isinstance``. Anything else raises a SchemaError naming the path
+        to the offending value.
+
+        >>> bunchify({'id': 1, 'customer': {'name': 'Ada'}, 'items': [{'sku': 'A1', 'price': 'free'}]},
+        ...          schema=order)
+        Traceback (most recent call last):
+          ...
+        bunch.schema.SchemaError: items[0].price: expected float, got str 'free'
+
+        Keys the schema does not mention are kept and bunchified as usual, or,
+        with ``extra='drop'`` or ``extra='error'``, left out or rejected.
+
+        >>> Schema({'a': int}, extra='error')({'a': 1, 'b': 2})
+        Traceback (most recent call last):
+          ...
+        bunch.schema.SchemaError: b: unexpected key
+    """
+
+    def __init__(self, declaration, extra='keep'):
+        if extra not in ('keep', 'drop', 'error'):
+            raise ValueError("extra must be 'keep', 'drop' or 'error', not %r" % (extra,))
+        self.declaration = declaration
+        self.extra = extra
+        self._compiled = {}     # BunchClass -> converter
+        self.compile(Bunch)     # report declaration errors now
+
+    def compile(self, BunchClass=Bunch):
+        """ Returns the converter function for ``BunchClass``, compiling it
+            on first use.
+        """
+        converter = self._compiled.get(BunchClass)
+        if converter is None:
+            converter = _Compiler(BunchClass, self.extra).compile(self.declaration)
+            self._compiled[BunchClass] = converter
+        return converter
+
+    def __call__(self, data, BunchClass=Bunch):
+        """ Validates and converts ``data``, as ``bunchify(data, BunchClass, schema=self)``. """
+        return self.compile(BunchClass)(data)
+
+    def __repr__(self):
+        return 'Schema(%r)' % (self.declaration,)
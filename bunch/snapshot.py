@@ -0,0 +1,512 @@
+# -*- coding: utf-8 -*-
+""" Binary snapshots of Bunch trees, memory-mapped and loaded lazily.
+
+    A snapshot file is a header followed by encoded values. Every value starts
+    with a one-byte tag; containers hold a table of 8-byte offsets to their
+    children, so any node can be read without decoding the rest of the file::
+
+        header   b'BNCHSNP1'  root:u64
+        None     b'0'         True  b't'        False  b'f'
+        int      b'i' i64     big int  b'n' len:u32 ascii digits
+        float    b'd' f64     str      b's' len:u32 utf-8
+        list     b'l' n:u32   n * offset:u64
+        mapping  b'm' n:u32   n * key offset:u64, n * value offset:u64
+
+    All numbers are little-endian. Equal strings and ints (including keys
+    repeated across thousands of records) and shared containers are written
+    once.
+
+    Loading maps the file read-only, so every process that opens the same
+    snapshot shares one copy in the page cache, and builds views that decode
+    a node only when it is accessed. SharedSnapshot puts the same encoding in
+    a shared memory block instead of a file.
+"""
+
+from collections.abc import Mapping, Sequence
+import mmap
+import os
+import struct
+import weakref
+
+from bunch import Bunch, BunchABCType, _bunch_like
+
+__all__ = ('SnapshotBunch', 'SnapshotList', 'SharedSnapshot', 'dump_snapshot', 'load_snapshot', 'attach_shared')
+
+_MAGIC = b'BNCHSNP1'
+_HEADER = struct.Struct('<8sQ')
+_U32 = struct.Struct('<I')
+_U64 = struct.Struct('<Q')
+_I64 = struct.Struct('<q')
+_F64 = struct.Struct('<d')
+
+_MAP, _LIST = b'm', b'l'
+# tags as read back: indexing a mmap or memoryview gives ints
+_T_MAP, _T_LIST, _T_INT, _T_STR, _T_FLOAT, _T_NONE, _T_TRUE, _T_FALSE, _T_BIGINT = bytearray(b'mlisd0tfn')
+_INT_MIN, _INT_MAX = -(1 << 63), (1 << 63) - 1
+
+
+def _pack_scalar(value):
+    """ Encodes a scalar, or returns None if ``value`` is not one. """
+    if value is None:
+        return b'0'
+    if value is True:
+        return b't'
+    if value is False:
+        return b'f'
+    if isinstance(value, str):
+        data = value.encode('utf-8')
+        return b's' + _U32.pack(len(data)) + data
+    if isinstance(value, int):
+        if _INT_MIN <= value <= _INT_MAX:
+            return b'i' + _I64.pack(value)
+        data = str(int(value)).encode('ascii')
+        return b'n' + _U32.pack(len(data)) + data
+    if isinstance(value, float):
+        return b'd' + _F64.pack(value)
+    return None
+
+def _encode(root):
+    """ Encodes a tree into a bytearray, iteratively: each container reserves
+        its offset table, and children patch their offset in once written.
+    """
+    buf = bytearray(_HEADER.size)
+    scalars = {}        # (type, value) -> offset
+    containers = {}     # id -> offset
+    keep = []           # holds containers so their ids stay unique
+    root_offset = None
+    stack = [ (root, None) ]
+    while stack:
+        value, slot = stack.pop()
+        data = _pack_scalar(value)
+        if data is not None:
+            # -0.0 == 0.0, so floats are not shared
+            key = None if isinstance(value, float) else (type(value), value)
+            offset = scalars.get(key)
+            if offset is None:
+                offset = len(buf)
+                buf += data
+                if key is not None:
+                    scalars[key] = offset
+        else:
+            offset = containers.get(id(value))
+            if offset is None:
+                offset = containers[id(value)] = len(buf)
+                keep.append(value)
+                if isinstance(value, (dict, Mapping)):
+                    items = list(value.items())
+                    n = len(items)
+                    buf += _MAP + _U32.pack(n)
+                    table = len(buf)
+                    buf += b'\0' * (16 * n)
+                    for i in range(n - 1, -1, -1):
+                        k, v = items[i]
+                        if _pack_scalar(k) is None:
+                            raise TypeError('Snapshot keys must be str, int, float, bool or None, not %s'
+                                            % type(k).__name__)
+                        stack.append( (v, table + 8 * (n + i)) )
+                        stack.append( (k, table + 8 * i) )
+                elif isinstance(value, (list, tuple, Sequence)) and not isinstance(value, (bytes, bytearray)):
+                    items = list(value)
+                    n = len(items)
+                    buf += _LIST + _U32.pack(n)
+                    table = len(buf)
+                    buf += b'\0' * (8 * n)
+                    for i in range(n - 1, -1, -1):
+                        stack.append( (items[i], table + 8 * i) )
+                else:
+                    raise TypeError('Object of type %s cannot be stored in a snapshot' % type(value).__name__)
+        if slot is None:
+            root_offset = offset
+        else:
+            _U64.pack_into(buf, slot, offset)
+    _HEADER.pack_into(buf, 0, _MAGIC, root_offset)
+    return buf
+
+
+def dump_snapshot(self, path):
+    """ Writes this tree to ``path`` as a binary snapshot (see bunch.snapshot).
+
+        Anything ``toJSON`` can express can be stored: mappings, lists and
+        tuples (which load as lists), strings, numbers, booleans and None.
+        Keys keep their type rather than becoming strings. The file is written
+        beside ``path`` and renamed into place, so readers never see a partial
+        snapshot.
+    """
+    buf = _encode(self)
+    tmp = '%s.%d.tmp' % (path, os.getpid())
+    try:
+        with open(tmp, 'wb') as f:
+            f.write(buf)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+class _Snapshot(object):
+    """ An encoded snapshot in a buffer (a mmap of a file, or shared memory).
+        ``source`` says where views should reattach to once unpickled (an
+        absolute path, or a shared memory key) and ``stamp`` which version of
+        the file they need; ``owner`` is kept alive for as long as the buffer
+        is in use.
+    """
+    __slots__ = ('source', 'stamp', 'root', '_map', '_owner', '__weakref__')
+
+    def __init__(self, buf, source, owner=None, stamp=None):
+        magic, root = _HEADER.unpack_from(buf, 0)
+        if magic != _MAGIC:
+            raise ValueError('%r is not a Bunch snapshot' % (source,))
+        self.source = source
+        self.stamp = stamp
+        self.root = root
+        self._map = buf
+        self._owner = owner
+
+    def _scalar(self, offset, tag):
+        m = self._map
+        if tag == _T_INT:
+            return _I64.unpack_from(m, offset + 1)[0]
+        if tag == _T_STR:
+            n = _U32.unpack_from(m, offset + 1)[0]
+            return str(m[offset + 5:offset + 5 + n], 'utf-8')
+        if tag == _T_FLOAT:
+            return _F64.unpack_from(m, offset + 1)[0]
+        if tag == _T_NONE:
+            return None
+        if tag == _T_TRUE:
+            return True
+        if tag == _T_FALSE:
+            return False
+        if tag == _T_BIGINT:
+            n = _U32.unpack_from(m, offset + 1)[0]
+            return int(str(m[offset + 5:offset + 5 + n], 'ascii'))
+        raise ValueError('Corrupt snapshot %r: bad tag %r at offset %d' % (self.source, tag, offset))
+
+    def value(self, offset):
+        """ Decodes a scalar, or returns a view over a container. """
+        tag = self._map[offset]
+        if tag == _T_MAP:
+            return SnapshotBunch(self, offset)
+        if tag == _T_LIST:
+            return SnapshotList(self, offset)
+        return self._scalar(offset, tag)
+
+    def index(self, offset):
+        """ Returns ``{key: value offset}`` for the mapping at ``offset``. """
+        m = self._map
+        n = _U32.unpack_from(m, offset + 1)[0]
+        offsets = struct.unpack_from('<%dQ' % (2 * n), m, offset + 5)
+        keys = [ self._scalar(o, m[o]) for o in offsets[:n] ]
+        return dict(zip(keys, offsets[n:]))
+
+    def materialize(self, offset, DictClass=dict):
+        """ Decodes the whole tree at ``offset`` into ``DictClass`` and lists. """
+        m = self._map
+        memo = {}
+        holder = [None]
+        stack = [ (offset, holder, 0) ]
+        while stack:
+            offset, parent, slot = stack.pop()
+            value = memo.get(offset)
+            if value is None:
+                tag = m[offset]
+                if tag == _T_MAP:
+                    value = memo[offset] = DictClass()
+                    children = self.index(offset)
+                    value.update(children)
+                elif tag == _T_LIST:
+                    n = _U32.unpack_from(m, offset + 1)[0]
+                    children = struct.unpack_from('<%dQ' % n, m, offset + 5)
+                    value = memo[offset] = list(children)
+                    children = enumerate(children)
+                else:
+                    value = self._scalar(offset, tag)
+                    children = ()
+                for k, o in (children.items() if isinstance(children, dict) else children):
+                    tag = m[o]
+                    if tag == _T_MAP or tag == _T_LIST:
+                        stack.append( (o, value, k) )
+                    else:
+                        value[k] = self._scalar(o, tag)
+            parent[slot] = value
+        return holder[0]
+
+
+# Snapshots open in this process, so views unpickled in a worker share one map.
+_open_snapshots = weakref.WeakValueDictionary()
+
+def _stamp(st):
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+def _open(path, stamp=None):
+    """ Returns the snapshot in the file at ``path``, mapping it unless this
+        process has it open already. Given the ``stamp`` of a snapshot known
+        to be open, the cache is checked before the file is looked at.
+    """
+    path = os.path.abspath(path)
+    if stamp is None:
+        stamp = _stamp(os.stat(path))
+    snap = _open_snapshots.get((path,) + stamp)
+    if snap is None:
+        with open(path, 'rb') as f:
+            opened = _stamp(os.fstat(f.fileno()))   # the file may have been replaced since
+            m = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            snap = _open_snapshots[(path,) + opened] = _Snapshot(m, path, stamp=opened)
+        except ValueError:
+            m.close()
+            raise
+    return snap
+
+def _attach(source, offset, stamp=None):
+    if isinstance(source, tuple):
+        snap = _open_shared(source[1])
+    else:
+        snap = _open(source, stamp)
+        if stamp is not None and snap.stamp != stamp:
+            raise ValueError('The snapshot %r has changed since the view was pickled' % (source,))
+    return snap.value(offset)
+
+
+def load_snapshot(cls, path, lazy=True):
+    """ Opens a snapshot written by ``dump_snapshot``.
+
+        By default the file is memory-mapped and a read-only SnapshotBunch view
+        is returned at once; nested nodes are decoded when first accessed. With
+        ``lazy=False`` the whole tree is decoded into ``cls`` and lists.
+
+        >>> import os, tempfile
+        >>> path = os.path.join(tempfile.mkdtemp(), 'ref.snap')
+        >>> b = Bunch(name='ref', rows=[Bunch(id=1, tags=('a', 'b')), Bunch(id=2 ** 70, tags=None)], ratio=0.5)
+        >>> b.dump_snapshot(path)
+        >>> snap = Bunch.load_snapshot(path)
+        >>> snap.rows[1].id, snap.rows[0].tags[-1], snap.ratio
+        (1180591620717411303424, 'b', 0.5)
+        >>> snap.rows[0] is snap.rows[0]
+        True
+        >>> Bunch.load_snapshot(path, lazy=False)
+        Bunch(name='ref', ratio=0.5, rows=[Bunch(id=1, tags=['a', 'b']), Bunch(id=1180591620717411303424, tags=None)])
+        >>> snap == Bunch.load_snapshot(path, lazy=False)
+        True
+
+        Views pickle as a reference to the file, by its absolute path.
+
+        >>> import pickle
+        >>> cwd = os.getcwd()
+        >>> os.chdir(os.path.dirname(path))
+        >>> data = pickle.dumps(Bunch.load_snapshot('ref.snap').rows[0])
+        >>> os.chdir(os.path.dirname(cwd))
+        >>> pickle.loads(data).tags
+        ['a', 'b']
+        >>> os.chdir(cwd)
+    """
+    snap = _open(path)
+    if lazy:
+        return snap.value(snap.root)
+    return snap.materialize(snap.root, cls)
+
+
+### Shared memory
+
+def _attach_shm(name):
+    from multiprocessing import shared_memory
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # before 3.13 attaching always registers the block with the resource
+        # tracker, which pool workers share with the process that created it
+        return shared_memory.SharedMemory(name=name)
+
+def _open_shared(name):
+    key = ('shm', name)
+    snap = _open_snapshots.get(key)
+    if snap is None:
+        shm = _attach_shm(name)
+        snap = _open_snapshots[key] = _Snapshot(shm.buf, key, shm)
+    return snap
+
+
+class SharedSnapshot(object):
+    """ A Bunch tree published once into ``multiprocessing.shared_memory``, in
+        the snapshot format, so that worker processes can read it without it
+        being pickled for every task.
+
+        >>> b = Bunch(model='v2', weights=[0.25, 0.75], labels=Bunch(pos='yes'))
+        >>> with SharedSnapshot(b) as shared:
+        ...     view = attach_shared(shared.name)
+        ...     view.labels.pos, view.weights[1]
+        ('yes', 0.75)
+
+        The views are read-only and pickle as a reference to the block: pass
+        ``shared.bunch`` (or any node inside it) as an argument to pool tasks,
+        and each worker maps the block once, however many tasks it runs.
+
+        >>> import pickle
+        >>> with SharedSnapshot(b) as shared:
+        ...     len(pickle.dumps(shared.bunch.labels)) < 200
+        True
+
+        The publishing process owns the block: ``close()`` and ``unlink()``
+        it (or use it as a context manager) once the workers are done.
+    """
+
+    def __init__(self, tree, name=None):
+        from multiprocessing import shared_memory
+        buf = _encode(tree)
+        self._shm = shared_memory.SharedMemory(name=name, create=True, size=len(buf))
+        self._shm.buf[:len(buf)] = buf
+        self.name = self._shm.name
+        # attach_shared() in this process (and forked workers) reuses our block
+        self._snap = _open_snapshots[('shm', self.name)] = _Snapshot(self._shm.buf, ('shm', self.name))
+
+    @property
+    def bunch(self):
+        """ A view over the published tree. """
+        return attach_shared(self.name)
+
+    def close(self):
+        _open_snapshots.pop(('shm', self.name), None)
+        self._snap = None
+        self._shm.close()
+
+    def unlink(self):
+        """ Frees the block once every process has closed it. """
+        self._shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        self.unlink()
+        return False
+
+
+def attach_shared(name):
+    """ Returns a read-only view over a tree published with SharedSnapshot. """
+    snap = _open_shared(name)
+    return snap.value(snap.root)
+
+
+class SnapshotBunch(Mapping, metaclass=BunchABCType):
+    """ A read-only Bunch view over a mapping in a snapshot file. """
+    __slots__ = ('_snap', '_offset', '_index', '_cache')
+
+    def __init__(self, snap, offset):
+        object.__setattr__(self, '_snap', snap)
+        object.__setattr__(self, '_offset', offset)
+        object.__setattr__(self, '_index', None)
+        object.__setattr__(self, '_cache', {})
+
+    def _keys(self):
+        index = self._index
+        if index is None:
+            index = self._snap.index(self._offset)
+            object.__setattr__(self, '_index', index)
+        return index
+
+    def __getitem__(self, k):
+        try:
+            return self._cache[k]
+        except KeyError:
+            pass
+        value = self._snap.value(self._keys()[k])
+        if isinstance(value, (SnapshotBunch, SnapshotList)):
+            self._cache[k] = value
+        return value
+
+    def __iter__(self):
+        return iter(self._keys())
+
+    def __len__(self):
+        return len(self._keys())
+
+    def __contains__(self, k):
+        return k in self._keys()
+
+    def __getattr__(self, k):
+        if k in type(self)._attr_names:
+            raise AttributeError(k)
+        try:
+            return self[k]
+        except KeyError:
+            raise AttributeError(k)
+
+    def __setattr__(self, k, v):
+        raise AttributeError('%s is read-only' % type(self).__name__)
+
+    def __delattr__(self, k):
+        raise AttributeError('%s is read-only' % type(self).__name__)
+
+    def __reduce__(self):
+        # reattach to the file rather than copying the data
+        return (_attach, (self._snap.source, self._offset, self._snap.stamp))
+
+    def toDict(self, DictClass=dict):
+        """ Decodes this subtree into ``DictClass`` and lists. """
+        return self._snap.materialize(self._offset, DictClass)
+
+    def __repr__(self):
+        if not self:
+            return '%s()' % (self.__class__.__name__,)
+        args = ', '.join( ('%s=%r' % (k, self[k]) for k in self) )
+        return '%s(%s)' % (self.__class__.__name__, args)
+
+
+class SnapshotList(Sequence, metaclass=BunchABCType):
+    """ A read-only view over a list in a snapshot file. """
+    __slots__ = ('_snap', '_offset', '_len', '_cache')
+
+    def __init__(self, snap, offset):
+        object.__setattr__(self, '_snap', snap)
+        object.__setattr__(self, '_offset', offset)
+        object.__setattr__(self, '_len', _U32.unpack_from(snap._map, offset + 1)[0])
+        object.__setattr__(self, '_cache', {})
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [ self[j] for j in range(*i.indices(self._len)) ]
+        if i < 0:
+            i += self._len
+        if not 0 <= i < self._len:
+            raise IndexError('SnapshotList index out of range')
+        try:
+            return self._cache[i]
+        except KeyError:
+            pass
+        value = self._snap.value(_U64.unpack_from(self._snap._map, self._offset + 5 + 8 * i)[0])
+        if isinstance(value, (SnapshotBunch, SnapshotList)):
+            self._cache[i] = value
+        return value
+
+    def __len__(self):
+        return self._len
+
+    def __eq__(self, other):
+        if isinstance(other, (list, tuple, SnapshotList)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def __ne__(self, other):
+        eq = self.__eq__(other)
+        return eq if eq is NotImplemented else not eq
+
+    __hash__ = None
+
+    def __getattr__(self, k):
+        # unset slots
+        raise AttributeError(k)
+
+    __setattr__ = SnapshotBunch.__dict__['__setattr__']
+    __delattr__ = SnapshotBunch.__dict__['__delattr__']
+    __reduce__ = SnapshotBunch.__dict__['__reduce__']
+
+    def toList(self, DictClass=dict):
+        """ Decodes this subtree into lists and ``DictClass``. """
+        return self._snap.materialize(self._offset, DictClass)
+
+    def __repr__(self):
+        return repr(list(self))
+
+_bunch_like(SnapshotBunch)
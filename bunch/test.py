@@ -2,11 +2,15 @@
 # -*- coding: utf-8 -*-
 import sys
 
+MODULES = ('bunch', 'bunch.frozen', 'bunch.layered', 'bunch.tracked', 'bunch.cache', 'bunch.fingerprint', 'bunch.index', 'bunch.schema', 'bunch.flat', 'bunch.frame', 'bunch.snapshot', 'bunch.parallel', 'bunch.aio', 'bunch.json_support', 'bunch.yaml_support', 'bunch.instrument', 'bunch.bench')
+
 def test():
-    import bunch
     import doctest
-    returned = doctest.testmod(bunch)
-    return returned.failed
+    failed = 0
+    for name in MODULES:
+        __import__(name)
+        failed += doctest.testmod(sys.modules[name]).failed
+    return failed
 
 if __name__ == '__main__':
     sys.exit(test())
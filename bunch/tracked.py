@@ -0,0 +1,453 @@
+# -*- coding: utf-8 -*-
+""" Change tracking and JSON-Patch-style diffs for Bunch trees.
+
+    Changes are lists of operations in the style of JSON Patch (RFC 6902):
+    ``{'op': 'add' | 'remove' | 'replace', 'path': '/a/b', 'value': ...}``,
+    where ``path`` is a JSON Pointer (RFC 6901). Values are not copied.
+"""
+
+from collections.abc import Mapping, MutableSequence
+
+from bunch import Bunch, bunchify
+
+__all__ = ('TrackedBunch', 'diff', 'apply_patch')
+
+_MISSING = object()
+
+
+### JSON Pointers
+
+def _pointer(path):
+    return ''.join( '/' + str(k).replace('~', '~0').replace('/', '~1') for k in path )
+
+def _parse_pointer(pointer):
+    if not pointer:
+        return []
+    if not pointer.startswith('/'):
+        raise ValueError('Invalid JSON pointer: %r' % (pointer,))
+    return [ k.replace('~1', '/').replace('~0', '~') for k in pointer[1:].split('/') ]
+
+def _has_key(m, k):
+    """ Tests for a key only: ``in`` on a Bunch also matches attribute names. """
+    if isinstance(m, dict):
+        return dict.__contains__(m, k)
+    return k in m.keys()
+
+def _step(node, key):
+    """ Resolves one pointer token in a mapping or a list. """
+    if isinstance(node, (dict, Mapping)):
+        return node[key]
+    if isinstance(node, (list, MutableSequence)):
+        return node[int(key)]
+    raise KeyError(key)
+
+
+### Diff and patch
+
+def diff(self, other):
+    """ Returns the changes that turn this tree into ``other``.
+
+        Mappings are compared key by key, to any depth; any other value that
+        differs (lists included) is replaced whole.
+
+        >>> old = Bunch.fromDict({'db': {'host': 'a', 'port': 5432}, 'debug': False, 'tags': [1]})
+        >>> new = Bunch.fromDict({'db': {'host': 'b', 'port': 5432}, 'tags': [1], 'level': 'info'})
+        >>> ops = old.diff(new)
+        >>> ops
+        [{'op': 'remove', 'path': '/debug'}, {'op': 'add', 'path': '/level', 'value': 'info'}, {'op': 'replace', 'path': '/db/host', 'value': 'b'}]
+        >>> old.apply_patch(ops) == new
+        True
+        >>> new.diff(new)
+        []
+
+        Keys named like methods are compared as keys.
+
+        >>> Bunch().diff(Bunch(values=1, items=[1]))
+        [{'op': 'add', 'path': '/values', 'value': 1}, {'op': 'add', 'path': '/items', 'value': [1]}]
+    """
+    ops = []
+    stack = [ ((), self, other) ]
+    while stack:
+        path, a, b = stack.pop()
+        removed = []
+        changed = []
+        for k in a:
+            v = b.get(k, _MISSING)
+            if v is _MISSING:
+                removed.append(k)
+                continue
+            old = a[k]
+            if old is v:
+                continue
+            if isinstance(old, (dict, Mapping)) and isinstance(v, (dict, Mapping)):
+                changed.append(k)
+            elif type(old) is not type(v) or old != v:
+                ops.append({ 'op': 'replace', 'path': _pointer(path + (k,)), 'value': v })
+        for k in removed:
+            ops.append({ 'op': 'remove', 'path': _pointer(path + (k,)) })
+        for k in b:
+            if not _has_key(a, k):
+                ops.append({ 'op': 'add', 'path': _pointer(path + (k,)), 'value': b[k] })
+        for k in reversed(changed):
+            stack.append( (path + (k,), a[k], b[k]) )
+    return ops
+
+
+def apply_patch(self, patch):
+    """ Applies a list of changes (as made by ``diff`` or
+        ``TrackedBunch.changes``) in place, and returns this Bunch.
+
+        Supports the ``add``, ``remove`` and ``replace`` operations; in lists,
+        ``add`` inserts before the given index, or appends for ``-``. Mappings
+        added to a Bunch are converted to Bunches.
+
+        >>> b = Bunch(a=Bunch(b=1), items=[1, 3])
+        >>> b.apply_patch([{'op': 'add', 'path': '/items/1', 'value': 2},
+        ...                {'op': 'add', 'path': '/c', 'value': {'d': 4}},
+        ...                {'op': 'remove', 'path': '/a/b'}])
+        Bunch(a=Bunch(), c=Bunch(d=4), items=[1, 2, 3])
+        >>> b.apply_patch([{'op': 'replace', 'path': '/get', 'value': 1}])
+        Traceback (most recent call last):
+          ...
+        KeyError: '/get'
+    """
+    BunchClass = getattr(self, '_BunchClass', None) or (type(self) if isinstance(self, Bunch) else Bunch)
+    for op in patch:
+        kind = op['op']
+        keys = _parse_pointer(op['path'])
+        if not keys:
+            if kind not in ('add', 'replace'):
+                raise ValueError('Cannot %s the root of the document' % kind)
+            self.clear()
+            self.update(bunchify(op['value'], BunchClass))
+            continue
+        parent = self
+        for k in keys[:-1]:
+            parent = _step(parent, k)
+        k = keys[-1]
+        if kind in ('add', 'replace'):
+            value = bunchify(op['value'], BunchClass)
+            if isinstance(parent, (dict, Mapping)):
+                if kind == 'replace' and not _has_key(parent, k):
+                    raise KeyError(op['path'])
+                parent[k] = value
+            elif kind == 'replace':
+                parent[int(k)] = value
+            elif k == '-':
+                parent.append(value)
+            else:
+                parent.insert(int(k), value)
+        elif kind == 'remove':
+            if isinstance(parent, (dict, Mapping)):
+                del parent[k]
+            else:
+                del parent[int(k)]
+        else:
+            raise ValueError('Unsupported patch operation: %r' % (kind,))
+    return self
+
+
+### TrackedBunch
+
+def _holds_nodes(items):
+    """ Whether a list or tuple may hold TrackedBunches, directly or in lists. """
+    return any( issubclass(t, (list, tuple, TrackedBunch)) for t in set(map(type, items)) )
+
+
+class TrackedBunch(Bunch):
+    """ A Bunch that records which paths have changed since it was created
+        (or last marked clean), including changes made through nested
+        TrackedBunches.
+
+        >>> cfg = TrackedBunch.fromDict({'db': {'host': 'a', 'pool': {'size': 5}}, 'debug': False})
+        >>> cfg.dirty_paths()
+        []
+        >>> cfg.db.pool.size = 10
+        >>> cfg.debug = True
+        >>> del cfg.db.host
+        >>> cfg.dirty_paths()
+        [('db', 'host'), ('db', 'pool', 'size'), ('debug',)]
+        >>> cfg.changes(clear=True)
+        [{'op': 'remove', 'path': '/db/host'}, {'op': 'add', 'path': '/db/pool/size', 'value': 10}, {'op': 'add', 'path': '/debug', 'value': True}]
+        >>> cfg.dirty_paths()
+        []
+
+        Every way of changing a key is tracked: item and attribute assignment
+        and deletion, ``update``, ``+=``, ``|=``, ``setdefault``, ``pop``, ``popitem``
+        and ``clear``. Mappings stored in a TrackedBunch become TrackedBunches
+        themselves; lists are tracked as whole values, so reassign a list
+        rather than mutating it in place (changes made through the
+        TrackedBunches in a list are recorded, under the index they were
+        stored at).
+
+        >>> cfg.db.replicas = [{'host': 'b'}]
+        >>> cfg.db += {'pool': {'size': 20}}
+        >>> cfg.dirty_paths()
+        [('db', 'pool'), ('db', 'replicas')]
+        >>> cfg.setdefault('items', 5)
+        5
+        >>> cfg.mark_clean()
+        >>> cfg |= {'log': {'level': 'info'}}
+        >>> cfg.dirty_paths(), type(cfg.log).__name__
+        ([('log',)], 'TrackedBunch')
+        >>> merged = {'log': None, 'extra': 1} | cfg
+        >>> merged.log.level, merged.extra, merged.dirty_paths()
+        ('info', 1, [])
+
+        A nested TrackedBunch belongs to one parent at a time, so ``copy()`` is
+        deep, and assigning one that already has a parent stores a copy.
+        Each node also carries a ``_version`` counter, bumped whenever
+        anything in its subtree changes.
+
+        >>> a, b = TrackedBunch.fromDict({'x': {'y': 1}}), TrackedBunch()
+        >>> b.z = a.x
+        >>> a.x.y = 5
+        >>> a.dirty_paths(), b.z.y
+        ([('x', 'y')], 1)
+    """
+    # class attributes, so Bunch.__setattr__ stores them on the instance
+    _parent = None
+    _key = None
+    _index = ()             # the list indexes below _key, for a node held in a list
+    _dirty = None
+    _version = 0            # bumped by every change in this subtree
+    _fingerprint = None     # (version, [text, digest]), see bunch.fingerprint
+    _BunchClass = Bunch     # for values added by apply_patch; adoption converts them
+
+    def __init__(self, *args, **kwargs):
+        dict.__init__(self, *args, **kwargs)
+        for k, v in dict.items(self):
+            adopted = self._adopt(k, v)
+            if adopted is not v:
+                dict.__setitem__(self, k, adopted)
+        self._dirty = None
+
+    @classmethod
+    def fromDict(cls, d, skip_converted=False, schema=None):
+        """ Recursively transforms a dictionary into a TrackedBunch with no
+            changes recorded, as does ``bunchify(d, TrackedBunch)``. Mappings
+            inside lists become TrackedBunches too, and their changes are
+            recorded under their index.
+
+            >>> t = bunchify({'a': {'x': 1}, 'b': 2, 'c': [{'y': 3}]}, TrackedBunch)
+            >>> t.dirty_paths(), t._version, t.a._parent is t
+            ([], 0, True)
+            >>> t.a.x = 5
+            >>> t.c[0].y = 4
+            >>> t.dirty_paths(), t._version
+            ([('a', 'x'), ('c', 0, 'y')], 2)
+        """
+        return bunchify(d, cls, skip_converted, schema)
+
+    bunchify = fromDict
+
+    def _root(self):
+        node = self
+        while node._parent is not None:
+            node = node._parent
+        return node
+
+    def _touch(self, k):
+        """ Bumps the version of this node and of every ancestor, and records
+            the changed path at the root.
+        """
+        path = (k,)
+        node = self
+        node._version += 1
+        while node._parent is not None:
+            path = (node._key,) + node._index + path
+            node = node._parent
+            node._version += 1
+        node._record(path)
+
+    def _record(self, path):
+        if self._dirty is None:
+            self._dirty = set()
+        self._dirty.add(path)
+
+    def _adopt(self, k, v):
+        t = type(v)
+        if t is dict or (isinstance(v, Bunch) and not isinstance(v, TrackedBunch)):
+            v = type(self)(v)
+        elif isinstance(v, TrackedBunch) and v._parent is not None:
+            v = v.copy()    # it stays where it is, tracked there
+        elif t is list or t is tuple:
+            return self._adopt_items(k, v, ())
+        if isinstance(v, TrackedBunch):
+            v._parent = self
+            v._key = k
+            v._index = ()
+            v._dirty = None
+        return v
+
+    def _adopt_items(self, k, items, index):
+        """ Adopts the TrackedBunches in a list or tuple (and in the lists
+            within it), so that their changes are recorded here too.
+        """
+        if not _holds_nodes(items):
+            return items
+        copies = {}
+        for i, v in enumerate(items):
+            t = type(v)
+            if t is list or t is tuple:
+                adopted = self._adopt_items(k, v, index + (i,))
+            elif isinstance(v, TrackedBunch):
+                adopted = v.copy() if v._parent is not None else v
+                adopted._parent = self
+                adopted._key = k
+                adopted._index = index + (i,)
+                adopted._dirty = None
+            else:
+                continue
+            if adopted is not v:
+                copies[i] = adopted
+        if not copies:
+            return items
+        if type(items) is tuple:
+            return tuple( copies.get(i, v) for i, v in enumerate(items) )
+        for i, v in copies.items():
+            items[i] = v
+        return items
+
+    def _release(self, v):
+        if isinstance(v, TrackedBunch):
+            if v._parent is self:
+                v._parent = None
+                v._key = None
+                v._index = ()
+        elif (type(v) is list or type(v) is tuple) and _holds_nodes(v):
+            for item in v:
+                self._release(item)
+
+    def __setitem__(self, k, v):
+        old = dict.get(self, k, _MISSING)
+        if old is v:
+            return  # eg. the re-assignment at the end of `b.child += {...}`
+        self._release(old)
+        dict.__setitem__(self, k, self._adopt(k, v))
+        self._touch(k)
+
+    def __delitem__(self, k):
+        v = dict.get(self, k, _MISSING)
+        dict.__delitem__(self, k)
+        self._release(v)
+        self._touch(k)
+
+    def update(self, *args, **kwargs):
+        for k, v in dict(*args, **kwargs).items():
+            self[k] = v
+
+    def setdefault(self, k, default=None):
+        if not dict.__contains__(self, k):
+            self[k] = default
+        return dict.__getitem__(self, k)
+
+    def pop(self, k, *default):
+        if dict.__contains__(self, k):
+            v = dict.__getitem__(self, k)
+            del self[k]
+            return v
+        return dict.pop(self, k, *default)
+
+    def popitem(self):
+        k, v = dict.popitem(self)
+        self._release(v)
+        self._touch(k)
+        return k, v
+
+    def clear(self):
+        for k in list(self):
+            del self[k]
+
+    def copy(self):
+        """ Makes a deep copy, with no changes recorded. """
+        return self.fromDict(self)
+
+    def __add__(self, other):
+        b = self.copy()
+        b.update(other)
+        b.mark_clean()
+        return b
+
+    __radd__ = __add__
+
+    def __or__(self, other):
+        if not isinstance(other, (dict, Mapping)):
+            return NotImplemented
+        return self + other
+
+    def __ror__(self, other):
+        if not isinstance(other, (dict, Mapping)):
+            return NotImplemented
+        b = self.copy()
+        for k, v in other.items():
+            if not dict.__contains__(b, k):
+                b[k] = v
+        b.mark_clean()
+        return b
+
+    def __ior__(self, other):
+        # dict.__ior__ would bypass update(), and so the tracking
+        self.update(other)
+        return self
+
+    def dirty_paths(self):
+        """ Returns the paths (as tuples of keys) that changed, omitting those
+            inside another changed path, in sorted order.
+        """
+        dirty = self._root()._dirty
+        if not dirty:
+            return []
+        prefix = self._path()
+        paths = []
+        seen = set()
+        for path in sorted(dirty, key=len):
+            if path[:len(prefix)] != prefix:
+                continue
+            if any(path[:i] in seen for i in range(1, len(path))):
+                continue
+            seen.add(path)
+            paths.append(path[len(prefix):])
+        return sorted(paths, key=lambda path: tuple(map(str, path)))
+
+    def _path(self):
+        path = ()
+        node = self
+        while node._parent is not None:
+            path = (node._key,) + node._index + path
+            node = node._parent
+        return path
+
+    def changes(self, clear=False):
+        """ Returns the recorded changes as patch operations (see
+            ``apply_patch``), reading the current values. With ``clear=True``,
+            also marks the tree clean.
+        """
+        ops = []
+        for path in self.dirty_paths():
+            node = self
+            for k in path:
+                if isinstance(node, (dict, Mapping)):
+                    node = node.get(k, _MISSING)
+                elif isinstance(node, (list, tuple)) and type(k) is int and k < len(node):
+                    node = node[k]
+                else:
+                    node = _MISSING
+                if node is _MISSING:
+                    break
+            if node is _MISSING:
+                ops.append({ 'op': 'remove', 'path': _pointer(path) })
+            else:
+                ops.append({ 'op': 'add', 'path': _pointer(path), 'value': node })
+        if clear:
+            self.mark_clean()
+        return ops
+
+    def mark_clean(self):
+        """ Forgets the recorded changes for this subtree. """
+        root = self._root()
+        if root is self:
+            self._dirty = None
+        elif root._dirty:
+            prefix = self._path()
+            root._dirty = set( path for path in root._dirty if path[:len(prefix)] != prefix )
@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+""" PyYAML support: the ``!bunch`` tags, representers for every Bunch type,
+    and ``toYAML`` / ``fromYAML``.
+
+    Imported when the application imports ``yaml``, or the first time one of
+    the methods is called; see ``bunch._install_yaml``.
+"""
+
+from collections.abc import Sequence
+import sys
+
+import yaml
+from yaml.representer import Representer, SafeRepresenter
+
+from bunch import Bunch, LazyBunch
+
+__all__ = ('from_yaml', 'to_yaml_safe', 'to_yaml', 'lazy_to_yaml', 'register_types', 'yaml_class',
+           'bunch_loader', 'toYAML', 'fromYAML')
+
+
+def from_yaml(loader, node):
+    """ PyYAML support for Bunches using the tag ``!bunch`` and ``!bunch.Bunch``.
+
+        >>> import yaml
+        >>> yaml.full_load('''
+        ... Flow style: !bunch.Bunch { Clark: Evans, Brian: Ingerson, Oren: Ben-Kiki }
+        ... Block style: !bunch
+        ...   Clark : Evans
+        ...   Brian : Ingerson
+        ...   Oren  : Ben-Kiki
+        ... ''') #doctest: +NORMALIZE_WHITESPACE
+        {'Flow style': Bunch(Brian='Ingerson', Clark='Evans', Oren='Ben-Kiki'),
+         'Block style': Bunch(Brian='Ingerson', Clark='Evans', Oren='Ben-Kiki')}
+
+        This module registers itself automatically to cover both Bunch and any
+        subclasses. Should you want to customize the representation of a subclass,
+        simply register it with PyYAML yourself.
+    """
+    data = Bunch()
+    yield data
+    value = loader.construct_mapping(node)
+    data.update(value)
+
+
+def to_yaml_safe(dumper, data):
+    """ Converts Bunch to a normal mapping node, making it appear as a
+        dict in the YAML output.
+
+        >>> b = Bunch(foo=['bar', Bunch(lol=True)], hello=42)
+        >>> import yaml
+        >>> yaml.safe_dump(b, default_flow_style=True)
+        '{foo: [bar, {lol: true}], hello: 42}\\n'
+    """
+    return dumper.represent_dict(data)
+
+def to_yaml(dumper, data):
+    """ Converts Bunch to a representation node.
+
+        >>> b = Bunch(foo=['bar', Bunch(lol=True)], hello=42)
+        >>> import yaml
+        >>> yaml.dump(b, default_flow_style=True)
+        '!bunch.Bunch {foo: [bar, !bunch.Bunch {lol: true}], hello: 42}\\n'
+    """
+    return dumper.represent_mapping('!bunch.Bunch', data)
+
+
+yaml.add_constructor('!bunch', from_yaml)
+yaml.add_constructor('!bunch.Bunch', from_yaml)
+
+SafeRepresenter.add_representer(Bunch, to_yaml_safe)
+SafeRepresenter.add_multi_representer(Bunch, to_yaml_safe)
+
+Representer.add_representer(Bunch, to_yaml)
+Representer.add_multi_representer(Bunch, to_yaml)
+
+def lazy_to_yaml(dumper, data):
+    """ Represents a lazy view as the plain data it wraps.
+
+        >>> import yaml
+        >>> yaml.safe_dump(Bunch(lazy=LazyBunch({'rows': [1, 2]})), default_flow_style=True)
+        '{lazy: {rows: [1, 2]}}\\n'
+    """
+    if isinstance(data, Sequence):
+        return dumper.represent_list(data.toList())
+    return dumper.represent_dict(data.toDict())
+
+
+# (module, type names, safe representer, representer) for the other Bunch
+# types, some of which are defined in modules that may not be loaded yet
+_REPRESENTED = (
+    ('bunch', ('LazyBunch', 'LazyList'), lazy_to_yaml, lazy_to_yaml),
+    ('bunch.snapshot', ('SnapshotBunch', 'SnapshotList'), lazy_to_yaml, lazy_to_yaml),
+    ('bunch', ('BunchRecord',), to_yaml_safe, to_yaml),
+    ('bunch.frozen', ('FrozenBunch',), to_yaml_safe, to_yaml),
+    ('bunch.layered', ('LayeredBunch',), to_yaml_safe, to_yaml),
+)
+_registered = set()
+
+def register_types():
+    """ Registers the representers for the Bunch types whose modules are
+        loaded; ``bunch._bunch_like`` calls it again as the others load.
+
+        >>> from bunch import FrozenBunch
+        >>> yaml.safe_dump(FrozenBunch(a=[1]), default_flow_style=True)
+        '{a: [1]}\\n'
+    """
+    for module_name, names, safe, full in _REPRESENTED:
+        module = sys.modules.get(module_name)
+        for name in names:
+            cls = module.__dict__.get(name) if module is not None else None
+            if cls is None or cls in _registered:
+                continue
+            SafeRepresenter.add_multi_representer(cls, safe)
+            Representer.add_multi_representer(cls, full)
+            _registered.add(cls)
+
+register_types()
+
+
+def yaml_class(name):
+    """ Returns the libyaml-backed ``C<name>`` from PyYAML when it was built
+        with libyaml, otherwise the pure-Python ``<name>``.
+
+        >>> yaml_class('SafeLoader') in (yaml.SafeLoader, getattr(yaml, 'CSafeLoader', None))
+        True
+    """
+    return getattr(yaml, 'C' + name, None) or getattr(yaml, name)
+
+
+_bunch_loaders = {}
+
+def bunch_loader(Loader, BunchClass=Bunch):
+    """ Returns a subclass of ``Loader`` that constructs every YAML mapping, as
+        well as the ``!bunch`` and ``!bunch.Bunch`` tags, directly as a
+        ``BunchClass`` while loading. Classes are created once and cached.
+
+        >>> import yaml
+        >>> yaml.load('foo: {lol: true}', Loader=bunch_loader(yaml.SafeLoader))
+        Bunch(foo=Bunch(lol=True))
+    """
+    key = (Loader, BunchClass)
+    try:
+        return _bunch_loaders[key]
+    except KeyError:
+        pass
+
+    def construct_bunch(loader, node):
+        data = BunchClass()
+        yield data
+        data.update(loader.construct_mapping(node))
+
+    BunchLoader = type(BunchClass.__name__ + Loader.__name__, (Loader,), {})
+    for tag in ('tag:yaml.org,2002:map', '!bunch', '!bunch.Bunch'):
+        BunchLoader.add_constructor(tag, construct_bunch)
+    _bunch_loaders[key] = BunchLoader
+    return BunchLoader
+
+
+# Instance methods for YAML conversion
+def toYAML(self, **options):
+    """ Serializes this Bunch to YAML, using ``SafeDumper`` (``CSafeDumper``
+        when PyYAML has libyaml) if no ``Dumper`` is provided. See the PyYAML
+        documentation for more info.
+
+        >>> b = Bunch(foo=['bar', Bunch(lol=True)], hello=42)
+        >>> import yaml
+        >>> yaml.safe_dump(b, default_flow_style=True)
+        '{foo: [bar, {lol: true}], hello: 42}\\n'
+        >>> b.toYAML(default_flow_style=True)
+        '{foo: [bar, {lol: true}], hello: 42}\\n'
+        >>> yaml.dump(b, default_flow_style=True)
+        '!bunch.Bunch {foo: [bar, !bunch.Bunch {lol: true}], hello: 42}\\n'
+        >>> b.toYAML(Dumper=yaml.Dumper, default_flow_style=True)
+        '!bunch.Bunch {foo: [bar, !bunch.Bunch {lol: true}], hello: 42}\\n'
+    """
+    opts = dict(indent=2, default_flow_style=None)
+    opts.update(options)
+    if opts.get('Dumper') is None:
+        opts['Dumper'] = yaml_class('SafeDumper')
+    return yaml.dump(self, **opts)
+
+
+def fromYAML(cls, *args, **kwargs):
+    """ Convenience method for loading YAML and getting Bunches.
+
+        >>> document = '''
+        ... foo:
+        ... - bar
+        ... - lol: true
+        ... hello: 42
+        ... '''
+        >>> Bunch.fromYAML(document)
+        Bunch(foo=['bar', Bunch(lol=True)], hello=42)
+
+        Mappings are built as Bunches while the document is constructed (see
+        ``bunch_loader``), so there is no separate conversion pass. Uses
+        FullLoader by default, but accepts the following for convenience:
+        - ``safe=True`` for SafeLoader
+        - ``full=True`` for FullLoader (default)
+        - ``unsafe=True`` for UnsafeLoader
+        - ``all=True`` to load all documents (returning a list)
+
+        The libyaml-backed ``CSafeLoader``, ``CFullLoader`` and ``CUnsafeLoader``
+        are used instead when PyYAML was built with libyaml.
+
+        >>> documents = '''
+        ... ---
+        ... - name: Hero
+        ...   level: 4
+        ...   hp: 34
+        ... - name: Goblin
+        ...   level: 1
+        ...   hp: 8
+        ... ---
+        ... - name: Orc
+        ...   level: 2
+        ...   hp: 12
+        ... '''
+        >>> Bunch.fromYAML(documents, all=True) #doctest: +NORMALIZE_WHITESPACE
+        [[Bunch(hp=34, level=4, name='Hero'), Bunch(hp=8, level=1, name='Goblin')],
+          [Bunch(hp=12, level=2, name='Orc')]]
+
+        All other options are passed to PyYAML, so you can still specify a
+        custom loader with ``Bunch.fromYAML(data, Loader=CustomLoader)``. (Note that
+        supplying a kw argument ``Loader`` overrides ``safe``, ``full``, and ``unsafe``.)
+
+        See https://msg.pyyaml.org/load for more info.
+    """
+    loader_name = 'FullLoader'
+    for prefix in ('safe', 'full', 'unsafe'):
+        # we want to pop all the prefix keys anyway, so put the test for Loader last
+        if kwargs.pop(prefix, False) and 'Loader' not in kwargs:
+            loader_name = prefix.capitalize() + 'Loader'
+
+    Loader = kwargs.pop('Loader', None) or yaml_class(loader_name)
+    kwargs['Loader'] = bunch_loader(Loader, cls)
+    if kwargs.pop('all', False):
+        return list(yaml.load_all(*args, **kwargs))
+    else:
+        return yaml.load(*args, **kwargs)